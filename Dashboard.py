@@ -1,16 +1,54 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-import time
-import random
 import warnings
-from functools import lru_cache
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import folium
+from streamlit_folium import st_folium
+import json
+import os
+import tempfile
+from impots import data as fiscal_data
+from impots.anomalies import AnomalyDetector
+from impots.currency import REPORTING_CURRENCY, convert_totals, symbol as currency_symbol
+from impots.disk_store import DiskStore
+from impots.export import export_all, zip_export
+from impots.event_study import TOTAL, EventStudy
+from impots.figures import RENDER_MODES, compact_figure, figure_size_report, line_figure_from_frame, payload_size
+from impots.geography import (feature_bounds, feature_centers, join_properties, simplified_geojson, vertex_count,
+                              zoom_level)
+from impots.hierarchy import AggregateTree
+from impots.kpi import KpiEngine, kpi_table
+from impots.leaderboard import Leaderboard
+from impots.live import TickRingBuffer, VersionedSnapshot
+from impots.montecarlo import DEFAULT_PATHS, MONTHLY_VOLATILITY, monte_carlo_projection
+from impots.parameters import get_parameter_matrix
+from impots.seeding import data_token
+from impots.session import SHARED_TERRITORY_KEYS, SessionRegistry, TerritoryLRU
+from impots.shared_cache import SharedFrameCache
+from impots.store import HistoricalStore
+from impots.timeseries import DateIndex, DEFAULT_MAX_POINTS, DOWNSAMPLING_METHODS, downsample_frame
+from impots.validation import ValidationRegistry
 warnings.filterwarnings('ignore')
 
+# Nombre maximal d'entrées conservées dans le journal des modifications par territoire
+MAX_CHANGE_LOG_ENTRIES = 5000
+# Nombre de ticks temps réel conservés par catégorie (tampon circulaire)
+TICK_BUFFER_CAPACITY = 120
+# Nombre maximal d'alertes d'anomalies conservées par territoire
+MAX_ANOMALY_ALERTS = 200
+# Territoires conservés en mémoire par session et délai d'inactivité avant libération (secondes)
+MAX_TERRITORIES_PER_SESSION = max(1, int(os.environ.get('IMPOTS_MAX_TERRITORIES_PER_SESSION', 3)))
+SESSION_IDLE_TIMEOUT = int(os.environ.get('IMPOTS_SESSION_IDLE_TIMEOUT', 1800))
+
+# Indicateurs proposés sur la carte des territoires
+MAP_METRICS = {
+    'recettes_par_habitant': "Recettes par habitant (€)",
+    'pression_fiscale': "Pression fiscale (%)",
+}
+
 # Configuration de la page
 st.set_page_config(
     page_title="Dashboard Impôts - DROM-COM",
@@ -124,483 +162,222 @@ st.markdown("""
 
 # Initialisation de l'état de session
 if 'territories_data' not in st.session_state:
-    st.session_state.territories_data = {}
+    st.session_state.territories_data = TerritoryLRU(MAX_TERRITORIES_PER_SESSION)
 if 'selected_territory' not in st.session_state:
     st.session_state.selected_territory = 'REUNION'
 if 'last_update' not in st.session_state:
     st.session_state.last_update = datetime.now()
+if 'custom_reforms' not in st.session_state:
+    st.session_state.custom_reforms = []
+if 'max_points' not in st.session_state:
+    st.session_state.max_points = DEFAULT_MAX_POINTS
+if 'downsampling_method' not in st.session_state:
+    st.session_state.downsampling_method = DOWNSAMPLING_METHODS[0]
+if 'render_mode' not in st.session_state:
+    st.session_state.render_mode = RENDER_MODES[0]
+if 'compact_figures' not in st.session_state:
+    st.session_state.compact_figures = True
+if 'figure_size_report' not in st.session_state:
+    st.session_state.figure_size_report = False
 
 # Fonctions globales avec cache pour éviter les problèmes de hashage
+# (la génération elle-même vit dans impots.data, partagée avec le CLI).
+# Les clés de cache sont des identifiants légers (code territoire + jeton de
+# version des données) : les tables volumineuses sont lues dans le store
+# partagé à l'intérieur des fonctions, jamais hachées à chaque appel.
+DISK_STORE = DiskStore()
+# Cache partagé entre les workers de la machine (IMPOTS_SHARED_CACHE), désactivé par défaut
+SHARED_CACHE = SharedFrameCache.from_env()
+
+def shared(key, build):
+    """Table construite une fois par machine si le cache partagé est actif, sinon par processus"""
+    if SHARED_CACHE is None:
+        return build()
+    return SHARED_CACHE.get_or_create(key, build)
+
+def live_key(territory_code, token):
+    return f'live/{token}/{territory_code}'
+
+get_territories_definitions = st.cache_data(ttl=3600)(fiscal_data.get_territories_definitions)
+get_categories_impots = st.cache_data(ttl=3600)(fiscal_data.get_categories_impots)
+
+@st.cache_data(ttl=1800)
+def generate_historical_data(territory_code, token):
+    """Historique depuis le stockage disque (préchauffé par le CLI) ou généré"""
+    return shared(
+        f'historique/{token}/{territory_code}',
+        lambda: fiscal_data.load_historical_data(territory_code, get_categories_impots(territory_code), DISK_STORE)
+    )
+
+@st.cache_resource(ttl=1800)
+def get_historical_store(token):
+    """Historique de tous les territoires actifs dans une table empilée (partagée, lecture seule)"""
+    territories = get_territories_definitions()
+    store = HistoricalStore.build(
+        [code for code, info in territories.items() if info['impots_actif']],
+        lambda code: generate_historical_data(code, token)
+    )
+    # Contrôle unique de la table empilée pour cette version des données
+    get_validation_registry().validate(
+        store.frame, 'historical_data', territories,
+        {code: list(get_categories_impots(code)) for code in store.codes}, version=token
+    )
+    return store
+
+@st.cache_data(ttl=300)
+def generate_current_data(territory_code, token):
+    """Données courantes d'un territoire, calculées sur sa tranche du store partagé"""
+    return shared(f'courant/{token}/{territory_code}', lambda: fiscal_data.generate_current_data(
+        territory_code,
+        get_categories_impots(territory_code),
+        get_historical_store(token).territory(territory_code)
+    ))
+
 @st.cache_data(ttl=3600)
-def get_territories_definitions():
-    """Définit les territoires DROM-COM"""
-    return {
-        'REUNION': {
-            'nom_complet': 'La Réunion',
-            'type': 'DROM',
-            'population': 860000,
-            'superficie': 2511,
-            'pib': 19.8,
-            'drapeau': 'reunion-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 2800,
-            'recettes_par_habitant': 3256,
-            'taux_imposition_moyen': 28.5
-        },
-        'GUADELOUPE': {
-            'nom_complet': 'Guadeloupe',
-            'type': 'DROM',
-            'population': 384000,
-            'superficie': 1628,
-            'pib': 9.1,
-            'drapeau': 'guadeloupe-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 1250,
-            'recettes_par_habitant': 3255,
-            'taux_imposition_moyen': 27.8
-        },
-        'MARTINIQUE': {
-            'nom_complet': 'Martinique',
-            'type': 'DROM',
-            'population': 376000,
-            'superficie': 1128,
-            'pib': 8.9,
-            'drapeau': 'martinique-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 1220,
-            'recettes_par_habitant': 3245,
-            'taux_imposition_moyen': 27.5
-        },
-        'GUYANE': {
-            'nom_complet': 'Guyane',
-            'type': 'DROM',
-            'population': 290000,
-            'superficie': 83534,
-            'pib': 4.8,
-            'drapeau': 'guyane-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 680,
-            'recettes_par_habitant': 2345,
-            'taux_imposition_moyen': 24.2
-        },
-        'MAYOTTE': {
-            'nom_complet': 'Mayotte',
-            'type': 'DROM',
-            'population': 270000,
-            'superficie': 374,
-            'pib': 2.4,
-            'drapeau': 'mayotte-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 420,
-            'recettes_par_habitant': 1556,
-            'taux_imposition_moyen': 22.1
-        },
-        'STPIERRE': {
-            'nom_complet': 'Saint-Pierre-et-Miquelon',
-            'type': 'COM',
-            'population': 6000,
-            'superficie': 242,
-            'pib': 0.2,
-            'drapeau': 'spierre-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 45,
-            'recettes_par_habitant': 7500,
-            'taux_imposition_moyen': 32.5
-        },
-        'STBARTH': {
-            'nom_complet': 'Saint-Barthélemy',
-            'type': 'COM',
-            'population': 10000,
-            'superficie': 21,
-            'pib': 0.6,
-            'drapeau': 'stbarth-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 85,
-            'recettes_par_habitant': 8500,
-            'taux_imposition_moyen': 35.2
-        },
-        'STMARTIN': {
-            'nom_complet': 'Saint-Martin',
-            'type': 'COM',
-            'population': 32000,
-            'superficie': 54,
-            'pib': 0.9,
-            'drapeau': 'stmartin-flag',
-            'monnaie': 'EUR',
-            'impots_actif': True,
-            'recettes_fiscales_total': 120,
-            'recettes_par_habitant': 3750,
-            'taux_imposition_moyen': 29.8
-        },
-        'WALLIS': {
-            'nom_complet': 'Wallis-et-Futuna',
-            'type': 'COM',
-            'population': 11500,
-            'superficie': 142,
-            'pib': 0.2,
-            'drapeau': 'wallis-flag',
-            'monnaie': 'XPF',
-            'impots_actif': True,
-            'recettes_fiscales_total': 25,
-            'recettes_par_habitant': 2174,
-            'taux_imposition_moyen': 26.5
-        },
-        'POLYNESIE': {
-            'nom_complet': 'Polynésie française',
-            'type': 'COM',
-            'population': 280000,
-            'superficie': 4167,
-            'pib': 7.2,
-            'drapeau': 'polynesie-flag',
-            'monnaie': 'XPF',
-            'impots_actif': True,
-            'recettes_fiscales_total': 980,
-            'recettes_par_habitant': 3500,
-            'taux_imposition_moyen': 28.9
-        },
-        'CALEDONIE': {
-            'nom_complet': 'Nouvelle-Calédonie',
-            'type': 'COM',
-            'population': 271000,
-            'superficie': 18575,
-            'pib': 9.7,
-            'drapeau': 'caledonie-flag',
-            'monnaie': 'XPF',
-            'impots_actif': True,
-            'recettes_fiscales_total': 1100,
-            'recettes_par_habitant': 4059,
-            'taux_imposition_moyen': 30.2
-        }
-    }
+def generate_comparison_data(token):
+    """Comparaison des territoires (définitions lues dans le cache, non hachées)"""
+    territories = get_territories_definitions()
+    comparison = shared(f'comparaison/{token}', lambda: fiscal_data.generate_comparison_data(territories))
+    get_validation_registry().validate(comparison, 'comparison', territories, version=token)
+    return comparison
 
 @st.cache_data(ttl=3600)
-def get_categories_impots(territory_code):
-    """Définit les catégories d'impôts pour un territoire donné"""
-    # Facteurs d'ajustement selon le territoire
-    territory_factor = {
-        'REUNION': 1.0,
-        'GUADELOUPE': 0.85,
-        'MARTINIQUE': 0.82,
-        'GUYANE': 0.65,
-        'MAYOTTE': 0.45,
-        'STPIERRE': 1.2,
-        'STBARTH': 1.5,
-        'STMARTIN': 1.1,
-        'WALLIS': 0.7,
-        'POLYNESIE': 0.8,
-        'CALEDONIE': 0.9
-    }
-    
-    factor = territory_factor.get(territory_code, 1.0)
-    
-    # Catégories de base avec ajustements selon le territoire
-    categories_base = {
-        'IR': {
-            'nom_complet': 'Impôt sur le Revenu',
-            'type_impot': 'Direct',
-            'sous_categorie': 'Impôt progressif',
-            'montant_annuel': 850 * factor,
-            'nombre_contribuables': 320000 * factor,
-            'couleur': '#28a745',
-            'poids_total': 30.2 * factor,
-            'evolution_annuelle': 3.2,
-            'description': 'Impôt progressif sur les revenus des personnes physiques',
-            'taux_moyen': 14.5,
-            'plafond': 150000
-        },
-        'IS': {
-            'nom_complet': 'Impôt sur les Sociétés',
-            'type_impot': 'Direct',
-            'sous_categorie': 'Impôt sur les bénéfices',
-            'montant_annuel': 620 * factor,
-            'nombre_contribuables': 25000 * factor,
-            'couleur': '#20c997',
-            'poids_total': 22.8 * factor,
-            'evolution_annuelle': 4.8,
-            'description': 'Impôt sur les bénéfices des entreprises',
-            'taux_moyen': 25.0,
-            'plafond': 1000000
-        },
-        'TVA': {
-            'nom_complet': 'Taxe sur la Valeur Ajoutée',
-            'type_impot': 'Indirect',
-            'sous_categorie': 'Taxe sur la consommation',
-            'montant_annuel': 980 * factor,
-            'nombre_contribuables': 45000 * factor,
-            'couleur': '#fd7e14',
-            'poids_total': 35.5 * factor,
-            'evolution_annuelle': 2.9,
-            'description': 'Taxe sur la consommation de biens et services',
-            'taux_moyen': 8.5,
-            'plafond': 0
-        },
-        'TFPB': {
-            'nom_complet': 'Taxe Foncière sur le Bâti',
-            'type_impot': 'Local',
-            'sous_categorie': 'Taxe foncière',
-            'montant_annuel': 280 * factor,
-            'nombre_contribuables': 280000 * factor,
-            'couleur': '#6f42c1',
-            'poids_total': 10.3 * factor,
-            'evolution_annuelle': 1.5,
-            'description': 'Taxe sur les propriétés bâties',
-            'taux_moyen': 1.2,
-            'plafond': 50000
-        },
-        'TFNB': {
-            'nom_complet': 'Taxe Foncière sur le Non-Bâti',
-            'type_impot': 'Local',
-            'sous_categorie': 'Taxe foncière',
-            'montant_annuel': 45 * factor,
-            'nombre_contribuables': 15000 * factor,
-            'couleur': '#dc3545',
-            'poids_total': 1.7 * factor,
-            'evolution_annuelle': 0.8,
-            'description': 'Taxe sur les propriétés non bâties',
-            'taux_moyen': 0.8,
-            'plafond': 20000
-        },
-        'TH': {
-            'nom_complet': 'Taxe d\'Habitation',
-            'type_impot': 'Local',
-            'sous_categorie': 'Taxe d\'habitation',
-            'montant_annuel': 320 * factor,
-            'nombre_contribuables': 380000 * factor,
-            'couleur': '#ffc107',
-            'poids_total': 11.8 * factor,
-            'evolution_annuelle': -2.5,
-            'description': 'Taxe sur l\'occupation des logements',
-            'taux_moyen': 1.5,
-            'plafond': 30000
-        },
-        'DROITS_ENREGISTREMENT': {
-            'nom_complet': 'Droits d\'enregistrement',
-            'type_impot': 'Indirect',
-            'sous_categorie': 'Droits de mutation',
-            'montant_annuel': 180 * factor,
-            'nombre_contribuables': 12000 * factor,
-            'couleur': '#6610f2',
-            'poids_total': 6.8 * factor,
-            'evolution_annuelle': 3.8,
-            'description': 'Droits sur les mutations immobilières et autres actes',
-            'taux_moyen': 5.5,
-            'plafond': 0
-        },
-        'TICPE': {
-            'nom_complet': 'Taxe Intérieure sur la Consommation des Produits Énergétiques',
-            'type_impot': 'Indirect',
-            'sous_categorie': 'Taxe sur l\'énergie',
-            'montant_annuel': 150 * factor,
-            'nombre_contribuables': 5000 * factor,
-            'couleur': '#e83e8c',
-            'poids_total': 5.5 * factor,
-            'evolution_annuelle': 1.2,
-            'description': 'Taxe sur les produits pétroliers et énergétiques',
-            'taux_moyen': 0.6,
-            'plafond': 0
-        },
-        'ISF': {
-            'nom_complet': 'Impôt sur la Fortune Immobilière',
-            'type_impot': 'Direct',
-            'sous_categorie': 'Impôt sur le patrimoine',
-            'montant_annuel': 42 * factor,
-            'nombre_contribuables': 2500 * factor,
-            'couleur': '#0066CC',
-            'poids_total': 1.5 * factor,
-            'evolution_annuelle': 2.2,
-            'description': 'Impôt sur les grandes fortunes immobilières',
-            'taux_moyen': 1.3,
-            'plafond': 1300000
-        },
-        'AUTRES_IMPOSITIONS': {
-            'nom_complet': 'Autres impositions et taxes',
-            'type_impot': 'Divers',
-            'sous_categorie': 'Taxes diverses',
-            'montant_annuel': 95 * factor,
-            'nombre_contribuables': 80000 * factor,
-            'couleur': '#17a2b8',
-            'poids_total': 3.5 * factor,
-            'evolution_annuelle': 1.5,
-            'description': 'Autres taxes et impositions diverses',
-            'taux_moyen': 0,
-            'plafond': 0
-        }
+def get_comparison_rankings(token):
+    """Classements des territoires, triés une fois par version des données (comparaison figée)"""
+    comparison = generate_comparison_data(token)
+    return {
+        column: comparison.sort_values(column, ascending=False)[['nom_complet', 'type', column]]
+        for column in ('recettes_fiscales_total', 'recettes_par_habitant')
     }
-    
-    # Ajustements spécifiques selon le territoire
-    if territory_code in ['POLYNESIE', 'CALEDONIE', 'WALLIS']:
-        categories_base['TAXE_LOCALE'] = {
-            'nom_complet': 'Taxe locale spécifique COM',
-            'type_impot': 'Local',
-            'sous_categorie': 'Taxe spécifique',
-            'montant_annuel': 120 * factor,
-            'nombre_contribuables': 180000 * factor,
-            'couleur': '#8B4513',
-            'poids_total': 8.0 * factor,
-            'evolution_annuelle': 2.5,
-            'description': 'Taxe locale spécifique aux collectivités d\'outre-mer',
-            'taux_moyen': 2.0,
-            'plafond': 25000
-        }
-    
-    return categories_base
+
+@st.cache_resource(ttl=1800)
+def get_distribution_sketches(territory_code, token):
+    """Esquisses de quantiles d'un territoire (revenus, impôt, paiements par catégorie), lecture seule"""
+    return fiscal_data.build_distribution_sketches(territory_code, get_categories_impots(territory_code))
+
+@st.cache_resource(ttl=1800)
+def get_group_sketches(group, token):
+    """Esquisses fusionnées des territoires actifs d'un groupe ('DROM', 'COM' ou None pour tous)"""
+    territories = get_territories_definitions()
+    return fiscal_data.merge_distribution_sketches(
+        get_distribution_sketches(code, token) for code, info in territories.items()
+        if info['impots_actif'] and group in (None, info['type'])
+    )
 
 @st.cache_data(ttl=1800)
-def generate_historical_data(territory_code, categories):
-    """Génère les données historiques optimisées"""
-    dates = pd.date_range('2015-01-01', datetime.now(), freq='M')
-    data = []
-    
-    for date in dates:
-        # Impact des réformes fiscales
-        if date.year == 2018:
-            reforme_impact = random.uniform(1.05, 1.15)  # Réforme fiscale
-        elif date.year == 2020:
-            reforme_impact = random.uniform(0.9, 1.05)   # Impact COVID
-        else:
-            reforme_impact = random.uniform(1.0, 1.08)
-        
-        # Variation saisonnière (plus marquée pour les impôts)
-        seasonal_impact = random.uniform(0.95, 1.05)
-        
-        for categorie_code, info in categories.items():
-            base_revenu = info['montant_annuel'] / 12  # Mensualisation
-            revenu = base_revenu * reforme_impact * seasonal_impact * random.uniform(0.95, 1.05)
-            contribuables = info['nombre_contribuables'] * random.uniform(0.98, 1.02)
-            
-            data.append({
-                'date': date,
-                'territoire': territory_code,
-                'categorie': categorie_code,
-                'montant_total_impots': revenu,
-                'nombre_contribuables': contribuables,
-                'montant_moyen': revenu / contribuables if contribuables > 0 else 0,
-                'type_impot': info['type_impot'],
-                'evolution_mensuelle': random.uniform(-1.0, 1.0)
-            })
-    
-    return pd.DataFrame(data)
+def get_monte_carlo_projection(territory_code, token, paths, volatility, projection_years=5):
+    """Éventail Monte Carlo d'un territoire, en cache par jeu de paramètres"""
+    return monte_carlo_projection(
+        territory_code,
+        get_categories_impots(territory_code),
+        generate_historical_data(territory_code, token)['date'].max(),
+        projection_years, paths, volatility
+    )
 
 @st.cache_data(ttl=300)
-def generate_current_data(territory_code, categories, historical_data):
-    """Génère les données courantes optimisées"""
-    current_data = []
-    
-    for categorie_code, info in categories.items():
-        # Dernières données historiques
-        last_data = historical_data[historical_data['categorie'] == categorie_code].iloc[-1]
-        
-        # Variation mensuelle simulée
-        change_pct = random.uniform(-0.05, 0.05)
-        change_abs = last_data['montant_total_impots'] * change_pct
-        
-        # CORRECTION: S'assurer que le montant mensuel est correctement calculé
-        montant_mensuel = max(0.1, last_data['montant_total_impots'] + change_abs)  # Éviter les valeurs négatives ou nulles
-        
-        current_data.append({
-            'territoire': territory_code,
-            'categorie': categorie_code,
-            'nom_complet': info['nom_complet'],
-            'type_impot': info['type_impot'],
-            'montant_mensuel': montant_mensuel,
-            'variation_pct': change_pct * 100,
-            'variation_abs': change_abs,
-            'nombre_contribuables': max(1, last_data['nombre_contribuables'] * random.uniform(0.98, 1.02)),  # Éviter les valeurs nulles
-            'montant_moyen': info['montant_annuel'] / 12 * random.uniform(0.95, 1.05),
-            'poids_total': info['poids_total'],
-            'montant_annee_precedente': last_data['montant_total_impots'] * 12 * random.uniform(0.92, 1.08),
-            'taux_moyen': info['taux_moyen'],
-            'plafond': info['plafond']
-        })
-    
-    return pd.DataFrame(current_data)
+def get_kpi_grid(token):
+    """Indicateurs de tous les territoires actifs, en une seule passe sur les données courantes empilées"""
+    territories = get_territories_definitions()
+    current_data = pd.concat([
+        generate_current_data(code, token) for code, info in territories.items() if info['impots_actif']
+    ], ignore_index=True)
+    return kpi_table(current_data, territories, REPORTING_CURRENCY)
 
-@st.cache_data(ttl=600)
-def generate_revenu_data(territory_code):
-    """Génère les données par tranche de revenu optimisées"""
-    revenu_ranges = [
-        {'tranche_revenu': '0-10k€', 'nombre_contribuables': 80000, 'montant_moyen_impot': 0, 'taux_effectif': 0},
-        {'tranche_revenu': '10-20k€', 'nombre_contribuables': 65000, 'montant_moyen_impot': 450, 'taux_effectif': 3.0},
-        {'tranche_revenu': '20-30k€', 'nombre_contribuables': 45000, 'montant_moyen_impot': 1200, 'taux_effectif': 6.0},
-        {'tranche_revenu': '30-50k€', 'nombre_contribuables': 30000, 'montant_moyen_impot': 2800, 'taux_effectif': 9.5},
-        {'tranche_revenu': '50-70k€', 'nombre_contribuables': 15000, 'montant_moyen_impot': 5500, 'taux_effectif': 12.0},
-        {'tranche_revenu': '70-100k€', 'nombre_contribuables': 8000, 'montant_moyen_impot': 9500, 'taux_effectif': 15.5},
-        {'tranche_revenu': '100-150k€', 'nombre_contribuables': 4000, 'montant_moyen_impot': 18500, 'taux_effectif': 18.5},
-        {'tranche_revenu': '150k€+', 'nombre_contribuables': 1500, 'montant_moyen_impot': 45000, 'taux_effectif': 25.0}
-    ]
-    
-    # Ajustement selon le territoire
-    territory_factor = {
-        'REUNION': 1.0, 'GUADELOUPE': 0.9, 'MARTINIQUE': 0.88, 'GUYANE': 0.7,
-        'MAYOTTE': 0.6, 'STPIERRE': 0.15, 'STBARTH': 0.2, 'STMARTIN': 0.3,
-        'WALLIS': 0.12, 'POLYNESIE': 0.8, 'CALEDONIE': 0.85
-    }
-    
-    factor = territory_factor.get(territory_code, 1.0)
-    for revenu_range in revenu_ranges:
-        revenu_range['nombre_contribuables'] *= factor
-        revenu_range['montant_moyen_impot'] *= factor
-    
-    return pd.DataFrame(revenu_ranges)
+@st.cache_data(ttl=1800)
+def get_monthly_totals(token):
+    """Total mensuel de chaque territoire actif (dates × territoires), converti en euros"""
+    return shared(f'totaux_mensuels/{token}', lambda: convert_totals(
+        get_historical_store(token).monthly_totals(), get_territories_definitions()
+    ))
 
-@st.cache_data(ttl=3600)
-def generate_comparison_data(territories):
-    """Génère les données de comparaison entre territoires"""
-    comparison_data = []
-    
-    for territory_code, territory_info in territories.items():
-        if not territory_info['impots_actif']:
-            continue
-            
-        categories = get_categories_impots(territory_code)
-        total_impots = sum(
-            categorie_info['montant_annuel']
-            for categorie_info in categories.values()
-        )
-        
-        comparison_data.append({
-            'territoire': territory_code,
-            'nom_complet': territory_info['nom_complet'],
-            'type': territory_info['type'],
-            'population': territory_info['population'],
-            'superficie': territory_info['superficie'],
-            'pib': territory_info['pib'],
-            'montant_total_impots': total_impots,
-            'recettes_fiscales_total': territory_info['recettes_fiscales_total'],
-            'recettes_par_habitant': territory_info['recettes_par_habitant'],
-            'taux_imposition_moyen': territory_info['taux_imposition_moyen'],
-            'pression_fiscale': (total_impots / territory_info['pib'] / 1e6) * 100,
-            'impots_actif': territory_info['impots_actif']
-        })
-    
-    return pd.DataFrame(comparison_data)
+@st.cache_resource
+def get_validation_registry():
+    """Rapports de validation des tables du processus, par version des données"""
+    return ValidationRegistry()
+
+@st.cache_resource
+def get_session_registry():
+    """Registre des sessions du processus (nettoyage des sessions inactives)"""
+    return SessionRegistry(SESSION_IDLE_TIMEOUT)
+
+def load_territory_frames(territory_code):
+    """Charge les tables d'un territoire sans les conserver en session (export par lots)"""
+    token = data_token()
+    return {
+        'categories': get_categories_impots(territory_code),
+        'historical_data': generate_historical_data(territory_code, token),
+        'current_data': generate_current_data(territory_code, token),
+        'revenu_data': fiscal_data.revenu_data_from_sketches(get_distribution_sketches(territory_code, token))
+    }
 
 class ImpotsDashboard:
     def __init__(self):
         self.territories = get_territories_definitions()
+        self.figure_sizes = []
         
+    def currency_unit(self, millions=False):
+        """Unité des montants du territoire affiché ('€', 'M€', 'XPF', 'MXPF')"""
+        return currency_symbol(fiscal_data.territory_currency(st.session_state.selected_territory), millions)
+    
     def get_territory_data(self, territory_code):
         """Récupère les données d'un territoire avec cache"""
         if territory_code not in st.session_state.territories_data:
             with st.spinner(f"Chargement des données fiscales pour {self.territories[territory_code]['nom_complet']}..."):
                 categories = get_categories_impots(territory_code)
-                historical_data = generate_historical_data(territory_code, categories)
-                current_data = generate_current_data(territory_code, categories, historical_data)
-                revenu_data = generate_revenu_data(territory_code)
+                token = data_token()
+                # Vue du territoire dans l'historique consolidé (tranche, pas de copie)
+                historical_data = get_historical_store(token).territory(territory_code)
+                current_data = generate_current_data(territory_code, token)
+                tick = 0
+                if SHARED_CACHE is not None:
+                    # Reprise du dernier tick publié par les autres workers
+                    head, head_tick, _ = SHARED_CACHE.live.head(live_key(territory_code, token))
+                    if head is not None:
+                        current_data, tick = head, head_tick
+                # Tranches de revenu lues dans les esquisses de quantiles du territoire
+                revenu_data = fiscal_data.revenu_data_from_sketches(get_distribution_sketches(territory_code, token))
+                # Index trié des dates: les fenêtres temporelles sont des recherches dichotomiques
+                date_index = DateIndex(historical_data)
+                
+                # Données courantes versionnées avec journal des modifications
+                live = VersionedSnapshot(territory_code, current_data, max_log_entries=MAX_CHANGE_LOG_ENTRIES)
+                ticks = TickRingBuffer(categories, capacity=TICK_BUFFER_CAPACITY)
+                ticks.record(current_data, live.last_update)
+                # Détection d'anomalies initialisée sur l'historique puis alimentée par les ticks
+                anomalies = AnomalyDetector(territory_code, categories, max_alerts=MAX_ANOMALY_ALERTS)
+                anomalies.observe_history(historical_data)
+                anomalies.observe_tick(current_data, live.last_update)
+                hierarchy = AggregateTree(historical_data, categories)
+                hierarchy.apply_tick(current_data)
+                # Lignes du territoire repositionnées dans les classements (reprise éventuelle d'un tick partagé)
+                # (sans cache partagé, un territoire rechargé repart du tick 0 de cette session)
+                self.observe_leaderboard(territory_code, current_data, tick, restart=SHARED_CACHE is None)
+                # Contrôles enregistrés avec la version des données : les vues lisent le statut
+                validation = [
+                    get_validation_registry().get('historical_data', None, token),
+                    get_validation_registry().validate(current_data, 'current_data', self.territories,
+                                                       list(categories), token, territory_code),
+                ]
                 
                 st.session_state.territories_data[territory_code] = {
                     'categories': categories,
-                    'historical_data': historical_data,
+                    'historical_data': date_index.frame,
+                    'date_index': date_index,
+                    # Sommes cumulées mois × catégories pour les études de réformes
+                    'event_study': EventStudy(historical_data),
                     'current_data': current_data,
+                    'live': live,
+                    'ticks': ticks,
+                    'anomalies': anomalies,
+                    'kpis': KpiEngine(territory_code, self.territories[territory_code]),
+                    # Agrégats type → sous-catégorie → catégorie → mois, mois en cours alimenté par les ticks
+                    'hierarchy': hierarchy,
+                    'version': live.version,
+                    'token': token,
+                    'tick': tick,
                     'revenu_data': revenu_data,
-                    'last_update': datetime.now()
+                    'validation': [report for report in validation if report is not None],
+                    'last_update': live.last_update
                 }
         
         return st.session_state.territories_data[territory_code]
@@ -609,18 +386,193 @@ class ImpotsDashboard:
         """Met à jour les données en temps réel"""
         if territory_code in st.session_state.territories_data:
             data = st.session_state.territories_data[territory_code]
-            current_data = data['current_data'].copy()
+            live = data['live']
+            if SHARED_CACHE is not None:
+                # Un seul tick par machine : les autres workers le relisent
+                new_data, data['tick'], timestamp = SHARED_CACHE.live.advance(
+                    live_key(territory_code, data['token']), data['tick'], data['current_data'],
+                    lambda frame, tick: fiscal_data.apply_live_update(frame, tick, data['token'])
+                )
+            else:
+                data['tick'] += 1
+                new_data, timestamp = fiscal_data.apply_live_update(data['current_data'], data['tick'], data['token']), None
+            changed_categories = live.update(new_data, timestamp)
             
-            # Mise à jour légère des données
-            for idx in current_data.index:
-                if random.random() < 0.4:  # 40% de chance de changement
-                    variation = random.uniform(-0.02, 0.02)
-                    current_data.loc[idx, 'montant_mensuel'] *= (1 + variation)
-                    current_data.loc[idx, 'variation_pct'] = variation * 100
-                    current_data.loc[idx, 'nombre_contribuables'] *= random.uniform(0.98, 1.02)
+            data['current_data'] = live.current
+            data['version'] = live.version
+            data['ticks'].record(live.current, live.last_update)
+            data['anomalies'].observe_tick(live.current, live.last_update, changed_categories)
+            data['hierarchy'].apply_tick(live.current, changed_categories)
+            self.observe_leaderboard(territory_code, live.current, data['tick'], changed_categories)
+            data['last_update'] = live.last_update
+            return changed_categories
+        return set()
+    
+    def leaderboard_state(self):
+        """Classements de la session et dernier tick classé par territoire (construits une fois par version)"""
+        token = data_token()
+        board = st.session_state.get('leaderboard')
+        if board is None or board['token'] != token:
+            leaderboard = Leaderboard(self.territories)
+            for code, info in self.territories.items():
+                if info['impots_actif']:
+                    leaderboard.observe(generate_current_data(code, token))
+            board = st.session_state.leaderboard = {'token': token, 'leaderboard': leaderboard, 'ticks': {}}
+        return board
+    
+    def observe_leaderboard(self, territory_code, frame, tick, categories=None, restart=False):
+        """Repositionne les lignes d'un territoire, sauf si un tick plus récent est déjà classé"""
+        board = self.leaderboard_state()
+        if not restart and tick < board['ticks'].get(territory_code, 0):
+            return
+        board['ticks'][territory_code] = tick
+        board['leaderboard'].observe(frame, categories)
+    
+    def get_leaderboard(self):
+        """Classements inter-territoires, à jour des ticks publiés par tous les workers"""
+        board = self.leaderboard_state()
+        if SHARED_CACHE is not None:
+            # Seules les métadonnées sont lues ; la table n'est relue que si un nouveau tick a été publié
+            for code, info in self.territories.items():
+                if not info['impots_actif']:
+                    continue
+                key = live_key(code, board['token'])
+                if SHARED_CACHE.live.tick(key) > board['ticks'].get(code, 0):
+                    head, tick, _ = SHARED_CACHE.live.head(key)
+                    if head is not None:
+                        self.observe_leaderboard(code, head, tick)
+        return board['leaderboard']
+    
+    def leaderboard_labels(self, top):
+        """Libellé 'territoire · catégorie' des lignes d'un classement global"""
+        names = {code: info['nom_complet'] for code, info in self.territories.items()}
+        return top['territoire'].map(names) + ' · ' + top['categorie']
+    
+    def display_time_controls(self):
+        """Affiche le sélecteur de période et la réduction du nombre de points"""
+        date_index = self.get_territory_data(st.session_state.selected_territory)['date_index']
+        
+        st.sidebar.markdown("### 🗓️ Période affichée")
+        min_date = date_index.min_date.to_pydatetime()
+        max_date = date_index.max_date.to_pydatetime()
+        st.session_state.time_window = st.sidebar.slider(
+            "Période:",
+            min_value=min_date,
+            max_value=max_date,
+            value=(min_date, max_date),
+            format="MM/YYYY"
+        )
+        st.sidebar.select_slider(
+            "Points max par courbe:",
+            options=[100, 250, 500, 1000, 2000],
+            key='max_points'
+        )
+        st.sidebar.radio(
+            "Réduction des points:",
+            DOWNSAMPLING_METHODS,
+            format_func=lambda method: {'lttb': 'LTTB (forme)', 'minmax': 'Min/Max par seau'}[method],
+            key='downsampling_method',
+            horizontal=True
+        )
+        st.sidebar.radio(
+            "Rendu des courbes:",
+            RENDER_MODES,
+            format_func=lambda mode: {'auto': 'Auto', 'svg': 'SVG', 'webgl': 'WebGL'}[mode],
+            key='render_mode',
+            horizontal=True
+        )
+        st.sidebar.checkbox("Données binaires compactes", key='compact_figures',
+                            help="Tableaux typés float32/int32 et dates en millisecondes (liaisons lentes)")
+        st.sidebar.checkbox("Rapport de taille des figures", key='figure_size_report')
+    
+    def get_history_window(self, data):
+        """Historique restreint à la période sélectionnée (tranche contiguë de la table triée)"""
+        start, end = st.session_state.get('time_window', (None, None))
+        return data['date_index'].window(start, end)
+    
+    def downsample(self, frame, x, y, group=None):
+        """Borne le nombre de points envoyés au navigateur pour chaque courbe"""
+        return downsample_frame(
+            frame, x, y,
+            max_points=st.session_state.max_points,
+            method=st.session_state.downsampling_method,
+            group=group
+        )
+    
+    def plotly_chart(self, fig):
+        """Affiche une figure avec données binaires compactes (et mesure sa taille si demandé)"""
+        before = payload_size(fig) if st.session_state.figure_size_report else None
+        if st.session_state.compact_figures:
+            compact_figure(fig)
+        if st.session_state.figure_size_report:
+            self.figure_sizes.append(figure_size_report(fig, before))
+        st.plotly_chart(fig, config={'displayModeBar': False})
+    
+    def display_figure_size_report(self):
+        """Affiche la taille des figures envoyées au navigateur pendant ce rendu"""
+        if not st.session_state.figure_size_report or not self.figure_sizes:
+            return
+        
+        report = pd.DataFrame(self.figure_sizes)
+        with st.sidebar.expander(f"📏 Taille des figures: {report['apres_ko'].sum():.0f} Ko", expanded=True):
+            st.dataframe(report, width='stretch', hide_index=True)
+            st.caption(f"Avant compactage: {report['avant_ko'].sum():.0f} Ko")
+    
+    def line_chart(self, frame, x, y, color=None, **kwargs):
+        """Courbe temporelle construite depuis NumPy (WebGL automatique pour les traces denses)"""
+        return line_figure_from_frame(frame, x, y, color=color, render_mode=st.session_state.render_mode, **kwargs)
+    
+    def track_session(self):
+        """Signale l'activité de la session et libère les données des sessions inactives"""
+        ctx = get_script_run_ctx()
+        registry = get_session_registry()
+        registry.touch(ctx.session_id if ctx else 'local', st.session_state.territories_data)
+        registry.sweep()
+    
+    def display_session_memory(self):
+        """Affiche l'empreinte mémoire des territoires conservés par la session"""
+        territories_data = st.session_state.territories_data
+        footprint = territories_data.footprint(SHARED_TERRITORY_KEYS)
+        total_ko = footprint['session_octets'].sum() / 1024
+        
+        with st.sidebar.expander(f"💾 Mémoire de session: {total_ko:,.0f} Ko"):
+            st.caption(
+                f"{len(territories_data)}/{territories_data.max_territories} territoires conservés · "
+                f"{territories_data.evictions} évincés · {len(get_session_registry())} sessions actives"
+            )
+            footprint['session_ko'] = (footprint['session_octets'] / 1024).round(1)
+            footprint['partage_ko'] = (footprint['partage_octets'] / 1024).round(1)
+            st.dataframe(footprint[['territoire', 'session_ko', 'partage_ko']], width='stretch', hide_index=True)
+    
+    def display_export_panel(self):
+        """Affiche le panneau d'export de tous les territoires"""
+        st.sidebar.markdown("### 📦 Export des données")
+        export_excel = st.sidebar.checkbox("Inclure un classeur Excel", value=False)
+        
+        if st.sidebar.button("Préparer l'export"):
+            codes = [code for code, info in self.territories.items() if info['impots_actif']]
+            progress_bar = st.sidebar.progress(0.0)
             
-            st.session_state.territories_data[territory_code]['current_data'] = current_data
-            st.session_state.territories_data[territory_code]['last_update'] = datetime.now()
+            # Répertoire supprimé après compression : seule l'archive est conservée (en session)
+            with tempfile.TemporaryDirectory(prefix='impots_export_') as export_dir:
+                export_all(
+                    export_dir,
+                    codes,
+                    load_territory_frames,
+                    comparison_data=generate_comparison_data(data_token()),
+                    excel=export_excel,
+                    progress=lambda i, n, code: progress_bar.progress(i / n, text=f"{code} exporté")
+                )
+                with open(zip_export(export_dir, os.path.join(export_dir, 'impots_drom_com.zip')), 'rb') as export_file:
+                    st.session_state.export_zip = export_file.read()
+        
+        if st.session_state.get('export_zip'):
+            st.sidebar.download_button(
+                "⬇️ Télécharger l'export (ZIP)",
+                data=st.session_state.export_zip,
+                file_name='impots_drom_com.zip',
+                mime='application/zip'
+            )
     
     def display_territory_selector(self):
         """Affiche le sélecteur de territoire optimisé"""
@@ -673,13 +625,65 @@ class ImpotsDashboard:
         st.markdown(f"""
         <div class="territory-flag {territory_info['drapeau']}">
             <strong>{territory_info['nom_complet']} - Système Fiscal</strong><br>
-            <small>Type: {territory_info['type']} | Population: {territory_info['population']:,} | PIB: {territory_info['pib']} M€</small>
+            <small>Type: {territory_info['type']} | Population: {territory_info['population']:,} | PIB: {territory_info['pib']} Md€</small>
         </div>
         """, unsafe_allow_html=True)
         
         current_time = datetime.now().strftime('%H:%M:%S')
         st.sidebar.markdown(f"**🕐 Dernière mise à jour: {current_time}**")
     
+    def create_map_view(self):
+        """Carte choroplèthe des territoires (contours simplifiés selon le zoom)"""
+        st.markdown('<h3 class="section-header">🗺️ CARTE DES TERRITOIRES</h3>', 
+                   unsafe_allow_html=True)
+        
+        comparison_data = generate_comparison_data(data_token())
+        codes = comparison_data['territoire'].tolist()
+        names = dict(zip(codes, comparison_data['nom_complet']))
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            metric = st.radio("Indicateur:", list(MAP_METRICS), format_func=MAP_METRICS.get,
+                              horizontal=True, key="map_metric")
+        with col2:
+            focus = st.selectbox("Zoom:", [None] + codes, key="map_focus",
+                                 format_func=lambda code: "Tous les territoires" if code is None else names[code])
+        
+        # Niveau de simplification selon l'étendue affichée (globe, région, île)
+        bounds = feature_bounds(simplified_geojson('detail'), None if focus is None else {focus})
+        level = zoom_level(bounds)
+        geojson = join_properties(simplified_geojson(level), comparison_data, columns=['nom_complet', metric])
+        
+        territory_map = folium.Map(tiles='CartoDB positron', world_copy_jump=True)
+        choropleth = folium.Choropleth(
+            geo_data=geojson,
+            data=comparison_data,
+            columns=['territoire', metric],
+            key_on='feature.properties.code',
+            fill_color='YlGn',
+            fill_opacity=0.8,
+            line_weight=1,
+            legend_name=MAP_METRICS[metric]
+        ).add_to(territory_map)
+        choropleth.geojson.add_child(folium.GeoJsonTooltip(
+            fields=['nom_complet', metric], aliases=['Territoire', MAP_METRICS[metric]]
+        ))
+        
+        if focus is None:
+            # Les îles sont invisibles à l'échelle du globe : repère coloré au centre de chaque territoire
+            values = comparison_data.set_index('territoire')[metric]
+            for code, (lat, lon) in feature_centers(geojson).items():
+                folium.CircleMarker(
+                    location=(lat, lon), radius=7, weight=1, color='#333333',
+                    fill=True, fill_opacity=0.9, fill_color=choropleth.color_scale(values[code]),
+                    tooltip=f"{names[code]}: {values[code]:,.1f}"
+                ).add_to(territory_map)
+        territory_map.fit_bounds(bounds)
+        
+        st_folium(territory_map, height=450, use_container_width=True, returned_objects=[], key="territory_map")
+        st.caption(f"Géométrie « {level} » : {vertex_count(geojson)} sommets, "
+                   f"{len(json.dumps(geojson, separators=(',', ':'))) / 1024:.1f} Ko · contours approximatifs")
+    
     def display_key_metrics(self):
         """Affiche les métriques clés des impôts"""
         data = self.get_territory_data(st.session_state.selected_territory)
@@ -688,96 +692,119 @@ class ImpotsDashboard:
         st.markdown('<h3 class="section-header">📊 INDICATEURS CLÉS FISCAUX</h3>', 
                    unsafe_allow_html=True)
         
-        # CORRECTION: S'assurer que les données sont correctement calculées
-        # Vérifier si les données existent et ne sont pas vides
-        if current_data.empty:
-            st.error("Aucune donnée disponible pour ce territoire")
+        # Statut des contrôles faits au chargement (unités, bornes, dates, complétude)
+        failed = [report for report in data['validation'] if not report.ok]
+        if failed:
+            st.error("Données invalides : " + " ; ".join(report.summary() for report in failed))
+            with st.expander("Contrôles en échec"):
+                st.dataframe(pd.concat([report.errors() for report in failed]), width='stretch', hide_index=True)
             return
         
-        # Calcul des métriques
-        montant_total_mensuel = current_data['montant_mensuel'].sum()
-        montant_total_annuel = montant_total_mensuel * 12
-        variation_moyenne = current_data['variation_pct'].mean()
-        contribuables_total = current_data['nombre_contribuables'].sum()
-        categories_hausse = len(current_data[current_data['variation_pct'] > 0])
+        # Indicateurs en cache par version des données, avec ceux de la version précédente
+        engine = data['kpis']
+        metrics = engine.update(data['version'], current_data)
+        deltas = engine.deltas()
+        depuis = "vs actualisation précédente" if engine.previous is not None else "vs mois dernier"
         
-        territory_info = self.territories[st.session_state.selected_territory]
+        # Même calcul pour tous les territoires, en euros (le territoire affiché avec ses données temps réel)
+        grid = get_kpi_grid(data['token']).copy()
+        metrics_eur = engine.reporting
+        grid.loc[st.session_state.selected_territory] = metrics_eur
+        unit = self.currency_unit()
         
-        # CORRECTION: Calcul correct de l'impôt par habitant
-        # Les données sont en millions, donc il faut multiplier par 1e6 pour obtenir les valeurs réelles
-        impot_par_habitant = (montant_total_annuel * 1e6) / territory_info['population']
+        def format_delta(value, suffix, unit='%', digits=2):
+            return None if value is None else f"{value:+.{digits}f}{unit} {suffix}"
         
-        # CORRECTION: Calcul correct de l'impôt moyen par contribuable
-        impot_moyen = (montant_total_annuel * 1e6) / contribuables_total if contribuables_total > 0 else 0
-        
-        # Afficher les informations de débogage
-        with st.expander("Informations de débogage"):
-            st.write(f"Montant total mensuel: {montant_total_mensuel}")
-            st.write(f"Montant total annuel: {montant_total_annuel}")
-            st.write(f"Nombre de contribuables: {contribuables_total}")
-            st.write(f"Population du territoire: {territory_info['population']}")
-            st.write(f"Impôt par habitant calculé: {impot_par_habitant}")
-            st.write(f"Impôt moyen par contribuable calculé: {impot_moyen}")
-            st.write(current_data.head())
+        # Moyennes DROM-COM pondérées (totaux rapportés à la population et au PIB de l'ensemble)
+        populations = pd.Series({code: self.territories[code]['population'] for code in grid.index})
+        pibs = pd.Series({code: self.territories[code]['pib'] for code in grid.index})
+        moyenne_habitant = grid['montant_total_annuel'].sum() * 1e6 / populations.sum()
+        moyenne_prelevement = grid['montant_total_annuel'].sum() / (pibs.sum() * 1e3) * 100
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            # CORRECTION: Conversion correcte pour l'affichage
             st.metric(
                 "Recettes Mensuelles Total",
-                f"{montant_total_mensuel:.1f} M€",  # Correction: pas de division par 1e6 car les données sont déjà en millions
-                f"{variation_moyenne:+.2f}%",
+                f"{metrics['montant_total_mensuel']:.1f} M{unit}",  # Les données sont déjà en millions
+                format_delta(deltas['montant_total_mensuel'], depuis),
                 delta_color="normal"
             )
         
         with col2:
-            # CORRECTION: Conversion correcte pour l'affichage
             st.metric(
                 "Recettes Annuelles Projetées",
-                f"{montant_total_annuel:.1f} M€",  # Correction: pas de division par 1e6 car les données sont déjà en millions
-                f"{random.uniform(2, 6):.1f}% vs année précédente"
+                f"{metrics['montant_total_annuel']:.1f} M{unit}",
+                format_delta(deltas['montant_total_annuel'], "vs année précédente")
             )
         
         with col3:
             st.metric(
                 "Nombre de Contribuables",
-                f"{contribuables_total:,.0f}",
-                f"{random.randint(-1, 3)}% vs mois dernier"
+                f"{metrics['contribuables_total']:,.0f}",
+                format_delta(deltas['contribuables_total'], depuis)
             )
         
         with col4:
-            # CORRECTION: Utiliser la valeur calculée précédemment
             st.metric(
                 "Impôt Moyen par Contribuable",
-                f"{impot_moyen:.0f} €",
-                f"{random.uniform(-2, 4):.1f}% vs période précédente"
+                f"{metrics['impot_moyen']:.0f} {unit}",
+                format_delta(deltas['impot_moyen'], depuis)
             )
         
-        # Métriques spécifiques au territoire
+        # Métriques spécifiques au territoire, comparées à la moyenne DROM-COM
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # CORRECTION: Utiliser la valeur calculée précédemment
             st.metric(
                 "Impôt par Habitant",
-                f"{impot_par_habitant:.0f} €",
-                f"{random.uniform(-3, 3):.1f}% vs moyenne DROM-COM"
+                f"{metrics['impot_par_habitant']:.0f} {unit}",
+                format_delta((metrics_eur['impot_par_habitant'] / moyenne_habitant - 1) * 100, "vs moyenne DROM-COM")
             )
         
         with col2:
             st.metric(
                 "Taux de Prélèvement",
-                f"{(montant_total_annuel/territory_info['pib'])*100:.1f}%",  # Correction: pas de division par 1e6
-                f"{random.uniform(-1, 2):.1f}% vs objectif"
+                f"{metrics['taux_prelevement']:.1f}%",
+                format_delta((metrics['taux_prelevement'] / moyenne_prelevement - 1) * 100, "vs moyenne DROM-COM")
             )
         
         with col3:
             st.metric(
-                "Efficacité Fiscale",
-                f"{random.uniform(85, 98):.1f}%",
-                f"{random.uniform(-2, 3):.1f}% vs objectif"
+                "Catégories en Hausse",
+                f"{metrics['categories_hausse']:.0f} / {metrics['nombre_categories']:.0f}",
+                format_delta(deltas['categories_hausse'], depuis, unit='', digits=0)
+            )
+        
+        with st.expander("Qualité des données"):
+            # Rapports enregistrés au chargement pour cette version des données (pas de nouveau contrôle)
+            for report in get_validation_registry().reports(data['token']):
+                st.caption(report.summary())
+                if not report.errors().empty:
+                    st.dataframe(report.errors(), width='stretch', hide_index=True)
+        
+        with st.expander("Indicateurs de tous les territoires (en euros)"):
+            grid.insert(0, 'nom_complet', [self.territories[code]['nom_complet'] for code in grid.index])
+            st.dataframe(
+                grid[['nom_complet', 'montant_total_mensuel', 'montant_total_annuel', 'variation_moyenne',
+                      'contribuables_total', 'categories_hausse', 'impot_par_habitant', 'impot_moyen',
+                      'taux_prelevement']].round(2),
+                width='stretch'
             )
+        
+        # Catégories signalées par la détection d'anomalies
+        anomalies = data['anomalies']
+        flagged = anomalies.flagged()
+        if flagged.empty:
+            st.success(f"✅ Aucune anomalie détectée (seuil |z| ≥ {anomalies.threshold})")
+        else:
+            st.warning("🚨 Catégories signalées: " + ", ".join(
+                f"**{row.categorie}** ({row.source}, z={row.score:+.1f})" for row in flagged.itertuples()
+            ))
+        
+        alert_history = anomalies.alert_frame()
+        with st.expander(f"Historique des alertes ({len(alert_history)})"):
+            st.dataframe(alert_history, width='stretch', hide_index=True)
     
     def create_impots_overview(self):
         """Crée la vue d'ensemble des impôts"""
@@ -793,16 +820,17 @@ class ImpotsDashboard:
             
             with col1:
                 # Évolution des recettes totales
-                evolution_totale = data['historical_data'].groupby('date')['montant_total_impots'].sum().reset_index()
-                evolution_totale['montant_mensuel_M'] = evolution_totale['montant_total_impots'] / 1e6
+                evolution_totale = self.get_history_window(data).groupby('date')['montant_total_impots'].sum().reset_index()
+                # Montants déjà en millions (unité contrôlée au chargement)
+                evolution_totale = self.downsample(evolution_totale, 'date', 'montant_total_impots')
                 
-                fig = px.line(evolution_totale, 
-                             x='date', 
-                             y='montant_mensuel_M',
-                             title=f'Évolution des Recettes - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
-                             color_discrete_sequence=['#28a745'])
-                fig.update_layout(yaxis_title="Recettes (Millions €)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                fig = self.line_chart(evolution_totale, 
+                                      x='date', 
+                                      y='montant_total_impots',
+                                      title=f'Évolution des Recettes - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
+                                      colors=['#28a745'])
+                fig.update_layout(yaxis_title=f"Recettes (Millions {self.currency_unit()})")
+                self.plotly_chart(fig)
             
             with col2:
                 # Performance par type d'impôt
@@ -818,7 +846,7 @@ class ImpotsDashboard:
                             color='type_impot',
                             color_discrete_sequence=px.colors.qualitative.Set3)
                 fig.update_layout(yaxis_title="Variation (%)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
         
         with tab2:
             col1, col2 = st.columns(2)
@@ -829,7 +857,7 @@ class ImpotsDashboard:
                             names='categorie',
                             title='Répartition des Recettes par Catégorie d\'Impôt',
                             color_discrete_sequence=px.colors.qualitative.Set3)
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
             
             with col2:
                 fig = px.bar(data['current_data'], 
@@ -838,72 +866,143 @@ class ImpotsDashboard:
                             title='Nombre de Contribuables par Catégorie',
                             color_discrete_sequence=px.colors.qualitative.Set3)
                 fig.update_layout(yaxis_title="Nombre de Contribuables")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
         
         with tab3:
+            territory_code = st.session_state.selected_territory
+            scopes = {self.territories[territory_code]['nom_complet']: territory_code, 'Ensemble DROM-COM': None}
+            scope = st.radio("Périmètre:", list(scopes), horizontal=True, key='top_scope')
+            
+            # Classements maintenus à chaque tick : lecture du top 10 sans tri
+            leaderboard = self.get_leaderboard()
+            top_categories = leaderboard.top('montant_mensuel', 10, scopes[scope])
+            top_croissance = leaderboard.top('variation_pct', 10, scopes[scope])
+            if scopes[scope] is None:
+                top_categories['ligne'] = self.leaderboard_labels(top_categories)
+                top_croissance['ligne'] = self.leaderboard_labels(top_croissance)
+                label, unit = 'ligne', currency_symbol(REPORTING_CURRENCY, millions=True)
+            else:
+                label, unit = 'categorie', self.currency_unit(millions=True)
+            
             col1, col2 = st.columns(2)
             
             with col1:
-                top_categories = data['current_data'].nlargest(10, 'montant_mensuel')
                 fig = px.bar(top_categories, 
                             x='montant_mensuel', 
-                            y='categorie',
+                            y=label,
                             orientation='h',
-                            title='Top 10 des Impôts par Recettes Total',
+                            title=f'Top 10 des Impôts par Recettes Total ({unit})',
                             color='montant_mensuel',
                             color_continuous_scale='Greens')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
             
             with col2:
-                top_croissance = data['current_data'].nlargest(10, 'variation_pct')
                 fig = px.bar(top_croissance, 
                             x='variation_pct', 
-                            y='categorie',
+                            y=label,
                             orientation='h',
                             title='Top 10 des Croissances par Catégorie (%)',
                             color='variation_pct',
                             color_continuous_scale='RdYlGn')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
+            st.caption(f"{len(leaderboard)} lignes fiscales classées · {leaderboard.updates:,} repositionnements "
+                       "depuis l'ouverture de la session")
         
         with tab4:
             st.subheader("Analyse par Tranche de Revenu")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig = px.bar(data['revenu_data'], 
-                           x='tranche_revenu', 
-                           y='nombre_contribuables',
-                           title='Nombre de Contribuables par Tranche de Revenu',
-                           color_discrete_sequence=px.colors.qualitative.Set3)
-                st.plotly_chart(fig, config={'displayModeBar': False})
-            
-            with col2:
-                fig = px.line(data['revenu_data'], 
-                            x='tranche_revenu', 
-                            y='montant_moyen_impot',
-                            title='Impôt Moyen par Tranche de Revenu',
-                            color_discrete_sequence=['#28a745'])
-                st.plotly_chart(fig, config={'displayModeBar': False})
-            
-            fig = px.bar(data['revenu_data'], 
+            self.display_revenu_distribution(data)
+    
+    def display_revenu_distribution(self, data):
+        """Tranches, déciles et concentration des revenus lus dans les esquisses de quantiles"""
+        territory_code = st.session_state.selected_territory
+        scopes = {
+            self.territories[territory_code]['nom_complet']: territory_code,
+            'Ensemble des DROM': 'DROM',
+            'Ensemble des COM': 'COM',
+            'Ensemble DROM-COM': None,
+        }
+        scope = st.radio("Périmètre:", list(scopes), horizontal=True, key='revenu_scope')
+        if scopes[scope] == territory_code:
+            sketches = get_distribution_sketches(territory_code, data['token'])
+            revenu_data = data['revenu_data']
+        else:
+            # Agrégat par fusion des esquisses des territoires, sans relire leurs contribuables
+            sketches = get_group_sketches(scopes[scope], data['token'])
+            revenu_data = fiscal_data.revenu_data_from_sketches(sketches)
+        revenu = sketches['revenu']
+        deciles = fiscal_data.distribution_summary(revenu)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Contribuables", f"{len(revenu):,.0f}")
+        with col2:
+            st.metric("Revenu Médian", f"{revenu.quantile(0.5):,.0f}€")
+        with col3:
+            st.metric("Rapport Interdécile D9/D1", f"{revenu.quantile(0.9) / revenu.quantile(0.1):.1f}")
+        with col4:
+            st.metric("Part du Top 1% des Revenus", f"{revenu.top_share(0.01) * 100:.1f}%")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig = px.bar(revenu_data, 
+                       x='tranche_revenu', 
+                       y='nombre_contribuables',
+                       title='Nombre de Contribuables par Tranche de Revenu',
+                       color_discrete_sequence=px.colors.qualitative.Set3)
+            self.plotly_chart(fig)
+        
+        with col2:
+            fig = px.line(revenu_data, 
+                        x='tranche_revenu', 
+                        y='montant_moyen_impot',
+                        title='Impôt Moyen par Tranche de Revenu',
+                        color_discrete_sequence=['#28a745'])
+            self.plotly_chart(fig)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig = px.bar(revenu_data, 
                        x='tranche_revenu', 
                        y='taux_effectif',
                        title='Taux Effectif d\'Imposition par Tranche de Revenu (%)',
                        color_discrete_sequence=px.colors.sequential.Viridis)
-            st.plotly_chart(fig, config={'displayModeBar': False})
-            
-            # CORRECTION: Remplacer use_container_width par width
-            st.dataframe(data['revenu_data'], width='stretch')
+            self.plotly_chart(fig)
+        
+        with col2:
+            fig = px.bar(deciles, 
+                       x='libelle', 
+                       y='valeur',
+                       title='Déciles et Hauts Centiles du Revenu Annuel (€)',
+                       color_discrete_sequence=['#0055A4'])
+            fig.update_layout(xaxis_title="Quantile", yaxis_title="Revenu annuel (€)")
+            self.plotly_chart(fig)
+        
+        st.dataframe(revenu_data, width='stretch')
+        
+        # Distribution des montants payés par contribuable, par catégorie
+        st.subheader(f"Montant Payé par Contribuable ({currency_symbol(sketches['monnaie'])})")
+        payments = pd.DataFrame([
+            {'categorie': code, 'contribuables': len(sketch),
+             **dict(zip(('P10', 'Médiane', 'P90', 'P99'), sketch.quantiles([0.1, 0.5, 0.9, 0.99])))}
+            for code, sketch in sketches['categories'].items() if len(sketch)
+        ])
+        st.dataframe(payments, width='stretch')
+        
+        retained = revenu.size + sketches['impot'].size + sum(sketch.size for sketch in sketches['categories'].values())
+        st.caption(f"Quantiles approchés (esquisses KLL, k={revenu.k}) : {retained:,} valeurs conservées "
+                   f"pour {len(revenu):,} contribuables")
     
     def create_categories_live(self):
         """Affiche les catégories en temps réel"""
         data = self.get_territory_data(st.session_state.selected_territory)
+        unit = self.currency_unit()
         
         st.markdown('<h3 class="section-header">🏢 CATÉGORIES D\'IMPÔTS EN TEMPS RÉEL</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Tableau des Recettes", "Analyse Type d'Impôt", "Simulateur Fiscal"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Tableau des Recettes", "Analyse Type d'Impôt", "Simulateur Fiscal", "Journal des Mises à Jour"])
         
         with tab1:
             col1, col2, col3 = st.columns(3)
@@ -938,6 +1037,26 @@ class ImpotsDashboard:
             elif tri_filtre == 'Taux moyen':
                 categories_filtrees = categories_filtrees.sort_values('taux_moyen', ascending=False)
             
+            # Tendance intrajournalière (tampon circulaire des ticks)
+            ticks = data['ticks']
+            derniers_ticks = st.slider("Derniers ticks analysés:", min_value=2, max_value=TICK_BUFFER_CAPACITY,
+                                       value=min(30, TICK_BUFFER_CAPACITY), key="live_ticks_window")
+            tick_stats = ticks.rolling_stats(derniers_ticks).set_index('categorie')
+            tick_stats['tendance'] = pd.Series(ticks.sparklines('montant_mensuel', derniers_ticks))
+            st.dataframe(
+                tick_stats.loc[categories_filtrees['categorie']].reset_index(),
+                width='stretch',
+                hide_index=True,
+                column_config={
+                    'tendance': st.column_config.LineChartColumn(f"Tendance (M{unit})", width='medium'),
+                    'montant_dernier': st.column_config.NumberColumn(f"Dernier (M{unit})", format="%.2f"),
+                    'montant_min': st.column_config.NumberColumn(f"Min (M{unit})", format="%.2f"),
+                    'montant_max': st.column_config.NumberColumn(f"Max (M{unit})", format="%.2f"),
+                    'variation_moyenne': st.column_config.NumberColumn("Variation moy. (%)", format="%+.2f"),
+                    'volatilite': st.column_config.NumberColumn("Volatilité (%)", format="%.2f"),
+                }
+            )
+            
             # Affichage optimisé
             for _, categorie in categories_filtrees.iterrows():
                 change_class = "positive" if categorie['variation_pct'] > 0 else "negative" if categorie['variation_pct'] < 0 else "neutral"
@@ -950,14 +1069,14 @@ class ImpotsDashboard:
                                unsafe_allow_html=True)
                 with col2:
                     st.markdown(f"**{categorie['nom_complet']}**")
-                    st.markdown(f"Taux moyen: {categorie['taux_moyen']}% | Plafond: {categorie['plafond']:,.0f}€")
+                    st.markdown(f"Taux moyen: {categorie['taux_moyen']}% | Plafond: {categorie['plafond']:,.0f}{unit}")
                 with col3:
-                    st.markdown(f"**{categorie['montant_mensuel']:.1f}M€**")  # Correction: formatage correct
+                    st.markdown(f"**{categorie['montant_mensuel']:.1f}M{unit}**")  # Correction: formatage correct
                     st.markdown(f"Contribuables: {categorie['nombre_contribuables']:,.0f}")
                 with col4:
                     variation_str = f"{categorie['variation_pct']:+.2f}%"
                     st.markdown(f"**{variation_str}**")
-                    st.markdown(f"{categorie['variation_abs']/1e3:+.0f}K€")
+                    st.markdown(f"{categorie['variation_abs'] * 1e3:+.0f}K{unit}")  # Millions → milliers
                 with col5:
                     st.markdown(f"<div class='revenue-change {change_class}'>{variation_str}</div>", 
                                unsafe_allow_html=True)
@@ -983,14 +1102,14 @@ class ImpotsDashboard:
                                 title=f'Performance des Catégories - {type_selectionne}',
                                 color='variation_pct',
                                 color_continuous_scale='RdYlGn')
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plotly_chart(fig)
                 
                 with col2:
                     fig = px.pie(categories_type, 
                                 values='montant_mensuel', 
                                 names='categorie',
                                 title=f'Répartition des Recettes - {type_selectionne}')
-                    st.plotly_chart(fig, config={'displayModeBar': False})
+                    self.plotly_chart(fig)
         
         with tab3:
             st.subheader("Simulateur de Calcul d'Impôt")
@@ -1010,8 +1129,10 @@ class ImpotsDashboard:
             with col3:
                 deductions = st.number_input("Déductions (€):", 
                                           min_value=0.0, value=1000.0)
-                territoire_applicable = st.selectbox("Territoire fiscal:", 
-                                                   [v['nom_complet'] for v in self.territories.values()])
+                territory_codes = list(self.territories)
+                territoire_applicable = st.selectbox("Territoire fiscal:", territory_codes,
+                                                   index=territory_codes.index(st.session_state.selected_territory),
+                                                   format_func=lambda code: self.territories[code]['nom_complet'])
                 calculer = st.button("Calculer l'Impôt")
             
             if calculer:
@@ -1022,30 +1143,53 @@ class ImpotsDashboard:
                 quotient_familial += nombre_enfants * 0.5
                 
                 revenu_imposable = max(0, revenu_annuel - deductions)
-                revenu_par_part = revenu_imposable / quotient_familial
-                
-                # Barème progressif simplifié
-                if revenu_par_part <= 10777:
-                    impot = 0
-                elif revenu_par_part <= 27478:
-                    impot = (revenu_par_part - 10777) * 0.11
-                elif revenu_par_part <= 78570:
-                    impot = (27478 - 10777) * 0.11 + (revenu_par_part - 27478) * 0.30
-                else:
-                    impot = (27478 - 10777) * 0.11 + (78570 - 27478) * 0.30 + (revenu_par_part - 78570) * 0.41
-                
-                impot_total = impot * quotient_familial
+                # Barème et réduction DOM du territoire choisi (matrice des paramètres)
+                impot_brut, reduction, impot_total = get_parameter_matrix().income_tax(
+                    territoire_applicable, revenu_imposable, quotient_familial)
+                taux_effectif = impot_total / revenu_annuel * 100 if revenu_annuel else 0.0
                 
                 st.success(f"""
                 **Résultat du calcul fiscal:**
-                - Territoire: {territoire_applicable}
+                - Territoire: {self.territories[territoire_applicable]['nom_complet']}
                 - Revenu annuel: {revenu_annuel:,.2f}€
                 - Revenu imposable: {revenu_imposable:,.2f}€
                 - Quotient familial: {quotient_familial}
+                - Impôt brut (barème): {impot_brut:,.2f}€
+                - Réduction territoriale: {reduction:,.2f}€
                 - **Impôt annuel estimé: {impot_total:,.2f}€**
-                - Taux effectif: {(impot_total/revenu_annuel)*100:.1f}%
+                - Taux effectif: {taux_effectif:.1f}%
                 - Mensualité: {impot_total/12:,.2f}€
                 """)
+        
+        with tab4:
+            live = data['live']
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Version des données", live.version)
+            with col2:
+                st.metric("Modifications journalisées", len(live.log))
+            with col3:
+                st.metric("Dernière mise à jour", live.last_update.strftime('%H:%M:%S'))
+            
+            if live.version == 0:
+                st.info("Aucune mise à jour depuis le chargement. Utilisez 🔄 Actualiser les données.")
+            else:
+                champ_filtre = st.selectbox("Champ:", ['Tous'] + list(live.fields), key="change_log_field")
+                change_log = live.log.to_frame(champ=None if champ_filtre == 'Tous' else champ_filtre)
+                st.dataframe(change_log.iloc[::-1], width='stretch', hide_index=True)
+                
+                # Rejeu de l'état des catégories à une version donnée
+                if live.version > live.oldest_replayable_version:
+                    version_rejeu = st.slider(
+                        "Rejouer l'état à la version:",
+                        min_value=live.oldest_replayable_version,
+                        max_value=live.version,
+                        value=live.version
+                    )
+                else:
+                    version_rejeu = live.version
+                st.dataframe(live.replay(version_rejeu), width='stretch', hide_index=True)
     
     def create_categorie_analysis(self):
         """Analyse par catégorie détaillée"""
@@ -1054,7 +1198,8 @@ class ImpotsDashboard:
         st.markdown('<h3 class="section-header">📊 ANALYSE PAR TYPE D\'IMPÔT DÉTAILLÉE</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Performance par Type", "Comparaison Types", "Tendances Fiscales"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Performance par Type", "Comparaison Types", "Tendances Fiscales",
+                                          "Exploration Hiérarchique"])
         
         with tab1:
             type_performance = data['current_data'].groupby('type_impot').agg({
@@ -1073,7 +1218,7 @@ class ImpotsDashboard:
                             title='Performance Moyenne par Type d\'Impôt (%)',
                             color='variation_pct',
                             color_continuous_scale='RdYlGn')
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
             
             with col2:
                 fig = px.scatter(type_performance, 
@@ -1084,22 +1229,24 @@ class ImpotsDashboard:
                                title='Performance vs Recettes par Type d\'Impôt',
                                hover_name='type_impot',
                                size_max=60)
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
         
         with tab2:
-            type_evolution = data['historical_data'].groupby([
-                data['historical_data']['date'].dt.to_period('M').dt.to_timestamp(),
+            history_window = self.get_history_window(data)
+            type_evolution = history_window.groupby([
+                history_window['date'].dt.to_period('M').dt.to_timestamp(),
                 'type_impot'
             ])['montant_total_impots'].sum().reset_index()
+            type_evolution = self.downsample(type_evolution, 'date', 'montant_total_impots', group='type_impot')
             
-            fig = px.line(type_evolution, 
-                         x='date', 
-                         y='montant_total_impots',
-                         color='type_impot',
-                         title=f'Évolution Comparative par Type - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
-                         color_discrete_sequence=px.colors.qualitative.Set3)
-            fig.update_layout(yaxis_title="Recettes Fiscales (€)")
-            st.plotly_chart(fig, config={'displayModeBar': False})
+            fig = self.line_chart(type_evolution, 
+                                  x='date', 
+                                  y='montant_total_impots',
+                                  color='type_impot',
+                                  title=f'Évolution Comparative par Type - {self.territories[st.session_state.selected_territory]["nom_complet"]}',
+                                  colors=px.colors.qualitative.Set3)
+            fig.update_layout(yaxis_title=f"Recettes Fiscales ({self.currency_unit()})")
+            self.plotly_chart(fig)
         
         with tab3:
             st.subheader("Tendances et Perspectives Fiscales")
@@ -1145,6 +1292,43 @@ class ImpotsDashboard:
                 - Mesures d'allègement
                 - Concurrence fiscale
                 """)
+        
+        with tab4:
+            self.display_hierarchy_explorer(data['hierarchy'])
+    
+    def display_hierarchy_explorer(self, tree):
+        """Exploration type → sous-catégorie → catégorie → mois sur l'arbre d'agrégats précalculé"""
+        st.caption(f"Recettes cumulées depuis 2015, mois en cours ({tree.live_period}) alimenté en temps réel")
+        
+        # Chaque niveau déplié est une lecture des enfants du nœud sélectionné
+        path = ()
+        columns = st.columns([1, 1, 1, 1])
+        for column, (label, key) in zip(columns[:3], [("Type d'impôt:", 'type'),
+                                                     ("Sous-catégorie:", 'sous_categorie'),
+                                                     ("Catégorie:", 'categorie')]):
+            with column:
+                options = tree.children(path)['noeud'].tolist()
+                choice = st.selectbox(label, ['Tous'] + options, key=f"hierarchy_{key}")
+            if choice == 'Tous':
+                break
+            path = path + (choice,)
+        with columns[3]:
+            representation = st.radio("Représentation:", ["Sunburst", "Treemap"], horizontal=True,
+                                      key="hierarchy_chart")
+        
+        nodes = tree.to_plotly(root=path, max_depth=min(3, 4 - len(path)))
+        trace = go.Sunburst if representation == "Sunburst" else go.Treemap
+        fig = go.Figure(trace(**nodes, branchvalues='remainder', maxdepth=3,
+                              hovertemplate=f'%{{label}}<br>%{{value:,.1f}} {self.currency_unit(True)}<extra></extra>'))
+        fig.update_layout(title=' / '.join(('Total',) + path), margin=dict(t=50, l=0, r=0, b=0), height=550)
+        self.plotly_chart(fig)
+        
+        children = tree.children(path)
+        if len(path) < 3:
+            children = children.sort_values('montant', ascending=False)
+        else:
+            children = children.iloc[::-1]  # Mois les plus récents en premier
+        st.dataframe(children.round(2), width='stretch', hide_index=True)
     
     def create_evolution_analysis(self):
         """Analyse de l'évolution des recettes fiscales"""
@@ -1159,19 +1343,22 @@ class ImpotsDashboard:
             col1, col2 = st.columns(2)
             
             with col1:
-                cumulative_data = data['historical_data'].copy()
+                cumulative_data = self.get_history_window(data).copy()
                 cumulative_data['date_group'] = cumulative_data['date'].dt.to_period('M').dt.to_timestamp()
                 
                 # Create cumulative sum chart
-                fig = px.line(
-                    cumulative_data.groupby('date_group')['montant_total_impots'].sum().reset_index(),
+                fig = self.line_chart(
+                    self.downsample(
+                        cumulative_data.groupby('date_group')['montant_total_impots'].sum().reset_index(),
+                        'date_group', 'montant_total_impots'
+                    ),
                     x='date_group',
                     y='montant_total_impots',
                     title='Évolution Cumulative des Recettes Fiscales',
-                    color_discrete_sequence=['#28a745']
+                    colors=['#28a745']
                 )
-                fig.update_layout(yaxis_title="Recettes Cumulatives (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                fig.update_layout(yaxis_title=f"Recettes Cumulatives ({self.currency_unit()})")
+                self.plotly_chart(fig)
             
             with col2:
                 # Year over year comparison
@@ -1187,82 +1374,69 @@ class ImpotsDashboard:
                     title='Comparaison Annuelle par Catégorie d\'Impôt',
                     color_discrete_sequence=px.colors.qualitative.Set3
                 )
-                fig.update_layout(yaxis_title="Recettes Annuelles (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                fig.update_layout(yaxis_title=f"Recettes Annuelles ({self.currency_unit()})")
+                self.plotly_chart(fig)
         
         with tab2:
             st.subheader("Projections Économiques")
             
-            col1, col2 = st.columns(2)
+            projection_mode = st.radio("Mode de projection:", ["Trajectoire unique", "Monte Carlo (éventail)"],
+                                       horizontal=True, key='projection_mode')
+            if projection_mode == "Monte Carlo (éventail)":
+                self.display_monte_carlo_projection(data)
+            else:
+                col1, col2 = st.columns(2)
             
-            with col1:
-                # Create projection data
-                projection_years = 5
-                last_date = data['historical_data']['date'].max()
-                projection_dates = pd.date_range(
-                    start=last_date + pd.DateOffset(months=1),
-                    periods=projection_years * 12,
-                    freq='M'
-                )
-                
-                projection_data = []
-                for date in projection_dates:
-                    for categorie_code, categorie_info in data['categories'].items():
-                        # Base projection with growth factor
-                        growth_factor = 1.0 + (categorie_info['evolution_annuelle'] / 100) / 12
-                        base_amount = categorie_info['montant_annuel'] / 12
-                        projected_amount = base_amount * growth_factor * random.uniform(0.95, 1.05)
-                        
-                        projection_data.append({
-                            'date': date,
-                            'categorie': categorie_code,
-                            'montant_total_impots': projected_amount,
-                            'type': 'projection'
-                        })
-                
-                projection_df = pd.DataFrame(projection_data)
+                with col1:
+                    # Create projection data
+                    projection_df = fiscal_data.project_revenues(
+                        st.session_state.selected_territory,
+                        data['categories'],
+                        data['historical_data']['date'].max(),
+                        projection_years=5
+                    )
                 
-                # Combine historical and projection data
-                historical_for_projection = data['historical_data'].copy()
-                historical_for_projection['type'] = 'historical'
+                    # Combine historical and projection data
+                    historical_for_projection = data['historical_data'].copy()
+                    historical_for_projection['type'] = 'historical'
                 
-                combined_data = pd.concat([
-                    historical_for_projection[['date', 'categorie', 'montant_total_impots', 'type']],
-                    projection_df
-                ])
+                    combined_data = pd.concat([
+                        historical_for_projection[['date', 'categorie', 'montant_total_impots', 'type']],
+                        projection_df
+                    ])
                 
-                # Plot projection
-                fig = px.line(
-                    combined_data.groupby(['date', 'type'])['montant_total_impots'].sum().reset_index(),
-                    x='date',
-                    y='montant_total_impots',
-                    color='type',
-                    title='Projection des Recettes Fiscales (5 ans)',
-                    color_discrete_map={'historical': '#28a745', 'projection': '#dc3545'}
-                )
-                fig.update_layout(yaxis_title="Recettes (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                    # Plot projection
+                    fig = self.line_chart(
+                        self.downsample(
+                            combined_data.groupby(['date', 'type'])['montant_total_impots'].sum().reset_index(),
+                            'date', 'montant_total_impots', group='type'
+                        ),
+                        x='date',
+                        y='montant_total_impots',
+                        color='type',
+                        title='Projection des Recettes Fiscales (5 ans)',
+                        colors={'historical': '#28a745', 'projection': '#dc3545'}
+                    )
+                    fig.update_layout(yaxis_title=f"Recettes ({self.currency_unit()})")
+                    self.plotly_chart(fig)
             
-            with col2:
-                # Projection by category
-                category_projection = projection_df.groupby('categorie')['montant_total_impots'].sum().reset_index()
+                with col2:
+                    # Projection by category
+                    category_projection = projection_df.groupby('categorie')['montant_total_impots'].sum().reset_index()
                 
-                fig = px.bar(
-                    category_projection,
-                    x='categorie',
-                    y='montant_total_impots',
-                    title='Projection par Catégorie (5 ans)',
-                    color_discrete_sequence=px.colors.qualitative.Set3
-                )
-                fig.update_layout(yaxis_title="Recettes Projetées (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                    fig = px.bar(
+                        category_projection,
+                        x='categorie',
+                        y='montant_total_impots',
+                        title='Projection par Catégorie (5 ans)',
+                        color_discrete_sequence=px.colors.qualitative.Set3
+                    )
+                    fig.update_layout(yaxis_title=f"Recettes Projetées ({self.currency_unit()})")
+                    self.plotly_chart(fig)
         
         with tab3:
             st.subheader("Impact des Réformes Fiscales")
             
-            # Create reform impact visualization
-            reform_data = []
-            
             # Define some reform scenarios
             reforms = [
                 {'name': 'Réforme 2018', 'date': '2018-01-01', 'impact': 1.1, 'description': 'Réforme fiscale majeure'},
@@ -1271,65 +1445,160 @@ class ImpotsDashboard:
                 {'name': 'Transition Écologique', 'date': '2022-01-01', 'impact': 1.03, 'description': 'Taxes vertes'}
             ]
             
-            for reform in reforms:
-                reform_date = pd.to_datetime(reform['date'])
-                before_period = data['historical_data'][
-                    (data['historical_data']['date'] >= reform_date - pd.DateOffset(months=6)) &
-                    (data['historical_data']['date'] < reform_date)
-                ]['montant_total_impots'].mean()
-                
-                after_period = data['historical_data'][
-                    (data['historical_data']['date'] >= reform_date) &
-                    (data['historical_data']['date'] < reform_date + pd.DateOffset(months=6))
-                ]['montant_total_impots'].mean()
-                
-                if before_period > 0:
-                    actual_impact = after_period / before_period
-                else:
-                    actual_impact = 1.0
-                
-                reform_data.append({
-                    'reform': reform['name'],
-                    'date': reform['date'],
-                    'planned_impact': reform['impact'],
-                    'actual_impact': actual_impact,
-                    'description': reform['description']
-                })
+            # Réformes ajoutées par l'utilisateur
+            with st.form("custom_reform_form", clear_on_submit=True):
+                col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+                with col1:
+                    custom_name = st.text_input("Nom de la réforme:")
+                with col2:
+                    custom_date = st.date_input(
+                        "Date d'effet:",
+                        value=data['date_index'].max_date.date() - timedelta(days=365),
+                        min_value=data['date_index'].min_date.date(),
+                        max_value=data['date_index'].max_date.date()
+                    )
+                with col3:
+                    custom_impact = st.number_input("Impact prévu:", min_value=0.5, max_value=1.5, value=1.0, step=0.01)
+                with col4:
+                    st.write("")
+                    submitted = st.form_submit_button("Ajouter la réforme")
+                custom_name = custom_name.strip()
+                # Le nom identifie la réforme dans l'étude d'événements : pas de doublon
+                if submitted and custom_name in {reform['name'] for reform in reforms + st.session_state.custom_reforms}:
+                    st.warning(f"Une réforme nommée « {custom_name} » existe déjà.")
+                elif submitted and custom_name:
+                    st.session_state.custom_reforms.append({
+                        'name': custom_name,
+                        'date': custom_date.isoformat(),
+                        'impact': custom_impact,
+                        'description': 'Réforme personnalisée'
+                    })
+            reforms = reforms + st.session_state.custom_reforms
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                categories_etude = st.multiselect(
+                    "Catégories étudiées:",
+                    options=list(data['event_study'].categories),
+                    default=list(data['event_study'].categories),
+                    key="reform_categories"
+                )
+            with col2:
+                fenetre_mois = st.slider("Fenêtre (mois):", min_value=1, max_value=24, value=6, key="reform_window")
             
-            reform_df = pd.DataFrame(reform_data)
+            if not categories_etude:
+                st.info("Sélectionnez au moins une catégorie.")
+                return
+            
+            # Fenêtres avant/après par sommes cumulées (pas de balayage de l'historique)
+            impacts = data['event_study'].reform_impacts(reforms, fenetre_mois, categories_etude)
+            totals = impacts[impacts['categorie'] == TOTAL].reset_index(drop=True)
+            reform_df = pd.DataFrame(reforms).rename(columns={'name': 'reform', 'impact': 'planned_impact'})
+            reform_df['actual_impact'] = totals['impact']
+            reform_df['ic_bas'] = totals['ic_bas']
+            reform_df['ic_haut'] = totals['ic_haut']
             
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.bar(
-                    reform_df,
-                    x='reform',
-                    y=['planned_impact', 'actual_impact'],
-                    title='Impact des Réformes Fiscales',
+                fig = go.Figure([
+                    go.Bar(name='planned_impact', x=reform_df['reform'], y=reform_df['planned_impact'],
+                           marker_color='#28a745'),
+                    go.Bar(name='actual_impact', x=reform_df['reform'], y=reform_df['actual_impact'],
+                           marker_color='#dc3545',
+                           error_y=dict(type='data', symmetric=False,
+                                        array=reform_df['ic_haut'] - reform_df['actual_impact'],
+                                        arrayminus=reform_df['actual_impact'] - reform_df['ic_bas']))
+                ])
+                fig.update_layout(
+                    title='Impact des Réformes Fiscales (IC 95%)',
                     barmode='group',
-                    color_discrete_map={
-                        'planned_impact': '#28a745',
-                        'actual_impact': '#dc3545'
-                    }
+                    yaxis_title="Facteur d'Impact (1.0 = pas de changement)"
                 )
-                fig.update_layout(yaxis_title="Facteur d'Impact (1.0 = pas de changement)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
             
             with col2:
                 # CORRECTION: Remplacer use_container_width par width
                 st.dataframe(
-                    reform_df[['reform', 'date', 'description', 'planned_impact', 'actual_impact']],
+                    reform_df[['reform', 'date', 'description', 'planned_impact', 'actual_impact', 'ic_bas', 'ic_haut']],
                     width='stretch'
                 )
+            
+            # Impact par catégorie
+            per_category = impacts[impacts['categorie'] != TOTAL].pivot(index='reform', columns='categorie', values='impact')
+            fig = px.imshow(
+                per_category.reindex(reform_df['reform']),
+                color_continuous_scale='RdYlGn',
+                color_continuous_midpoint=1.0,
+                text_auto='.3f',
+                aspect='auto',
+                title=f'Impact par Catégorie (moyenne {fenetre_mois} mois après / avant)'
+            )
+            self.plotly_chart(fig)
+    
+    def display_monte_carlo_projection(self, data):
+        """Éventail de projection : percentiles du total mensuel sur des milliers de trajectoires"""
+        col1, col2 = st.columns(2)
+        with col1:
+            paths = st.select_slider("Nombre de trajectoires:", options=[1000, 2000, 5000, 10000, 20000],
+                                     value=DEFAULT_PATHS, key='mc_paths')
+        with col2:
+            volatility = st.slider("Volatilité mensuelle (%):", 0.5, 5.0, MONTHLY_VOLATILITY * 100, 0.5,
+                                   key='mc_volatility') / 100
+        
+        projection = get_monte_carlo_projection(st.session_state.selected_territory, data['token'], paths, volatility)
+        unit = self.currency_unit(True)
+        bands = projection['bands']
+        history = data['historical_data'].groupby('date')['montant_total_impots'].sum().tail(36)
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=history.index, y=history.values, name='Historique',
+                                     line=dict(color='#28a745')))
+            for low, high, opacity in (('p5', 'p95', 0.15), ('p25', 'p75', 0.3)):
+                fig.add_trace(go.Scatter(x=bands['date'], y=bands[high], line=dict(width=0),
+                                         showlegend=False, hoverinfo='skip'))
+                fig.add_trace(go.Scatter(x=bands['date'], y=bands[low], line=dict(width=0), fill='tonexty',
+                                         fillcolor=f'rgba(220, 53, 69, {opacity})', name=f'{low[1:]}-{high[1:]}e centile'))
+            fig.add_trace(go.Scatter(x=bands['date'], y=bands['p50'], name='Médiane',
+                                     line=dict(color='#dc3545', dash='dash')))
+            fig.update_layout(title='Éventail de Projection des Recettes (5 ans)',
+                              yaxis_title=f"Recettes mensuelles ({unit})")
+            self.plotly_chart(fig)
+        
+        with col2:
+            categories = projection['categories']
+            fig = go.Figure(go.Bar(
+                x=categories['categorie'], y=categories['p50'], marker_color='#0055A4',
+                error_y=dict(type='data', symmetric=False,
+                             array=categories['p95'] - categories['p50'],
+                             arrayminus=categories['p50'] - categories['p5'])
+            ))
+            fig.update_layout(title='Cumul Projeté par Catégorie (médiane, 5e-95e centile)',
+                              yaxis_title=f"Recettes Projetées ({unit})")
+            self.plotly_chart(fig)
+        
+        horizon = bands.iloc[-1]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Médiane à 5 ans (mensuel)", f"{horizon['p50']:,.1f}{unit}")
+        with col2:
+            st.metric("Scénario bas (5e centile)", f"{horizon['p5']:,.1f}{unit}")
+        with col3:
+            st.metric("Scénario haut (95e centile)", f"{horizon['p95']:,.1f}{unit}")
+        st.caption(f"{projection['paths']:,} trajectoires × {len(bands)} mois × {len(categories)} catégories "
+                   f"simulées en {projection['elapsed']:.2f}s")
     
     def create_territory_comparison(self):
         """Crée la vue de comparaison entre territoires"""
         st.markdown('<h3 class="section-header">🌍 COMPARAISON INTER-TERRITOIRES</h3>', 
                    unsafe_allow_html=True)
         
-        comparison_data = generate_comparison_data(self.territories)
+        comparison_data = generate_comparison_data(data_token())
         
-        tab1, tab2, tab3 = st.tabs(["Vue d'Ensemble", "Comparaison Détaillée", "Classements"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Vue d'Ensemble", "Comparaison Détaillée", "Classements", "Évolution Comparée"])
         
         with tab1:
             col1, col2 = st.columns(2)
@@ -1344,7 +1613,7 @@ class ImpotsDashboard:
                     color_discrete_map={'DROM': '#28a745', 'COM': '#dc3545'}
                 )
                 fig.update_layout(yaxis_title="Recettes Fiscales (M€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
             
             with col2:
                 fig = px.bar(
@@ -1356,7 +1625,7 @@ class ImpotsDashboard:
                     color_discrete_map={'DROM': '#28a745', 'COM': '#dc3545'}
                 )
                 fig.update_layout(yaxis_title="Recettes par Habitant (€)")
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
         
         with tab2:
             selected_territories = st.multiselect(
@@ -1379,28 +1648,78 @@ class ImpotsDashboard:
                     color='type',
                     color_discrete_map={'DROM': '#28a745', 'COM': '#dc3545'}
                 )
-                st.plotly_chart(fig, config={'displayModeBar': False})
+                self.plotly_chart(fig)
                 
                 # CORRECTION: Remplacer use_container_width par width
                 st.dataframe(filtered_data, width='stretch')
         
         with tab3:
+            rankings = get_comparison_rankings(data_token())
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Classement par Recettes Totales")
-                top_recettes = comparison_data.sort_values('recettes_fiscales_total', ascending=False)
                 # CORRECTION: Remplacer use_container_width par width
-                st.dataframe(top_recettes[['nom_complet', 'type', 'recettes_fiscales_total']], width='stretch')
+                st.dataframe(rankings['recettes_fiscales_total'], width='stretch')
             
             with col2:
                 st.subheader("Classement par Recettes par Habitant")
-                top_par_habitant = comparison_data.sort_values('recettes_par_habitant', ascending=False)
                 # CORRECTION: Remplacer use_container_width par width
-                st.dataframe(top_par_habitant[['nom_complet', 'type', 'recettes_par_habitant']], width='stretch')
+                st.dataframe(rankings['recettes_par_habitant'], width='stretch')
+            
+            st.subheader("Lignes Fiscales en Plus Forte Croissance (DROM-COM, temps réel)")
+            top_croissance = self.get_leaderboard().top('variation_pct', 20)
+            top_croissance.insert(1, 'territoire_nom', top_croissance['territoire'].map(
+                {code: info['nom_complet'] for code, info in self.territories.items()}
+            ))
+            st.dataframe(top_croissance.drop(columns='territoire'), width='stretch', hide_index=True)
+        
+        with tab4:
+            token = data_token()
+            store = get_historical_store(token)
+            territory_names = {code: self.territories[code]['nom_complet'] for code in store.codes}
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                selected_codes = st.multiselect(
+                    "Territoires à comparer:",
+                    options=store.codes,
+                    default=[st.session_state.selected_territory, 'GUADELOUPE'] if st.session_state.selected_territory != 'GUADELOUPE' else ['GUADELOUPE', 'REUNION'],
+                    format_func=territory_names.get,
+                    key="comparison_timeseries_territories"
+                )
+            with col2:
+                per_capita = st.checkbox("Par habitant", value=False)
+            
+            if selected_codes:
+                # Une seule agrégation vectorisée sur l'historique consolidé
+                monthly_totals = get_monthly_totals(token)[selected_codes]
+                start, end = st.session_state.get('time_window', (None, None))
+                monthly_totals = monthly_totals.loc[start:end]
+                
+                unit = "M€"
+                if per_capita:
+                    populations = pd.Series({code: self.territories[code]['population'] for code in selected_codes})
+                    monthly_totals = monthly_totals * 1e6 / populations
+                    unit = "€ / habitant"
+                
+                long_format = monthly_totals.rename(columns=territory_names).rename_axis(columns='territoire').stack().rename('montant').reset_index()
+                fig = self.line_chart(
+                    self.downsample(long_format, 'date', 'montant', group='territoire'),
+                    x='date',
+                    y='montant',
+                    color='territoire',
+                    title='Évolution Mensuelle Comparée des Recettes Fiscales',
+                    colors=px.colors.qualitative.Set2
+                )
+                fig.update_layout(yaxis_title=f"Recettes mensuelles ({unit})")
+                self.plotly_chart(fig)
     
     def run(self):
         """Exécute le dashboard"""
+        # Activité de la session et nettoyage des sessions inactives
+        self.track_session()
+        
         # Affichage de l'en-tête
         self.display_header()
         
@@ -1412,6 +1731,15 @@ class ImpotsDashboard:
             self.update_live_data(st.session_state.selected_territory)
             st.success("Données actualisées avec succès!")
         
+        # Période affichée et réduction des points
+        self.display_time_controls()
+        
+        # Export de tous les territoires
+        self.display_export_panel()
+        
+        # Carte des territoires
+        self.create_map_view()
+        
         # Affichage des métriques clés
         self.display_key_metrics()
         
@@ -1430,6 +1758,12 @@ class ImpotsDashboard:
         # Comparaison entre territoires
         self.create_territory_comparison()
         
+        # Taille des figures envoyées (si demandé)
+        self.display_figure_size_report()
+        
+        # Empreinte mémoire de la session
+        self.display_session_memory()
+        
         # Footer
         st.markdown("---")
         st.markdown("© 2023 Dashboard Impôts DROM-COM - Données simulées à des fins de démonstration")
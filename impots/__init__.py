@@ -0,0 +1 @@
+"""Couche données et traitements du Dashboard Impôts DROM-COM (sans dépendance Streamlit)"""
@@ -0,0 +1,3 @@
+from impots.cli import main
+
+main()
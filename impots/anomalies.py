@@ -0,0 +1,162 @@
+"""Détection d'anomalies sur les recettes historiques et les ticks temps réel
+
+Chaque catégorie dispose d'estimateurs robustes mis à jour en O(1) par
+observation : localisation et dispersion de Huber exponentiellement pondérées
+(les observations aberrantes n'ont qu'une influence bornée, comme pour
+médiane/MAD, sans conserver de fenêtre). Pour l'historique mensuel, une
+composante saisonnière par mois calendaire est retirée avant le calcul du score.
+Tous les états sont des tableaux NumPy indexés par catégorie : une observation
+de toutes les catégories se traite en une seule opération vectorisée.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLD = 3.5   # |z| au-delà duquel une observation est signalée
+DEFAULT_ALPHA = 0.1       # poids des nouvelles observations
+DEFAULT_WARMUP = 12       # observations minimales avant de signaler
+HUBER_CLIP = 3.0          # écrêtage des écarts (en unités d'écart-type estimé)
+MEAN_ABS_TO_STD = 1.2533  # écart absolu moyen -> écart-type (loi normale)
+
+
+class RobustScorer:
+    """Localisation/dispersion robustes incrémentales pour n séries en parallèle"""
+
+    def __init__(self, n_series, alpha=DEFAULT_ALPHA, warmup=DEFAULT_WARMUP):
+        self.alpha = alpha
+        self.warmup = warmup
+        self.location = np.zeros(n_series)
+        self.dispersion = np.zeros(n_series)
+        self.count = np.zeros(n_series, dtype=np.int64)
+
+    def scale(self):
+        """Écart-type robuste estimé (jamais nul)"""
+        floor = 1e-6 * np.maximum(np.abs(self.location), 1.0)
+        return np.maximum(MEAN_ABS_TO_STD * self.dispersion, floor)
+
+    def score(self, values, mask=None):
+        """Score z de chaque observation puis mise à jour des estimateurs
+
+        Retourne NaN pour les séries non observées (mask) ou encore en période d'apprentissage.
+        """
+        values = np.asarray(values, dtype=float)
+        observed = ~np.isnan(values) if mask is None else (np.asarray(mask, dtype=bool) & ~np.isnan(values))
+
+        deviation = values - self.location
+        scale = self.scale()
+        scores = np.where(observed & (self.count >= self.warmup), deviation / scale, np.nan)
+
+        # Apprentissage : moyennes simples ; ensuite : pas de Huber pondérés (écarts écrêtés)
+        learning = self.count < self.warmup
+        weight = np.where(learning, 1.0 / (self.count + 1), self.alpha)
+        limit = np.where(learning, np.inf, HUBER_CLIP * scale)
+
+        new_location = self.location + weight * np.clip(deviation, -limit, limit)
+        new_dispersion = self.dispersion + weight * (np.minimum(np.abs(deviation), limit) - self.dispersion)
+
+        self.location = np.where(observed, new_location, self.location)
+        self.dispersion = np.where(observed, new_dispersion, self.dispersion)
+        self.count = self.count + observed
+        return scores
+
+
+class SeasonalScorer:
+    """Scores robustes sur résidus désaisonnalisés (composante par mois calendaire)"""
+
+    def __init__(self, n_series, alpha=DEFAULT_ALPHA, warmup=DEFAULT_WARMUP, period=12):
+        self.alpha = alpha
+        self.period = period
+        self.seasonal = np.zeros((period, n_series))
+        self.seasonal_count = np.zeros((period, n_series), dtype=np.int64)
+        self.level = RobustScorer(n_series, alpha, warmup)
+        self.residuals = RobustScorer(n_series, alpha, warmup)
+
+    def score(self, values, season, mask=None):
+        """Score des observations d'une même saison (ex : mois 0-11)"""
+        values = np.asarray(values, dtype=float)
+        observed = ~np.isnan(values) if mask is None else (np.asarray(mask, dtype=bool) & ~np.isnan(values))
+
+        seasonal = self.seasonal[season]
+        scores = self.residuals.score(values - seasonal - self.level.location, observed)
+
+        # Mise à jour du niveau (désaisonnalisé) puis de la composante saisonnière
+        self.level.score(values - seasonal, observed)
+        weight = np.maximum(self.alpha, 1.0 / (self.seasonal_count[season] + 1))
+        offset = values - self.level.location
+        self.seasonal[season] = np.where(observed, seasonal + weight * (offset - seasonal), seasonal)
+        self.seasonal_count[season] += observed
+        return scores
+
+
+class AnomalyDetector:
+    """Détecteur d'anomalies d'un territoire : historique mensuel et ticks temps réel"""
+
+    ALERT_COLUMNS = ('horodatage', 'territoire', 'categorie', 'source', 'valeur', 'score')
+
+    def __init__(self, territory_code, categories, threshold=DEFAULT_THRESHOLD,
+                 alpha=DEFAULT_ALPHA, warmup=DEFAULT_WARMUP, max_alerts=200):
+        self.territory_code = territory_code
+        self.categories = list(categories)
+        self.threshold = threshold
+        self._rows = {categorie: row for row, categorie in enumerate(self.categories)}
+
+        self.historical = SeasonalScorer(len(self.categories), alpha, warmup)
+        self.live = RobustScorer(len(self.categories), alpha, warmup)
+        self.alerts = deque(maxlen=max_alerts)
+
+        # Dernier score connu par catégorie et par source
+        self.last_scores = {
+            'historique': np.full(len(self.categories), np.nan),
+            'temps réel': np.full(len(self.categories), np.nan),
+        }
+
+    def _align(self, frame, value_column, key='categorie'):
+        """Valeurs d'une table alignées sur l'ordre des catégories du détecteur"""
+        values = np.full(len(self.categories), np.nan)
+        rows = frame[key].map(self._rows)
+        known = rows.notna().to_numpy()
+        values[rows[known].astype(np.int64).to_numpy()] = frame[value_column].to_numpy(dtype=float)[known]
+        return values
+
+    def _record(self, source, timestamp, values, scores):
+        self.last_scores[source] = np.where(np.isnan(scores), self.last_scores[source], scores)
+        for row in np.flatnonzero(np.abs(np.nan_to_num(scores)) >= self.threshold):
+            self.alerts.append((pd.Timestamp(timestamp), self.territory_code, self.categories[row],
+                                source, float(values[row]), float(scores[row])))
+
+    def observe_month(self, date, monthly_values):
+        """Observe un mois d'historique (tableau aligné sur les catégories)"""
+        date = pd.Timestamp(date)
+        scores = self.historical.score(monthly_values, date.month - 1)
+        self._record('historique', date, monthly_values, scores)
+        return scores
+
+    def observe_history(self, historical_data, value_column='montant_total_impots'):
+        """Observe tout un historique, mois par mois dans l'ordre chronologique"""
+        monthly = historical_data.pivot_table(index='date', columns='categorie', values=value_column, aggfunc='sum')
+        monthly = monthly.reindex(columns=self.categories).sort_index()
+        for date, values in zip(monthly.index, monthly.to_numpy()):
+            self.observe_month(date, values)
+
+    def observe_tick(self, current_data, timestamp, changed_categories=None, value_column='variation_pct'):
+        """Observe un tick temps réel ; seules les catégories modifiées sont scorées si précisé"""
+        values = self._align(current_data, value_column)
+        mask = None
+        if changed_categories is not None:
+            mask = np.isin(np.array(self.categories, dtype=object), list(changed_categories))
+        scores = self.live.score(values, mask)
+        self._record('temps réel', timestamp, values, scores)
+        return scores
+
+    def flagged(self):
+        """Catégories dont le dernier score dépasse le seuil (toutes sources)"""
+        rows = []
+        for source, scores in self.last_scores.items():
+            for row in np.flatnonzero(np.abs(np.nan_to_num(scores)) >= self.threshold):
+                rows.append({'categorie': self.categories[row], 'source': source, 'score': float(scores[row])})
+        return pd.DataFrame(rows, columns=['categorie', 'source', 'score'])
+
+    def alert_frame(self):
+        """Historique borné des alertes, plus récentes en premier"""
+        return pd.DataFrame(list(self.alerts)[::-1], columns=self.ALERT_COLUMNS)
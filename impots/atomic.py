@@ -0,0 +1,23 @@
+"""Écriture atomique des fichiers lus par d'autres processus (stockage disque, cache partagé, pages publiées)
+
+Le contenu est écrit dans un fichier temporaire du même répertoire puis
+renommé (os.replace, atomique sur un même système de fichiers) : un lecteur
+voit l'ancienne ou la nouvelle version, jamais un fichier partiel.
+"""
+from contextlib import contextmanager
+import os
+import threading
+
+
+@contextmanager
+def atomic_path(path):
+    """Chemin temporaire à écrire, renommé en path à la sortie du bloc (supprimé en cas d'erreur)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Propre au processus et au thread : deux écritures concurrentes ne partagent pas de fichier temporaire
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,259 @@
+"""Traitements par lots en ligne de commande (sans serveur Streamlit)
+
+Exemples :
+    python -m impots warm                  # préchauffe le stockage disque
+    python -m impots refresh --territoires REUNION MAYOTTE
+    python -m impots kpi
+    python -m impots validate               # contrôles des tables (code retour 1 si erreur)
+    python -m impots project --territoire GUYANE --annees 3
+    python -m impots project --monte-carlo 10000 --workers 4
+    python -m impots export --out export --excel
+    python -m impots loadtest --sessions 8 --actions 10
+    python -m impots publish --out site --interval 900 --serve 8080
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+from impots import data
+from impots.disk_store import DiskStore
+from impots.currency import REPORTING_CURRENCY, symbol
+from impots.kpi import kpi_table
+from impots.montecarlo import MONTHLY_VOLATILITY, monte_carlo_projections
+from impots.seeding import data_token
+from impots.validation import validate_frame
+
+
+def _active_codes(territories, requested=None):
+    """Codes demandés, ou tous les territoires actifs"""
+    codes = requested or [code for code, info in territories.items() if info['impots_actif']]
+    unknown = [code for code in codes if code not in territories]
+    if unknown:
+        raise SystemExit(f"Territoire(s) inconnu(s): {', '.join(unknown)}")
+    return codes
+
+
+def cmd_warm(args, force=False):
+    """Génère l'historique des territoires absents ou périmés du stockage disque"""
+    territories = data.get_territories_definitions()
+    store = DiskStore(args.store)
+    store.prune()
+
+    for territory_code in _active_codes(territories, args.territoires):
+        if force:
+            store.clear(territory_code)
+        if store.is_fresh(territory_code, 'historical_data'):
+            print(f"{territory_code}: à jour")
+            continue
+
+        start = time.perf_counter()
+        data.load_historical_data(territory_code, data.get_categories_impots(territory_code), store)
+        print(f"{territory_code}: généré en {time.perf_counter() - start:.2f}s")
+
+
+def cmd_refresh(args):
+    """Régénère le stockage disque même s'il est à jour"""
+    cmd_warm(args, force=True)
+
+
+def cmd_kpi(args):
+    """Affiche les indicateurs clés (mêmes totaux que display_key_metrics)"""
+    territories = data.get_territories_definitions()
+    store = DiskStore(args.store)
+
+    # Une seule passe sur les données courantes empilées de tous les territoires
+    current_data = pd.concat([
+        data.load_territory_frames(territory_code, store)['current_data']
+        for territory_code in _active_codes(territories, args.territoires)
+    ], ignore_index=True)
+    # Montants convertis en euros pour comparer les territoires
+    summary = kpi_table(current_data, territories, REPORTING_CURRENCY)
+    if args.csv:
+        summary.to_csv(sys.stdout)
+    else:
+        print(summary.round(2).to_string())
+
+
+def cmd_validate(args):
+    """Contrôle l'historique (en une passe sur la table empilée) et les données courantes"""
+    territories = data.get_territories_definitions()
+    store = DiskStore(args.store)
+    codes = _active_codes(territories, args.territoires)
+    version = data_token()
+
+    historical, current, expected = [], [], {}
+    for territory_code in codes:
+        frames = data.load_territory_frames(territory_code, store)
+        historical.append(frames['historical_data'])
+        current.append(frames['current_data'])
+        expected[territory_code] = list(frames['categories'])
+
+    reports = [
+        validate_frame(pd.concat(historical, ignore_index=True), 'historical_data', territories, expected, version),
+        validate_frame(pd.concat(current, ignore_index=True), 'current_data', territories, expected, version),
+    ]
+    for report in reports:
+        print(report.summary())
+        if not report.errors().empty:
+            print(report.errors().to_string(index=False))
+    if not all(report.ok for report in reports):
+        raise SystemExit(1)
+
+
+def cmd_project(args):
+    """Affiche la projection des recettes par catégorie"""
+    territories = data.get_territories_definitions()
+    store = DiskStore(args.store)
+    codes = _active_codes(territories, [args.territoire] if args.territoire else None)
+
+    if args.monte_carlo:
+        jobs = {}
+        for territory_code in codes:
+            frames = data.load_territory_frames(territory_code, store)
+            jobs[territory_code] = (frames['categories'], frames['historical_data']['date'].max())
+        started = time.perf_counter()
+        projections = monte_carlo_projections(jobs, args.annees, args.monte_carlo, args.volatilite / 100,
+                                              args.workers)
+        for territory_code, projection in projections.items():
+            print(f"== {territories[territory_code]['nom_complet']} - éventail {args.annees} ans, "
+                  f"{projection['paths']} trajectoires (total mensuel en "
+                  f"{symbol(territories[territory_code]['monnaie'], True)}, tous les 12 mois)")
+            bands = projection['bands'].iloc[11::12].set_index('date')
+            print(bands.round(1).to_string())
+        print(f"{len(projections)} territoire(s) en {time.perf_counter() - started:.2f}s")
+        return
+
+    for territory_code in codes:
+        frames = data.load_territory_frames(territory_code, store)
+        projection = data.project_revenues(
+            territory_code,
+            frames['categories'],
+            frames['historical_data']['date'].max(),
+            args.annees
+        )
+        by_category = projection.groupby('categorie')['montant_total_impots'].sum().sort_values(ascending=False)
+
+        unit = symbol(territories[territory_code]['monnaie'], True)
+        print(f"== {territories[territory_code]['nom_complet']} - projection {args.annees} ans ({unit})")
+        print(by_category.round(1).to_string())
+        print(f"TOTAL {by_category.sum():.1f}")
+
+
+def cmd_export(args):
+    """Délègue à l'export Parquet/Excel"""
+    from impots import export
+
+    extra_args = list(args.extra_args)
+    if args.store and '--store' not in extra_args:
+        extra_args += ['--store', args.store]
+    export.main(extra_args)
+
+
+def cmd_loadtest(args):
+    """Sessions concurrentes simulées : latences de réexécution et mémoire par session"""
+    from impots import loadtest
+
+    start = time.perf_counter()
+    results = loadtest.run_load_test(args.sessions, args.actions, args.script or loadtest.DEFAULT_SCRIPT, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"== {args.sessions} sessions x {args.actions} actions en {elapsed:.1f}s")
+    print(loadtest.latency_summary(results).round(3).to_string())
+    print(loadtest.memory_summary(results).round(1).to_string())
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+        print(f"Détail des réexécutions: {args.csv}")
+
+
+def cmd_publish(args):
+    """Publie les pages statiques des territoires (une fois, ou toutes les --interval secondes)"""
+    from impots import publish
+
+    if args.serve and args.interval:
+        os.makedirs(args.out, exist_ok=True)
+        publish.serve(args.out, args.serve)
+        print(f"Pages servies sur http://localhost:{args.serve}/")
+
+    while True:
+        start = time.perf_counter()
+        written = publish.publish(args.out, args.territoires)
+        figures = sum(page['figures'] for page in written.values())
+        print(f"{len(written)} pages ({figures} figures) publiées dans {args.out} "
+              f"en {time.perf_counter() - start:.1f}s")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+    if args.serve:
+        # Publication unique : les pages restent servies jusqu'à l'interruption
+        print(f"Pages servies sur http://localhost:{args.serve}/ (Ctrl+C pour arrêter)")
+        publish.serve(args.out, args.serve, background=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m impots', description="Traitements Dashboard Impôts DROM-COM")
+    parser.add_argument('--store', default=None, help="Répertoire du stockage disque (défaut: IMPOTS_STORE_DIR)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, func, help_text in [
+        ('warm', cmd_warm, "Préchauffe le stockage disque (territoires absents ou périmés)"),
+        ('refresh', cmd_refresh, "Régénère le stockage disque"),
+        ('kpi', cmd_kpi, "Affiche les indicateurs clés par territoire"),
+        ('validate', cmd_validate, "Contrôle unités, bornes, dates et complétude des tables"),
+    ]:
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument('--territoires', nargs='*', help="Codes territoire (défaut: tous)")
+        subparser.set_defaults(func=func)
+        if name == 'kpi':
+            subparser.add_argument('--csv', action='store_true', help="Sortie CSV")
+
+    project_parser = subparsers.add_parser('project', help="Projection des recettes par catégorie")
+    project_parser.add_argument('--territoire', help="Code territoire (défaut: tous)")
+    project_parser.add_argument('--annees', type=int, default=5, help="Horizon de projection")
+    project_parser.add_argument('--monte-carlo', type=int, metavar='TRAJECTOIRES',
+                                help="Éventail Monte Carlo avec ce nombre de trajectoires")
+    project_parser.add_argument('--volatilite', type=float, default=MONTHLY_VOLATILITY * 100,
+                                help="Volatilité mensuelle en %% (Monte Carlo)")
+    project_parser.add_argument('--workers', type=int, default=1, help="Territoires simulés en parallèle")
+    project_parser.set_defaults(func=cmd_project)
+
+    loadtest_parser = subparsers.add_parser('loadtest', help="Test de charge du dashboard (sessions simulées)")
+    loadtest_parser.add_argument('--sessions', type=int, default=4, help="Sessions concurrentes")
+    loadtest_parser.add_argument('--actions', type=int, default=10, help="Actions par session")
+    loadtest_parser.add_argument('--seed', type=int, default=0, help="Graine des scénarios")
+    loadtest_parser.add_argument('--script', default=None, help="Script Streamlit (défaut: Dashboard.py)")
+    loadtest_parser.add_argument('--csv', help="Fichier CSV du détail des réexécutions")
+    loadtest_parser.set_defaults(func=cmd_loadtest)
+
+    publish_parser = subparsers.add_parser('publish', help="Pages HTML statiques pré-rendues par territoire")
+    publish_parser.add_argument('--out', default='site', help="Répertoire des pages publiées")
+    publish_parser.add_argument('--territoires', nargs='*', help="Codes territoire (défaut: tous)")
+    publish_parser.add_argument('--interval', type=int, default=0,
+                                help="Republie toutes les N secondes (défaut: une seule fois)")
+    publish_parser.add_argument('--serve', type=int, metavar='PORT', help="Sert les pages sur ce port")
+    publish_parser.set_defaults(func=cmd_publish)
+
+    # Les options de l'export sont transmises telles quelles à impots.export
+    export_parser = subparsers.add_parser('export', help="Export Parquet/Excel (voir impots.export)", add_help=False)
+    export_parser.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    warnings.filterwarnings('ignore')
+    parser = build_parser()
+    args, extra_args = parser.parse_known_args(argv)
+    if extra_args and args.func is not cmd_export:
+        parser.error(f"arguments non reconnus: {' '.join(extra_args)}")
+    args.extra_args = extra_args
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
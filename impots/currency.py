@@ -0,0 +1,101 @@
+"""Couche monétaire : montants en monnaie locale, agrégats inter-territoires en euros
+
+Les tables d'un territoire sont exprimées dans sa monnaie (champ 'monnaie'
+des définitions) : euro pour les DROM et les COM de l'Atlantique, franc CFP
+(XPF) pour la Polynésie, la Nouvelle-Calédonie et Wallis-et-Futuna. Les
+tables générées portent leur monnaie dans frame.attrs['monnaie'].
+
+La conversion n'a lieu qu'à l'agrégation : les sommes par territoire (et par
+date) sont calculées dans la monnaie locale puis multipliées par un vecteur
+ou une table de taux ; les tables sources ne sont jamais copiées. Les taux
+sont des paliers datés (taux historiques), compilés une fois par monnaie.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+REPORTING_CURRENCY = 'EUR'
+
+# Unités de monnaie pour 1 EUR, par date d'effet (taux constant jusqu'au palier suivant)
+RATE_HISTORY = {
+    'EUR': (('1999-01-01', 1.0),),
+    # Parité fixe depuis le passage à l'euro (auparavant 1 FRF = 18,18 XPF, soit la même valeur)
+    'XPF': (('1999-01-01', 119.33),),
+}
+CURRENCY_SYMBOLS = {'EUR': '€', 'XPF': 'XPF'}
+
+
+@lru_cache(maxsize=None)
+def _rate_steps(currency):
+    """Dates d'effet (datetime64[ns]) et taux de chaque palier, triés"""
+    if currency not in RATE_HISTORY:
+        raise KeyError(f"Monnaie inconnue: {currency}")
+    steps = sorted(RATE_HISTORY[currency])
+    dates = pd.to_datetime([date for date, _ in steps]).to_numpy()
+    return dates, np.array([rate for _, rate in steps], dtype=float)
+
+
+def rates(currency, dates=None):
+    """Unités de monnaie pour 1 EUR à chaque date (dernier palier si dates est None)"""
+    steps, values = _rate_steps(currency)
+    if dates is None:
+        return float(values[-1])
+    dates = pd.DatetimeIndex(dates).to_numpy()
+    # Les dates antérieures au premier palier prennent le premier taux
+    positions = np.searchsorted(steps, dates, side='right') - 1
+    return values[np.clip(positions, 0, len(values) - 1)]
+
+
+def conversion_factor(source, target=REPORTING_CURRENCY, dates=None):
+    """Multiplicateur (scalaire ou vecteur par date) d'un montant en source vers target"""
+    if source == target:
+        return 1.0 if dates is None else np.ones(len(dates))
+    return rates(target, dates) / rates(source, dates)
+
+
+def territory_currencies(territories, codes=None):
+    """Monnaie de chaque territoire : {code: monnaie}"""
+    codes = territories if codes is None else codes
+    return {code: territories[code].get('monnaie', REPORTING_CURRENCY) for code in codes}
+
+
+def factor_vector(codes, territories, target=REPORTING_CURRENCY):
+    """Multiplicateurs vers target pour une liste de codes territoire (taux en vigueur)"""
+    currencies = territory_currencies(territories, codes)
+    return np.array([conversion_factor(currencies[code], target) for code in codes], dtype=float)
+
+
+def rate_table(dates, codes, territories, target=REPORTING_CURRENCY):
+    """Multiplicateurs dates × territoires vers target (taux historiques de chaque date)
+
+    Une colonne par monnaie distincte est calculée, puis répétée pour ses territoires.
+    """
+    dates = pd.DatetimeIndex(dates)
+    currencies = territory_currencies(territories, codes)
+    by_currency = {currency: conversion_factor(currency, target, dates) for currency in set(currencies.values())}
+    return pd.DataFrame({code: by_currency[currencies[code]] for code in codes}, index=dates)
+
+
+def convert_totals(totals, territories, target=REPORTING_CURRENCY):
+    """Agrégat dates × territoires (colonnes = codes) exprimé dans target
+
+    Seul l'agrégat est multiplié : les tables sources restent en monnaie locale.
+    """
+    return totals * rate_table(totals.index, list(totals.columns), territories, target).to_numpy()
+
+
+def tag(frame, currency):
+    """Marque une table avec sa monnaie (sans copie) et la retourne"""
+    frame.attrs['monnaie'] = currency
+    return frame
+
+
+def frame_currency(frame, default=REPORTING_CURRENCY):
+    """Monnaie marquée par tag(), ou default pour une table non marquée"""
+    return frame.attrs.get('monnaie', default)
+
+
+def symbol(currency, millions=False):
+    """Libellé d'unité : '€', 'M€', 'XPF', 'MXPF'"""
+    return ('M' if millions else '') + CURRENCY_SYMBOLS.get(currency, currency)
@@ -0,0 +1,513 @@
+"""Génération et agrégation des données fiscales DROM-COM
+
+Ce module ne dépend pas de Streamlit : il est partagé entre le dashboard
+(qui ajoute sa propre couche de cache) et les traitements en ligne de commande.
+"""
+import numpy as np
+import pandas as pd
+
+from impots.currency import REPORTING_CURRENCY, conversion_factor, tag
+from impots.kpi import kpi_table
+from impots.parameters import get_parameter_matrix
+from impots.seeding import ALL_CATEGORIES, data_token, history_end, stream_rng
+from impots.sketches import DEFAULT_K, KLLSketch
+
+def get_territories_definitions():
+    """Définit les territoires DROM-COM"""
+    return {
+        'REUNION': {
+            'nom_complet': 'La Réunion',
+            'type': 'DROM',
+            'population': 860000,
+            'superficie': 2511,
+            'pib': 19.8,
+            'drapeau': 'reunion-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 2800,
+            'recettes_par_habitant': 3256,
+            'taux_imposition_moyen': 28.5
+        },
+        'GUADELOUPE': {
+            'nom_complet': 'Guadeloupe',
+            'type': 'DROM',
+            'population': 384000,
+            'superficie': 1628,
+            'pib': 9.1,
+            'drapeau': 'guadeloupe-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 1250,
+            'recettes_par_habitant': 3255,
+            'taux_imposition_moyen': 27.8
+        },
+        'MARTINIQUE': {
+            'nom_complet': 'Martinique',
+            'type': 'DROM',
+            'population': 376000,
+            'superficie': 1128,
+            'pib': 8.9,
+            'drapeau': 'martinique-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 1220,
+            'recettes_par_habitant': 3245,
+            'taux_imposition_moyen': 27.5
+        },
+        'GUYANE': {
+            'nom_complet': 'Guyane',
+            'type': 'DROM',
+            'population': 290000,
+            'superficie': 83534,
+            'pib': 4.8,
+            'drapeau': 'guyane-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 680,
+            'recettes_par_habitant': 2345,
+            'taux_imposition_moyen': 24.2
+        },
+        'MAYOTTE': {
+            'nom_complet': 'Mayotte',
+            'type': 'DROM',
+            'population': 270000,
+            'superficie': 374,
+            'pib': 2.4,
+            'drapeau': 'mayotte-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 420,
+            'recettes_par_habitant': 1556,
+            'taux_imposition_moyen': 22.1
+        },
+        'STPIERRE': {
+            'nom_complet': 'Saint-Pierre-et-Miquelon',
+            'type': 'COM',
+            'population': 6000,
+            'superficie': 242,
+            'pib': 0.2,
+            'drapeau': 'spierre-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 45,
+            'recettes_par_habitant': 7500,
+            'taux_imposition_moyen': 32.5
+        },
+        'STBARTH': {
+            'nom_complet': 'Saint-Barthélemy',
+            'type': 'COM',
+            'population': 10000,
+            'superficie': 21,
+            'pib': 0.6,
+            'drapeau': 'stbarth-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 85,
+            'recettes_par_habitant': 8500,
+            'taux_imposition_moyen': 35.2
+        },
+        'STMARTIN': {
+            'nom_complet': 'Saint-Martin',
+            'type': 'COM',
+            'population': 32000,
+            'superficie': 54,
+            'pib': 0.9,
+            'drapeau': 'stmartin-flag',
+            'monnaie': 'EUR',
+            'impots_actif': True,
+            'recettes_fiscales_total': 120,
+            'recettes_par_habitant': 3750,
+            'taux_imposition_moyen': 29.8
+        },
+        'WALLIS': {
+            'nom_complet': 'Wallis-et-Futuna',
+            'type': 'COM',
+            'population': 11500,
+            'superficie': 142,
+            'pib': 0.2,
+            'drapeau': 'wallis-flag',
+            'monnaie': 'XPF',
+            'impots_actif': True,
+            'recettes_fiscales_total': 25,
+            'recettes_par_habitant': 2174,
+            'taux_imposition_moyen': 26.5
+        },
+        'POLYNESIE': {
+            'nom_complet': 'Polynésie française',
+            'type': 'COM',
+            'population': 280000,
+            'superficie': 4167,
+            'pib': 7.2,
+            'drapeau': 'polynesie-flag',
+            'monnaie': 'XPF',
+            'impots_actif': True,
+            'recettes_fiscales_total': 980,
+            'recettes_par_habitant': 3500,
+            'taux_imposition_moyen': 28.9
+        },
+        'CALEDONIE': {
+            'nom_complet': 'Nouvelle-Calédonie',
+            'type': 'COM',
+            'population': 271000,
+            'superficie': 18575,
+            'pib': 9.7,
+            'drapeau': 'caledonie-flag',
+            'monnaie': 'XPF',
+            'impots_actif': True,
+            'recettes_fiscales_total': 1100,
+            'recettes_par_habitant': 4059,
+            'taux_imposition_moyen': 30.2
+        }
+    }
+
+def territory_currency(territory_code):
+    """Monnaie dans laquelle sont exprimés les montants d'un territoire"""
+    return get_territories_definitions()[territory_code]['monnaie']
+
+def _local_factor(territory_code):
+    """Multiplicateur des paramètres (calibrés en euros) vers la monnaie du territoire"""
+    return conversion_factor(REPORTING_CURRENCY, territory_currency(territory_code))
+
+def get_categories_impots(territory_code):
+    """Définit les catégories d'impôts pour un territoire donné (lues dans la matrice des paramètres)
+
+    Montants et plafonds dans la monnaie du territoire.
+    """
+    categories = get_parameter_matrix().categories_for(territory_code)
+    factor = _local_factor(territory_code)
+    if factor != 1.0:
+        for info in categories.values():
+            info['montant_annuel'] *= factor
+            info['plafond'] *= factor
+    return categories
+
+def _reforme_bounds(year):
+    """Bornes de l'impact des réformes fiscales pour une année"""
+    if year == 2018:
+        return 1.05, 1.15  # Réforme fiscale
+    if year == 2020:
+        return 0.9, 1.05   # Impact COVID
+    return 1.0, 1.08
+
+def generate_historical_data(territory_code, categories):
+    """Génère les données historiques optimisées
+
+    Les aléas sont tirés par année dans des flux (territoire, catégorie, année) :
+    les mois déjà publiés restent identiques quand l'historique s'allonge.
+    """
+    dates = pd.date_range('2015-01-01', history_end(), freq='ME')
+    years = dates.year.to_numpy()
+    months = dates.month.to_numpy() - 1
+    categorie_codes = list(categories)
+    
+    reforme_impact = np.empty(len(dates))
+    seasonal_impact = np.empty(len(dates))
+    noise = np.empty((len(dates), len(categorie_codes)))
+    contribuables_factor = np.empty_like(noise)
+    evolution_mensuelle = np.empty_like(noise)
+    
+    for year in np.unique(years):
+        rows = years == year
+        # Aléas communs au territoire: impact des réformes et variation saisonnière
+        rng = stream_rng(territory_code, ALL_CATEGORIES, f'historique:{year}')
+        reforme_impact[rows] = rng.uniform(*_reforme_bounds(year), 12)[months[rows]]
+        seasonal_impact[rows] = rng.uniform(0.95, 1.05, 12)[months[rows]]
+        
+        for column, categorie_code in enumerate(categorie_codes):
+            rng = stream_rng(territory_code, categorie_code, f'historique:{year}')
+            noise[rows, column] = rng.uniform(0.95, 1.05, 12)[months[rows]]
+            contribuables_factor[rows, column] = rng.uniform(0.98, 1.02, 12)[months[rows]]
+            evolution_mensuelle[rows, column] = rng.uniform(-1.0, 1.0, 12)[months[rows]]
+    
+    params = get_parameter_matrix()
+    # Mensualisation, dans la monnaie du territoire
+    base_revenu = params.field(territory_code, 'montant_annuel', categorie_codes) * _local_factor(territory_code) / 12
+    revenu = base_revenu * (reforme_impact * seasonal_impact)[:, None] * noise
+    contribuables = params.field(territory_code, 'nombre_contribuables', categorie_codes) * contribuables_factor
+    
+    # Une ligne par (date, catégorie), dans l'ordre date puis catégorie
+    n_categories = len(categorie_codes)
+    return tag(pd.DataFrame({
+        'date': np.repeat(dates.to_numpy(), n_categories),
+        'territoire': territory_code,
+        'categorie': np.tile(categorie_codes, len(dates)),
+        'montant_total_impots': revenu.ravel(),
+        'nombre_contribuables': contribuables.ravel(),
+        'montant_moyen': np.divide(revenu, contribuables, out=np.zeros_like(revenu), where=contribuables > 0).ravel(),
+        'type_impot': np.tile([categories[code]['type_impot'] for code in categorie_codes], len(dates)),
+        'evolution_mensuelle': evolution_mensuelle.ravel()
+    }), territory_currency(territory_code))
+
+def generate_current_data(territory_code, categories, historical_data):
+    """Génère les données courantes optimisées"""
+    current_data = []
+    period = pd.Timestamp(historical_data['date'].max()).strftime('%Y-%m')
+    
+    for categorie_code, info in categories.items():
+        # Dernières données historiques
+        last_data = historical_data[historical_data['categorie'] == categorie_code].iloc[-1]
+        rng = stream_rng(territory_code, categorie_code, f'courant:{period}')
+        
+        # Variation mensuelle simulée
+        change_pct = rng.uniform(-0.05, 0.05)
+        change_abs = last_data['montant_total_impots'] * change_pct
+        
+        # Pas de plancher : un montant nul ou négatif est signalé par la validation (borne_min)
+        montant_mensuel = last_data['montant_total_impots'] + change_abs
+        
+        current_data.append({
+            'territoire': territory_code,
+            'categorie': categorie_code,
+            'nom_complet': info['nom_complet'],
+            'type_impot': info['type_impot'],
+            'montant_mensuel': montant_mensuel,
+            'variation_pct': change_pct * 100,
+            'variation_abs': change_abs,
+            'nombre_contribuables': last_data['nombre_contribuables'] * rng.uniform(0.98, 1.02),
+            'montant_moyen': info['montant_annuel'] / 12 * rng.uniform(0.95, 1.05),
+            'poids_total': info['poids_total'],
+            'montant_annee_precedente': last_data['montant_total_impots'] * 12 * rng.uniform(0.92, 1.08),
+            'taux_moyen': info['taux_moyen'],
+            'plafond': info['plafond']
+        })
+    
+    return tag(pd.DataFrame(current_data), territory_currency(territory_code))
+
+# Tranches de revenu (bornes en €) du territoire de référence
+REVENU_BRACKETS = [
+    {'tranche_revenu': '0-10k€', 'borne_min': 0, 'borne_max': 10000, 'nombre_contribuables': 80000, 'montant_moyen_impot': 0, 'taux_effectif': 0},
+    {'tranche_revenu': '10-20k€', 'borne_min': 10000, 'borne_max': 20000, 'nombre_contribuables': 65000, 'montant_moyen_impot': 450, 'taux_effectif': 3.0},
+    {'tranche_revenu': '20-30k€', 'borne_min': 20000, 'borne_max': 30000, 'nombre_contribuables': 45000, 'montant_moyen_impot': 1200, 'taux_effectif': 6.0},
+    {'tranche_revenu': '30-50k€', 'borne_min': 30000, 'borne_max': 50000, 'nombre_contribuables': 30000, 'montant_moyen_impot': 2800, 'taux_effectif': 9.5},
+    {'tranche_revenu': '50-70k€', 'borne_min': 50000, 'borne_max': 70000, 'nombre_contribuables': 15000, 'montant_moyen_impot': 5500, 'taux_effectif': 12.0},
+    {'tranche_revenu': '70-100k€', 'borne_min': 70000, 'borne_max': 100000, 'nombre_contribuables': 8000, 'montant_moyen_impot': 9500, 'taux_effectif': 15.5},
+    {'tranche_revenu': '100-150k€', 'borne_min': 100000, 'borne_max': 150000, 'nombre_contribuables': 4000, 'montant_moyen_impot': 18500, 'taux_effectif': 18.5},
+    {'tranche_revenu': '150k€+', 'borne_min': 150000, 'borne_max': np.inf, 'nombre_contribuables': 1500, 'montant_moyen_impot': 45000, 'taux_effectif': 25.0}
+]
+TOP_BRACKET_PARETO_ALPHA = 2.5  # Queue de distribution des hauts revenus
+PAYMENT_SIGMA = 1.2  # Dispersion (log-normale) des montants payés par contribuable
+TAXPAYER_CHUNK_SIZE = 65536  # Contribuables par lot d'ingestion (et par flux aléatoire)
+
+def generate_revenu_data(territory_code):
+    """Génère les données par tranche de revenu optimisées"""
+    revenu_ranges = [
+        {key: value for key, value in bracket.items() if key not in ('borne_min', 'borne_max')}
+        for bracket in REVENU_BRACKETS
+    ]
+    
+    # Ajustement selon le territoire
+    factor = get_parameter_matrix().revenu_factor(territory_code)
+    for revenu_range in revenu_ranges:
+        revenu_range['nombre_contribuables'] *= factor
+        revenu_range['montant_moyen_impot'] *= factor
+    
+    # Barème des tranches exprimé en euros pour tous les territoires
+    return tag(pd.DataFrame(revenu_ranges), REPORTING_CURRENCY)
+
+def iter_taxpayer_chunks(territory_code):
+    """Contribuables simulés par lots : tranche, revenu annuel et impôt sur le revenu (€)
+
+    Chaque lot a son propre flux aléatoire : le résultat ne dépend pas de
+    l'ordre de consommation et un lot n'est jamais matérialisé deux fois.
+    """
+    factor = get_parameter_matrix().revenu_factor(territory_code)
+    for index, bracket in enumerate(REVENU_BRACKETS):
+        count = int(round(bracket['nombre_contribuables'] * factor))
+        for start in range(0, count, TAXPAYER_CHUNK_SIZE):
+            size = min(TAXPAYER_CHUNK_SIZE, count - start)
+            rng = stream_rng(territory_code, ALL_CATEGORIES, f'contribuables:{index}:{start}')
+            if np.isfinite(bracket['borne_max']):
+                revenu = rng.uniform(bracket['borne_min'], bracket['borne_max'], size)
+            else:
+                revenu = bracket['borne_min'] * (1 + rng.pareto(TOP_BRACKET_PARETO_ALPHA, size))
+            yield pd.DataFrame({
+                'tranche': index,
+                'revenu': revenu,
+                'impot': revenu * bracket['taux_effectif'] / 100
+            })
+
+def iter_payment_chunks(territory_code, categories):
+    """Montants annuels payés par contribuable (€), par lots : (catégorie, montants)
+
+    Log-normale dont la moyenne reproduit le montant annuel de la catégorie
+    réparti sur ses contribuables.
+    """
+    for categorie_code, info in categories.items():
+        count = int(round(info['nombre_contribuables']))
+        if count <= 0:
+            continue
+        mean = info['montant_annuel'] * 1e6 / count
+        mu = np.log(mean) - PAYMENT_SIGMA ** 2 / 2
+        for start in range(0, count, TAXPAYER_CHUNK_SIZE):
+            size = min(TAXPAYER_CHUNK_SIZE, count - start)
+            rng = stream_rng(territory_code, categorie_code, f'paiements:{start}')
+            yield categorie_code, rng.lognormal(mu, PAYMENT_SIGMA, size)
+
+def build_distribution_sketches(territory_code, categories, k=DEFAULT_K):
+    """Esquisses de quantiles d'un territoire, construites en une passe sur les lots de contribuables
+
+    Retourne {'revenu': esquisse, 'impot': esquisse, 'categories': {code: esquisse}, 'monnaie': ...} ;
+    revenus et impôt suivent le barème en euros, les paiements par catégorie la
+    monnaie du territoire. Seules les esquisses (mémoire bornée) sont conservées.
+    """
+    revenu, impot = KLLSketch(k), KLLSketch(k)
+    for chunk in iter_taxpayer_chunks(territory_code):
+        revenu.update(chunk['revenu'].to_numpy())
+        impot.update(chunk['impot'].to_numpy())
+    
+    payments = {categorie_code: KLLSketch(k) for categorie_code in categories}
+    for categorie_code, montants in iter_payment_chunks(territory_code, categories):
+        payments[categorie_code].update(montants)
+    return {'revenu': revenu, 'impot': impot, 'categories': payments, 'monnaie': territory_currency(territory_code)}
+
+def merge_distribution_sketches(sketches, k=DEFAULT_K):
+    """Fusionne les esquisses de plusieurs territoires (agrégats DROM, COM ou ensemble)
+
+    Les paiements par catégorie sont d'abord convertis en euros (les quantiles
+    d'une esquisse suivent un changement d'unité).
+    """
+    sketches = [
+        {**item, 'monnaie': REPORTING_CURRENCY, 'categories': {
+            code: sketch.scaled(conversion_factor(item['monnaie'])) for code, sketch in item['categories'].items()
+        }} if item['monnaie'] != REPORTING_CURRENCY else item
+        for item in sketches
+    ]
+    categorie_codes = list(dict.fromkeys(code for item in sketches for code in item['categories']))
+    return {
+        'revenu': KLLSketch.merged((item['revenu'] for item in sketches), k),
+        'impot': KLLSketch.merged((item['impot'] for item in sketches), k),
+        'categories': {
+            code: KLLSketch.merged((item['categories'][code] for item in sketches if code in item['categories']), k)
+            for code in categorie_codes
+        },
+        'monnaie': REPORTING_CURRENCY,
+    }
+
+def revenu_data_from_sketches(sketches):
+    """Table par tranche de revenu (mêmes colonnes que generate_revenu_data) lue dans les esquisses"""
+    edges = np.array([bracket['borne_min'] for bracket in REVENU_BRACKETS] + [np.inf], dtype=float)
+    taux = np.array([bracket['taux_effectif'] for bracket in REVENU_BRACKETS], dtype=float)
+    counts, revenu_moyen = sketches['revenu'].range_stats(edges)
+    return tag(pd.DataFrame({
+        'tranche_revenu': [bracket['tranche_revenu'] for bracket in REVENU_BRACKETS],
+        'nombre_contribuables': counts,
+        'revenu_moyen': revenu_moyen,
+        'montant_moyen_impot': revenu_moyen * taux / 100,
+        'taux_effectif': taux,
+    }), REPORTING_CURRENCY)
+
+def distribution_summary(sketch, quantiles=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)):
+    """Quantiles d'une esquisse sous forme de table (quantile, libellé, valeur)"""
+    quantiles = np.asarray(quantiles, dtype=float)
+    return pd.DataFrame({
+        'quantile': quantiles,
+        'libelle': [f'D{int(round(q * 10))}' if round(q * 10, 6).is_integer() else f'P{q * 100:g}' for q in quantiles],
+        'valeur': sketch.quantiles(quantiles),
+    })
+
+def generate_comparison_data(territories):
+    """Génère les données de comparaison entre territoires (montants en euros)"""
+    comparison = pd.DataFrame.from_dict(territories, orient='index')
+    comparison = comparison[comparison['impots_actif'].astype(bool)]
+    
+    # Totaux de toutes les catégories de chaque territoire en une seule réduction,
+    # lus dans les paramètres calibrés en euros (pas de conversion des tables locales)
+    total_impots = get_parameter_matrix().territory_totals().reindex(comparison.index)
+    
+    return tag(pd.DataFrame({
+        'territoire': comparison.index,
+        'nom_complet': comparison['nom_complet'],
+        'type': comparison['type'],
+        'monnaie_locale': comparison['monnaie'],
+        'population': comparison['population'],
+        'superficie': comparison['superficie'],
+        'pib': comparison['pib'],
+        'montant_total_impots': total_impots,
+        'recettes_fiscales_total': comparison['recettes_fiscales_total'],
+        'recettes_par_habitant': comparison['recettes_par_habitant'],
+        'taux_imposition_moyen': comparison['taux_imposition_moyen'],
+        'pression_fiscale': total_impots / (comparison['pib'] * 1e3) * 100,  # M€ / PIB en Md€
+        'impots_actif': comparison['impots_actif']
+    }).reset_index(drop=True), REPORTING_CURRENCY)
+
+def load_historical_data(territory_code, categories, store=None):
+    """Historique depuis le stockage disque s'il est à jour, sinon généré puis enregistré"""
+    if store is not None:
+        historical_data = store.load(territory_code, 'historical_data')
+        if historical_data is not None:
+            return tag(historical_data, territory_currency(territory_code))
+    
+    historical_data = generate_historical_data(territory_code, categories)
+    if store is not None:
+        store.save(territory_code, 'historical_data', historical_data)
+    return historical_data
+
+def load_territory_frames(territory_code, store=None):
+    """Charge les tables d'un territoire sans les conserver en session (export par lots)"""
+    categories = get_categories_impots(territory_code)
+    historical_data = load_historical_data(territory_code, categories, store)
+    return {
+        'categories': categories,
+        'historical_data': historical_data,
+        'current_data': generate_current_data(territory_code, categories, historical_data),
+        # Mêmes tranches que le dashboard : lues dans les esquisses des contribuables simulés
+        'revenu_data': revenu_data_from_sketches(build_distribution_sketches(territory_code, categories))
+    }
+
+def apply_live_update(current_data, version, period=None):
+    """Applique une variation temps réel aux données courantes (retourne une copie)
+
+    version est le numéro du tick à produire et period le jeton des données
+    (data_token, mois inclus) : le même tick du même mois donne les mêmes
+    variations dans tous les processus, le tick n d'un autre mois non.
+    """
+    period = period or data_token()
+    current_data = current_data.copy()
+    
+    # Mise à jour légère des données
+    for idx in current_data.index:
+        rng = stream_rng(current_data.at[idx, 'territoire'], current_data.at[idx, 'categorie'], f'live:{period}:{version}')
+        if rng.random() < 0.4:  # 40% de chance de changement
+            variation = rng.uniform(-0.02, 0.02)
+            current_data.loc[idx, 'montant_mensuel'] *= (1 + variation)
+            current_data.loc[idx, 'variation_pct'] = variation * 100
+            current_data.loc[idx, 'nombre_contribuables'] *= rng.uniform(0.98, 1.02)
+    
+    return current_data
+
+def compute_key_metrics(current_data, territory_info):
+    """Calcule les indicateurs clés affichés par le dashboard (montants en M€)"""
+    territory_code = current_data['territoire'].iloc[0]
+    return kpi_table(current_data, {territory_code: territory_info}).loc[territory_code].to_dict()
+
+def project_revenues(territory_code, categories, last_date, projection_years=5):
+    """Projette les recettes mensuelles par catégorie sur plusieurs années"""
+    projection_dates = pd.date_range(
+        start=last_date + pd.DateOffset(months=1),
+        periods=projection_years * 12,
+        freq='ME'
+    )
+    period = pd.Timestamp(last_date).strftime('%Y-%m')
+    
+    # Un flux par catégorie, indexé par la date de départ de la projection
+    noise = {
+        categorie_code: stream_rng(territory_code, categorie_code, f'projection:{period}').uniform(0.95, 1.05, len(projection_dates))
+        for categorie_code in categories
+    }
+    
+    projection_data = []
+    for position, date in enumerate(projection_dates):
+        for categorie_code, categorie_info in categories.items():
+            # Base projection with growth factor
+            growth_factor = 1.0 + (categorie_info['evolution_annuelle'] / 100) / 12
+            base_amount = categorie_info['montant_annuel'] / 12
+            projected_amount = base_amount * growth_factor * noise[categorie_code][position]
+            
+            projection_data.append({
+                'date': date,
+                'categorie': categorie_code,
+                'montant_total_impots': projected_amount,
+                'type': 'projection'
+            })
+    
+    return tag(pd.DataFrame(projection_data), territory_currency(territory_code))
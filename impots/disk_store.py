@@ -0,0 +1,89 @@
+"""Stockage disque des tables par territoire, partagé entre le dashboard et la ligne de commande
+
+Le CLI peut préchauffer ce stockage (tâche cron avant les heures ouvrées) ;
+le dashboard le lit en priorité avant de régénérer les données. Les tables
+sont rangées sous la version des données simulées et du format (seeding.STORE_VERSION)
+puis sous le dernier mois de l'historique (seeding.history_period, comme data_token) :
+tous les workers d'une même version lisent et écrivent les mêmes fichiers, et
+un historique écrit avant la dernière fin de mois n'est jamais relu.
+"""
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from impots.atomic import atomic_path
+from impots.seeding import STORE_VERSION, history_period
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'IMPOTS_STORE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'impots_drom_com')
+)
+DEFAULT_MAX_AGE = 24 * 3600  # secondes
+
+
+class DiskStore:
+    """Tables Parquet rangées par territoire : <racine>/v<version>/<AAAA-MM>/<territoire>/<table>.parquet
+
+    period fixe le mois ; par défaut il suit la dernière fin de mois de l'historique
+    à chaque appel (un worker lancé avant la fin du mois change de répertoire).
+    """
+
+    def __init__(self, root=None, max_age=DEFAULT_MAX_AGE, version=STORE_VERSION, period=None):
+        self.base = os.path.join(root or DEFAULT_STORE_DIR, f'v{version}')
+        self.max_age = max_age
+        self.period = period
+
+    @property
+    def root(self):
+        return os.path.join(self.base, self.period or history_period())
+
+    def path(self, territory_code, table):
+        return os.path.join(self.root, territory_code, f'{table}.parquet')
+
+    def is_fresh(self, territory_code, table):
+        """Vrai si la table existe et a moins de max_age secondes"""
+        path = self.path(territory_code, table)
+        if not os.path.exists(path):
+            return False
+        return self.max_age is None or time.time() - os.path.getmtime(path) < self.max_age
+
+    def load(self, territory_code, table):
+        """Retourne la table enregistrée, ou None si absente, périmée ou illisible"""
+        if not self.is_fresh(territory_code, table):
+            return None
+        try:
+            return pd.read_parquet(self.path(territory_code, table))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, territory_code, table, frame):
+        """Enregistre une table (écriture atomique : les lecteurs concurrents ne voient pas de fichier partiel)"""
+        path = self.path(territory_code, table)
+        with atomic_path(path) as tmp_path:
+            frame.to_parquet(tmp_path, index=False)
+        return path
+
+    def clear(self, territory_code=None):
+        """Supprime les tables d'un territoire (ou de tous)"""
+        codes = [territory_code] if territory_code else self.territories()
+        for code in codes:
+            directory = os.path.join(self.root, code)
+            for name in os.listdir(directory) if os.path.isdir(directory) else []:
+                os.remove(os.path.join(directory, name))
+
+    def prune(self):
+        """Supprime les mois antérieurs au mois courant (jamais les mois plus récents)"""
+        current = os.path.basename(self.root)
+        names = os.listdir(self.base) if os.path.isdir(self.base) else []
+        for name in names:
+            if name < current:
+                shutil.rmtree(os.path.join(self.base, name), ignore_errors=True)
+
+    def territories(self):
+        """Territoires présents dans le stockage"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
@@ -0,0 +1,115 @@
+"""Études d'événements (réformes fiscales) sur l'historique mensuel
+
+L'historique est mis sous forme de matrice mois × catégories, triée par date,
+dont on précalcule les sommes cumulées des valeurs et des produits croisés.
+La moyenne et la variance de n'importe quelle fenêtre, pour n'importe quel
+sous-ensemble de catégories, s'obtiennent alors par deux recherches
+dichotomiques et quelques différences de sommes cumulées, sans parcourir
+l'historique.
+"""
+import numpy as np
+import pandas as pd
+
+Z_95 = 1.959964  # quantile de la loi normale pour un intervalle de confiance à 95 %
+TOTAL = 'TOTAL'
+
+
+class EventStudy:
+    """Moteur d'étude d'événements par sommes cumulées"""
+
+    def __init__(self, historical_data, value='montant_total_impots', key='categorie', date='date'):
+        monthly = historical_data.pivot_table(index=date, columns=key, values=value, aggfunc='sum').sort_index()
+        monthly = monthly.fillna(0.0)
+        values = monthly.to_numpy(dtype=float)
+
+        self.categories = [str(categorie) for categorie in monthly.columns]
+        self._columns = {categorie: position for position, categorie in enumerate(self.categories)}
+        self.dates = monthly.index.to_numpy(dtype='datetime64[ns]')
+
+        # Sommes cumulées (préfixées d'une ligne de zéros) : valeurs et produits croisés
+        n, k = values.shape
+        self._sums = np.zeros((n + 1, k))
+        self._sums[1:] = np.cumsum(values, axis=0)
+        self._cross = np.zeros((n + 1, k, k))
+        self._cross[1:] = np.cumsum(values[:, :, None] * values[:, None, :], axis=0)
+
+    def _positions(self, start, end):
+        """Lignes [lo, hi) des mois compris dans [start, end)"""
+        lo = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left'))
+        hi = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), side='left'))
+        return lo, max(lo, hi)
+
+    def _column_indices(self, categories):
+        if categories is None:
+            return np.arange(len(self.categories))
+        return np.array([self._columns[categorie] for categorie in categories if categorie in self._columns],
+                        dtype=np.int64)
+
+    def window_stats(self, start, end, categories=None):
+        """Effectif, moyennes et variances mensuelles d'une fenêtre
+
+        Retourne (n, moyennes par catégorie, variances par catégorie,
+        moyenne du total, variance du total) pour les catégories demandées.
+        """
+        lo, hi = self._positions(start, end)
+        columns = self._column_indices(categories)
+        n = hi - lo
+        if n == 0 or len(columns) == 0:
+            empty = np.full(len(columns), np.nan)
+            return n, empty, empty, np.nan, np.nan
+
+        sums = self._sums[hi, columns] - self._sums[lo, columns]
+        cross = self._cross[hi][np.ix_(columns, columns)] - self._cross[lo][np.ix_(columns, columns)]
+
+        means = sums / n
+        denominator = max(n - 1, 1)
+        variances = (np.diag(cross) - n * means ** 2) / denominator
+
+        total_sum = sums.sum()
+        total_mean = total_sum / n
+        total_variance = (cross.sum() - n * total_mean ** 2) / denominator
+        return n, means, np.maximum(variances, 0.0), total_mean, max(total_variance, 0.0)
+
+    def impact(self, event_date, months=6, categories=None, z=Z_95):
+        """Impact d'un événement : rapport des moyennes après/avant, par catégorie et au total
+
+        L'intervalle de confiance est calculé sur le logarithme du rapport (méthode delta).
+        """
+        event_date = pd.Timestamp(event_date)
+        before = self.window_stats(event_date - pd.DateOffset(months=months), event_date, categories)
+        after = self.window_stats(event_date, event_date + pd.DateOffset(months=months), categories)
+
+        selected = [self.categories[column] for column in self._column_indices(categories)]
+        n_before, means_before, var_before, total_before, total_var_before = before
+        n_after, means_after, var_after, total_after, total_var_after = after
+
+        labels = selected + [TOTAL]
+        mean_b = np.append(means_before, total_before)
+        mean_a = np.append(means_after, total_after)
+        var_b = np.append(var_before, total_var_before)
+        var_a = np.append(var_after, total_var_after)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(mean_b > 0, mean_a / mean_b, np.nan)
+            log_se = np.sqrt(var_b / (max(n_before, 1) * mean_b ** 2) + var_a / (max(n_after, 1) * mean_a ** 2))
+
+        return pd.DataFrame({
+            'categorie': labels,
+            'moyenne_avant': mean_b,
+            'moyenne_apres': mean_a,
+            'impact': ratio,
+            'ic_bas': ratio * np.exp(-z * log_se),
+            'ic_haut': ratio * np.exp(z * log_se),
+            'mois_avant': n_before,
+            'mois_apres': n_after,
+        })
+
+    def reform_impacts(self, reforms, months=6, categories=None):
+        """Impacts de plusieurs réformes : {'name', 'date', ...} -> une ligne par réforme et catégorie"""
+        frames = []
+        for reform in reforms:
+            impact = self.impact(reform['date'], months, categories)
+            impact.insert(0, 'reform', reform['name'])
+            impact.insert(1, 'date', reform['date'])
+            frames.append(impact)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,176 @@
+"""Export par lots des données fiscales de tous les territoires (Parquet partitionné / Excel)
+
+Les territoires sont traités un par un : chaque lot est écrit puis libéré avant
+de charger le suivant, la mémoire reste donc bornée par la taille d'un seul
+territoire quel que soit le nombre de territoires exportés.
+
+Usage : python -m impots export [options] (ou python -m impots.export [options]).
+"""
+import argparse
+import os
+import shutil
+import zipfile
+
+import pandas as pd
+
+from impots import data
+from impots.currency import frame_currency
+from impots.disk_store import DiskStore
+
+# Tables exportées et clé de partition Parquet de chacune
+TABLES = {
+    'historique': ['territoire', 'annee'],
+    'courant': ['territoire'],
+    'revenus': ['territoire'],
+}
+TABLE_COMPARAISON = 'comparaison'
+
+
+def iter_territory_frames(territory_codes, load_territory):
+    """Produit (code, tables) territoire par territoire sans rien conserver"""
+    for territory_code in territory_codes:
+        frames = load_territory(territory_code)
+
+        # Monnaie portée par chaque table (attrs), celle du territoire si l'étiquette
+        # a été perdue en route (relecture Arrow du cache partagé)
+        monnaie = data.territory_currency(territory_code)
+        historique = frames['historical_data'].copy()
+        historique['annee'] = historique['date'].dt.year
+        historique['monnaie'] = frame_currency(frames['historical_data'], monnaie)
+
+        revenus = frames['revenu_data'].copy()
+        revenus.insert(0, 'territoire', territory_code)
+        revenus['monnaie'] = frame_currency(frames['revenu_data'], monnaie)
+
+        yield territory_code, {
+            'historique': historique,
+            'courant': frames['current_data'].assign(monnaie=frame_currency(frames['current_data'], monnaie)),
+            'revenus': revenus,
+        }
+
+
+def _write_partitioned(frame, root, partition_cols):
+    """Écrit un lot dans un dataset Parquet partitionné (style Hive)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root,
+        partition_cols=partition_cols,
+        existing_data_behavior='delete_matching'
+    )
+
+
+class _ExcelStreamWriter:
+    """Classeur Excel en écriture seule : les lignes sont ajoutées lot par lot"""
+
+    def __init__(self, path):
+        import openpyxl
+
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheets = {}
+
+    def append(self, sheet_name, frame):
+        sheet = self.sheets.get(sheet_name)
+        if sheet is None:
+            sheet = self.workbook.create_sheet(sheet_name)
+            sheet.append(list(frame.columns))
+            self.sheets[sheet_name] = sheet
+
+        for row in frame.itertuples(index=False, name=None):
+            sheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value
+                          for value in row])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def export_all(out_dir, territory_codes, load_territory, comparison_data=None,
+               excel=False, progress=None):
+    """Exporte tous les territoires en Parquet (et optionnellement en Excel)
+
+    Retourne la liste des fichiers et répertoires produits.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    excel_writer = _ExcelStreamWriter(os.path.join(out_dir, 'impots_drom_com.xlsx')) if excel else None
+    territory_codes = list(territory_codes)
+
+    try:
+        for position, (territory_code, tables) in enumerate(
+                iter_territory_frames(territory_codes, load_territory), start=1):
+            for table_name, frame in tables.items():
+                _write_partitioned(frame, os.path.join(out_dir, table_name), TABLES[table_name])
+                if excel_writer is not None:
+                    excel_writer.append(table_name, frame)
+
+            # Libération explicite du lot avant le territoire suivant
+            del tables
+            if progress is not None:
+                progress(position, len(territory_codes), territory_code)
+
+        if comparison_data is not None:
+            comparison_data.to_parquet(os.path.join(out_dir, f'{TABLE_COMPARAISON}.parquet'), index=False)
+            if excel_writer is not None:
+                excel_writer.append(TABLE_COMPARAISON, comparison_data)
+    finally:
+        if excel_writer is not None:
+            excel_writer.close()
+
+    outputs = [os.path.join(out_dir, table_name) for table_name in TABLES]
+    if comparison_data is not None:
+        outputs.append(os.path.join(out_dir, f'{TABLE_COMPARAISON}.parquet'))
+    if excel_writer is not None:
+        outputs.append(excel_writer.path)
+    return outputs
+
+
+def zip_export(out_dir, zip_path):
+    """Compresse un répertoire d'export en archive ZIP (fichier par fichier)"""
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for root, _, files in os.walk(out_dir):
+            for name in files:
+                full_path = os.path.join(root, name)
+                if os.path.abspath(full_path) == os.path.abspath(zip_path):
+                    continue
+                archive.write(full_path, os.path.relpath(full_path, out_dir))
+    return zip_path
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(prog='python -m impots export', description="Export des données fiscales DROM-COM")
+    parser.add_argument('--out', default='export', help="Répertoire de sortie")
+    parser.add_argument('--territoires', nargs='*', help="Codes territoire (défaut: tous)")
+    parser.add_argument('--excel', action='store_true', help="Produit aussi un classeur Excel")
+    parser.add_argument('--zip', action='store_true', help="Produit une archive ZIP de l'export")
+    parser.add_argument('--store', default=None, help="Répertoire du stockage disque (défaut: IMPOTS_STORE_DIR)")
+    parser.add_argument('--clean', action='store_true', help="Vide le répertoire de sortie avant l'export")
+    args = parser.parse_args(argv)
+
+    territories = data.get_territories_definitions()
+    store = DiskStore(args.store)
+    codes = args.territoires or [code for code, info in territories.items() if info['impots_actif']]
+
+    if args.clean and os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+
+    outputs = export_all(
+        args.out,
+        codes,
+        lambda territory_code: data.load_territory_frames(territory_code, store),
+        comparison_data=data.generate_comparison_data(territories),
+        excel=args.excel,
+        progress=lambda i, n, code: print(f"[{i}/{n}] {code} exporté")
+    )
+    if args.zip:
+        outputs.append(zip_export(args.out, os.path.join(args.out, 'impots_drom_com.zip')))
+
+    for path in outputs:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
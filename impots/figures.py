@@ -0,0 +1,180 @@
+"""Construction des figures Plotly à partir de tableaux NumPy
+
+Les courbes temporelles sont construites directement avec plotly.graph_objects
+(sans l'introspection de DataFrame de Plotly Express). Les traces denses passent
+automatiquement en WebGL (go.Scattergl), beaucoup plus fluide côté navigateur
+au-delà de quelques milliers de points.
+
+Avant l'envoi, les tableaux numériques sont encodés en tableaux typés base64
+(float32/int32, pris en charge par plotly.js >= 2.28) et les dates en
+millisecondes depuis l'époque Unix, au lieu de listes JSON de nombres et de
+chaînes ISO.
+"""
+import base64
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.express as px
+import plotly.io as pio
+
+WEBGL_THRESHOLD = 1000  # points par trace au-delà desquels le rendu passe en WebGL
+RENDER_MODES = ('auto', 'svg', 'webgl')
+
+
+def use_webgl(n_points, render_mode='auto', threshold=WEBGL_THRESHOLD):
+    """Vrai si une trace de n_points doit être rendue en WebGL"""
+    if render_mode == 'webgl':
+        return True
+    if render_mode == 'svg':
+        return False
+    return n_points > threshold
+
+
+def split_by_group(keys, *arrays):
+    """Découpe des tableaux alignés par valeur de clé (ordre de première apparition)"""
+    keys = np.asarray(keys)
+    uniques, first_positions, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(uniques)))[:-1]
+
+    pieces = [np.split(np.asarray(array)[order], bounds) for array in arrays]
+    return {
+        uniques[position]: tuple(piece[position] for piece in pieces)
+        for position in np.argsort(first_positions)
+    }
+
+
+def line_figure(x, series, title=None, colors=None, x_title=None, y_title=None,
+                legend_title=None, render_mode='auto', threshold=WEBGL_THRESHOLD):
+    """Figure de courbes à partir de tableaux : series = {nom: (x, y)} ou {nom: y} si x commun
+
+    colors peut être une séquence (appliquée dans l'ordre) ou un dict {nom: couleur}.
+    """
+    fig = go.Figure()
+    palette = colors if colors is not None else px.colors.qualitative.Plotly
+
+    for position, (name, values) in enumerate(series.items()):
+        trace_x, trace_y = values if isinstance(values, tuple) else (x, values)
+        color = palette.get(name) if isinstance(palette, dict) else palette[position % len(palette)]
+        trace_class = go.Scattergl if use_webgl(len(trace_y), render_mode, threshold) else go.Scatter
+
+        fig.add_trace(trace_class(
+            x=trace_x,
+            y=trace_y,
+            mode='lines',
+            name=str(name),
+            line=dict(color=color),
+            showlegend=len(series) > 1
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        legend_title_text=legend_title
+    )
+    return fig
+
+
+def line_figure_from_frame(frame, x, y, color=None, **kwargs):
+    """Équivalent de px.line(frame, x, y, color) construit à partir des colonnes NumPy"""
+    x_values = frame[x].to_numpy()
+    y_values = frame[y].to_numpy()
+    if color is None:
+        series = {y: (x_values, y_values)}
+    else:
+        series = split_by_group(frame[color].to_numpy(), x_values, y_values)
+
+    kwargs.setdefault('x_title', x)
+    kwargs.setdefault('y_title', y)
+    kwargs.setdefault('legend_title', color)
+    return line_figure(None, series, **kwargs)
+
+
+# Attributs de trace susceptibles de contenir de grands tableaux numériques
+TYPED_ARRAY_ATTRIBUTES = ('x', 'y', 'z', 'values', 'marker.color', 'marker.size')
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+
+
+def typed_array(values, dtype):
+    """Spécification de tableau typé plotly.js : {'dtype': 'f4', 'bdata': <base64>}"""
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {
+        'dtype': f'{array.dtype.kind}{array.dtype.itemsize}',
+        'bdata': base64.b64encode(array.tobytes()).decode('ascii')
+    }
+
+
+def _encode_values(values):
+    """Encode un tableau en tableau typé ; retourne (spécification, est_une_date) ou (None, False)"""
+    array = np.asarray(values)
+    if array.ndim != 1 or array.size == 0:
+        return None, False
+
+    if array.dtype.kind == 'M':
+        # Dates en millisecondes depuis l'époque (axe de type date côté plotly.js)
+        epoch_ms = array.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+        return typed_array(epoch_ms, 'f8'), True
+    if array.dtype.kind == 'f':
+        return typed_array(array, 'f4'), False
+    if array.dtype.kind in 'iu' and INT32_RANGE[0] <= array.min() and array.max() <= INT32_RANGE[1]:
+        return typed_array(array, 'i4'), False
+    return None, False
+
+
+def compact_figure(fig):
+    """Remplace en place les tableaux des traces par des tableaux typés compacts"""
+    for trace in fig.data:
+        for attribute in TYPED_ARRAY_ATTRIBUTES:
+            parent, _, name = attribute.rpartition('.')
+            if parent and parent not in trace:
+                continue
+            owner = trace[parent] if parent else trace
+            if name not in owner or owner[name] is None or isinstance(owner[name], (str, dict)):
+                continue
+
+            encoded, is_date = _encode_values(owner[name])
+            if encoded is None:
+                continue
+            owner[name] = encoded
+
+            # Les nombres sur un axe temporel doivent être déclarés explicitement comme dates
+            if is_date and name in ('x', 'y'):
+                axis_ref = getattr(trace, f'{name}axis', None) or name
+                fig.layout[axis_ref.replace(name, f'{name}axis', 1)].type = 'date'
+    return fig
+
+
+def _array_length(values):
+    """Nombre d'éléments d'un tableau, encodé en tableau typé ou non"""
+    if values is None or isinstance(values, str):
+        return 0
+    if isinstance(values, dict):
+        return len(base64.b64decode(values['bdata'])) // int(values['dtype'][1:])
+    return len(values)
+
+
+def count_points(fig):
+    """Nombre total de points (abscisses ou valeurs) de toutes les traces"""
+    return sum(
+        _array_length(trace['x'] if 'x' in trace else None) or _array_length(trace['values'] if 'values' in trace else None)
+        for trace in fig.data
+    )
+
+
+def payload_size(fig):
+    """Taille (octets) du JSON envoyé au navigateur pour une figure"""
+    return len(pio.to_json(fig, validate=False).encode('utf-8'))
+
+
+def figure_size_report(fig, before=None):
+    """Ligne de rapport de taille pour une figure (avant/après compactage)"""
+    title = fig.layout.title.text or '(sans titre)'
+    after = payload_size(fig)
+    return {
+        'figure': title,
+        'points': count_points(fig),
+        'avant_ko': round(before / 1024, 1) if before is not None else None,
+        'apres_ko': round(after / 1024, 1),
+        'gain_pct': round((1 - after / before) * 100, 1) if before else None
+    }
@@ -0,0 +1,164 @@
+"""Géométries des territoires pour la carte : GeoJSON embarqué et simplification par niveau de zoom
+
+Les contours sont lus une fois dans le GeoJSON livré avec le paquet
+(impots/geodata), puis simplifiés (Douglas-Peucker vectorisé NumPy) pour
+chaque niveau de zoom ; chaque version simplifiée est mise en cache pour la
+durée du processus. La jointure avec les indicateurs se fait par code
+territoire (propriété 'code' des entités) sans modifier les géométries en cache.
+"""
+from functools import lru_cache
+import json
+import os
+
+import numpy as np
+
+GEOJSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geodata', 'drom_com.geojson')
+
+# Tolérance de simplification (degrés) par niveau de zoom
+ZOOM_TOLERANCES = {
+    'monde': 0.02,
+    'region': 0.005,
+    'detail': 0.0,
+}
+# Étendue maximale (degrés) de la zone affichée pour chaque niveau, du plus fin au plus grossier
+ZOOM_SPANS = (('detail', 1.5), ('region', 30.0))
+COORDINATE_DECIMALS = 4  # ~10 m, largement suffisant à l'affichage
+
+
+def douglas_peucker(points, tolerance):
+    """Indices conservés d'une polyligne (n × 2) simplifiée à la tolérance donnée"""
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if tolerance <= 0 or n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            # Distance de chaque point intermédiaire au segment (produit vectoriel)
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.extend([(start, index), (index, end)])
+    return np.flatnonzero(keep)
+
+
+def simplify_ring(ring, tolerance):
+    """Anneau fermé simplifié ; un anneau trop petit pour la tolérance garde un triangle"""
+    ring = np.asarray(ring, dtype=float)
+    if tolerance <= 0:
+        return ring.round(COORDINATE_DECIMALS)
+    # Découpage au point le plus éloigné du premier : deux polylignes ouvertes
+    split = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+    first = ring[:split + 1][douglas_peucker(ring[:split + 1], tolerance)]
+    second = ring[split:][douglas_peucker(ring[split:], tolerance)]
+    simplified = np.vstack([first, second[1:]])
+    if len(simplified) < 4:
+        simplified = ring[np.linspace(0, len(ring) - 1, 4).astype(int)]
+    return simplified.round(COORDINATE_DECIMALS)
+
+
+def simplify_geometry(geometry, tolerance):
+    """Polygon ou MultiPolygon GeoJSON simplifié"""
+    if geometry['type'] == 'Polygon':
+        polygons, multi = [geometry['coordinates']], False
+    elif geometry['type'] == 'MultiPolygon':
+        polygons, multi = geometry['coordinates'], True
+    else:
+        return geometry
+    simplified = [[simplify_ring(ring, tolerance).tolist() for ring in polygon] for polygon in polygons]
+    return {'type': geometry['type'], 'coordinates': simplified if multi else simplified[0]}
+
+
+@lru_cache(maxsize=None)
+def load_geojson(path=GEOJSON_PATH):
+    """GeoJSON embarqué, lu une fois par processus"""
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+@lru_cache(maxsize=None)
+def simplified_geojson(level='monde', path=GEOJSON_PATH):
+    """Contours simplifiés pour un niveau de zoom (cache du processus, ne pas modifier)"""
+    tolerance = ZOOM_TOLERANCES[level]
+    source = load_geojson(path)
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'properties': dict(feature['properties']),
+             'geometry': simplify_geometry(feature['geometry'], tolerance)}
+            for feature in source['features']
+        ],
+    }
+
+
+def join_properties(geojson, frame, key='territoire', columns=None):
+    """Copie du GeoJSON dont les propriétés reçoivent les colonnes de frame (jointure par code)"""
+    records = frame.set_index(key)[list(columns) if columns else frame.columns.drop(key)]
+    records = records.to_dict('index')
+    features = []
+    for feature in geojson['features']:
+        code = feature['properties']['code']
+        if code not in records:
+            continue
+        features.append({'type': 'Feature',
+                         'properties': {**feature['properties'], **records[code]},
+                         'geometry': feature['geometry']})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def feature_bounds(geojson, codes=None):
+    """Emprise [[lat_min, lon_min], [lat_max, lon_max]] des entités (toutes, ou celles de codes)"""
+    coordinates = []
+    for feature in geojson['features']:
+        if codes is not None and feature['properties']['code'] not in codes:
+            continue
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        coordinates.extend(np.asarray(polygon[0]) for polygon in polygons)
+    points = np.vstack(coordinates)
+    (lon_min, lat_min), (lon_max, lat_max) = points.min(axis=0), points.max(axis=0)
+    return [[float(lat_min), float(lon_min)], [float(lat_max), float(lon_max)]]
+
+
+def zoom_level(bounds):
+    """Niveau de simplification adapté à l'étendue d'une emprise"""
+    (lat_min, lon_min), (lat_max, lon_max) = bounds
+    span = max(lat_max - lat_min, lon_max - lon_min)
+    for level, max_span in ZOOM_SPANS:
+        if span <= max_span:
+            return level
+    return 'monde'
+
+
+def feature_centers(geojson):
+    """Centre de l'emprise de chaque entité : {code: (lat, lon)}"""
+    return {
+        feature['properties']['code']: tuple(
+            float(value) for value in np.mean(feature_bounds(geojson, {feature['properties']['code']}), axis=0)
+        )
+        for feature in geojson['features']
+    }
+
+
+def vertex_count(geojson):
+    """Nombre total de sommets (taille de la géométrie envoyée au navigateur)"""
+    return sum(
+        len(ring)
+        for feature in geojson['features']
+        for polygon in (feature['geometry']['coordinates'] if feature['geometry']['type'] == 'MultiPolygon'
+                        else [feature['geometry']['coordinates']])
+        for ring in polygon
+    )
@@ -0,0 +1,126 @@
+"""Arbre d'agrégats pour l'exploration hiérarchique des recettes
+
+Hiérarchie : type d'impôt → sous-catégorie → catégorie → mois. L'arbre est
+construit une fois à partir de l'historique ; chaque nœud conserve sa valeur
+agrégée et la liste ordonnée de ses enfants, si bien que déplier un nœud est
+une simple lecture de ses enfants, sans nouveau groupby sur l'historique.
+Les ticks temps réel alimentent la feuille du mois en cours de chaque
+catégorie modifiée et répercutent l'écart sur ses seuls ancêtres.
+"""
+import numpy as np
+import pandas as pd
+
+LEVELS = ('type_impot', 'sous_categorie', 'categorie', 'mois')
+ROOT_LABEL = 'Total'
+
+
+class AggregateTree:
+    """Agrégats précalculés par nœud (chemin = tuple des libellés depuis la racine)"""
+
+    def __init__(self, historical_data, categories, value='montant_total_impots'):
+        monthly = historical_data.pivot_table(index='date', columns='categorie', values=value, aggfunc='sum')
+        monthly = monthly.sort_index().fillna(0.0)
+        periods = monthly.index.to_period('M')
+
+        self._values = {(): 0.0}
+        self._children = {(): {}}
+        self._paths = {}
+        # Mois en cours : celui qui suit le dernier mois d'historique
+        self.live_period = str(periods.max() + 1) if len(periods) else None
+
+        period_labels = periods.astype(str).tolist()
+        for categorie in monthly.columns:
+            info = categories[categorie]
+            path = (info['type_impot'], info['sous_categorie'], categorie)
+            self._paths[categorie] = path
+            self._add_path(path)
+
+            series = monthly[categorie].to_numpy(dtype=float)
+            children = self._children[path]
+            for label, amount in zip(period_labels, series):
+                leaf = path + (label,)
+                self._values[leaf] = float(amount)
+                children[label] = None
+            self._propagate(path, float(series.sum()))
+
+    def _add_path(self, path):
+        """Crée les nœuds manquants le long d'un chemin"""
+        for depth in range(len(path)):
+            parent, node = path[:depth], path[:depth + 1]
+            if node not in self._values:
+                self._values[node] = 0.0
+                self._children[node] = {}
+                self._children[parent][path[depth]] = None
+
+    def _propagate(self, path, delta):
+        """Ajoute delta au nœud et à tous ses ancêtres (racine comprise)"""
+        for depth in range(len(path) + 1):
+            self._values[path[:depth]] += delta
+
+    def __contains__(self, path):
+        return tuple(path) in self._values
+
+    def value(self, path=()):
+        return self._values[tuple(path)]
+
+    def path_of(self, categorie):
+        """Chemin (type, sous-catégorie, catégorie) d'une catégorie"""
+        return self._paths[categorie]
+
+    def children(self, path=()):
+        """Enfants d'un nœud : libellé, valeur et part du parent (lecture directe)"""
+        path = tuple(path)
+        labels = list(self._children.get(path, ()))
+        values = np.array([self._values[path + (label,)] for label in labels], dtype=float)
+        parent = self._values[path]
+        return pd.DataFrame({
+            'noeud': labels,
+            'niveau': LEVELS[len(path)] if len(path) < len(LEVELS) else None,
+            'montant': values,
+            'part_pct': values / parent * 100 if parent else np.nan,
+        })
+
+    def apply_tick(self, current_data, changed_categories=None, value_column='montant_mensuel'):
+        """Met à jour la feuille du mois en cours des catégories modifiées (et leurs ancêtres)"""
+        if self.live_period is None:
+            return
+        rows = current_data
+        if changed_categories is not None:
+            rows = current_data[current_data['categorie'].isin(changed_categories)]
+        for categorie, amount in zip(rows['categorie'], rows[value_column].to_numpy(dtype=float)):
+            path = self._paths.get(categorie)
+            if path is None:
+                continue
+            leaf = path + (self.live_period,)
+            if leaf not in self._values:
+                self._values[leaf] = 0.0
+                self._children[path][self.live_period] = None
+            delta = float(amount) - self._values[leaf]
+            self._values[leaf] = float(amount)
+            self._propagate(path, delta)
+
+    def to_plotly(self, root=(), max_depth=3):
+        """ids / labels / parents / values pour un sunburst ou un treemap (branchvalues='remainder')
+
+        Seules les feuilles exportées portent une valeur : Plotly additionne les
+        enfants, ce qui garantit des parents cohérents sans arrondi.
+        """
+        root = tuple(root)
+
+        def node_id(path):
+            return ' / '.join((ROOT_LABEL,) + path)
+
+        ids, labels, parents, values = [], [], [], []
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            children = list(self._children.get(path, ()))
+            depth = len(path) - len(root)
+            is_leaf = depth == max_depth or not children
+            ids.append(node_id(path))
+            labels.append(path[-1] if path else ROOT_LABEL)
+            parents.append('' if path == root else node_id(path[:-1]))
+            values.append(self._values[path] if is_leaf else 0.0)
+            if not is_leaf:
+                stack.extend(path + (label,) for label in reversed(children))
+        return {'ids': ids, 'labels': labels, 'parents': parents, 'values': values}
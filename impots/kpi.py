@@ -0,0 +1,114 @@
+"""Indicateurs clés (KPI) calculés en une seule passe vectorisée
+
+Toutes les réductions (sommes, moyenne, nombre de catégories en hausse,
+ratios par habitant et par contribuable) sont obtenues par des bincount sur
+l'indice du territoire : une table current_data d'un territoire ou la table
+empilée de tous les territoires se traite de la même façon, au même coût.
+Les montants sont sommés dans la monnaie de chaque territoire puis convertis
+sur les seuls totaux (currency='EUR' pour comparer des territoires) ; le taux
+de prélèvement rapporte toujours des M€ au PIB (en milliards d'euros).
+Le moteur d'un territoire met les indicateurs en cache par version des
+données et conserve ceux de la version précédente pour calculer de vrais écarts.
+"""
+import numpy as np
+import pandas as pd
+
+from impots.currency import REPORTING_CURRENCY, factor_vector
+
+# Indicateurs exprimés dans la monnaie du territoire (les autres sont sans unité monétaire)
+MONETARY_COLUMNS = ('montant_total_mensuel', 'montant_total_annuel', 'impot_par_habitant', 'impot_moyen',
+                    'montant_annee_precedente', 'montant_mois_precedent')
+
+
+def kpi_table(current_data, territories, currency=None):
+    """Indicateurs par territoire (index) à partir de current_data d'un ou plusieurs territoires
+
+    Les montants sont en millions, dans la monnaie de chaque territoire
+    (currency=None) ou convertis dans currency ; territories fournit
+    population, PIB et monnaie de chaque territoire.
+    """
+    # Territoires dans leur ordre d'apparition
+    rows, codes = pd.factorize(current_data['territoire'].to_numpy(dtype=object))
+    n = len(codes)
+
+    def total(values):
+        return np.bincount(rows, weights=np.asarray(values, dtype=float), minlength=n)
+
+    montant = current_data['montant_mensuel'].to_numpy(dtype=float)
+    variation = current_data['variation_pct'].to_numpy(dtype=float)
+
+    # Conversion des seuls totaux par territoire
+    to_eur = factor_vector(codes, territories, REPORTING_CURRENCY)
+    scale = np.ones(n) if currency is None else factor_vector(codes, territories, currency)
+
+    montant_local = total(montant)
+    montant_mensuel = montant_local * scale
+    montant_annuel = montant_mensuel * 12
+    contribuables = total(current_data['nombre_contribuables'])
+    nombre_categories = np.bincount(rows, minlength=n)
+    population = np.array([territories[code]['population'] for code in codes], dtype=float)
+    pib = np.array([territories[code]['pib'] for code in codes], dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        impot_moyen = np.where(contribuables > 0, montant_annuel * 1e6 / contribuables, 0.0)
+        return pd.DataFrame({
+            'montant_total_mensuel': montant_mensuel,
+            'montant_total_annuel': montant_annuel,
+            'variation_moyenne': total(variation) / nombre_categories,
+            'contribuables_total': contribuables,
+            'categories_hausse': total(variation > 0).astype(np.int64),
+            'nombre_categories': nombre_categories,
+            # Les données sont en millions, donc il faut multiplier par 1e6 pour obtenir les valeurs réelles
+            'impot_par_habitant': montant_annuel * 1e6 / population,
+            'impot_moyen': impot_moyen,
+            'taux_prelevement': montant_local * 12 * to_eur / (pib * 1e3) * 100,  # PIB en Md€
+            'montant_annee_precedente': total(current_data['montant_annee_precedente']) * scale,
+            # Dernier mois d'historique : montant courant diminué de sa variation simulée
+            'montant_mois_precedent': total(montant - current_data['variation_abs'].to_numpy(dtype=float)) * scale,
+        }, index=pd.Index(codes, name='territoire'))
+
+
+def _pct_change(new, old):
+    if old is None or not np.isfinite(old) or old == 0:
+        return None
+    return (new / old - 1) * 100
+
+
+class KpiEngine:
+    """Indicateurs d'un territoire, en cache par version, avec ceux de la version précédente"""
+
+    def __init__(self, territory_code, territory_info):
+        self.territory_code = territory_code
+        self.territories = {territory_code: territory_info}
+        self.version = None
+        self.current = None
+        self.previous = None
+        self.reporting = None
+        self._to_reporting = factor_vector([territory_code], self.territories, REPORTING_CURRENCY)[0]
+
+    def update(self, version, current_data):
+        """Indicateurs de la version donnée (recalculés seulement si la version change)"""
+        if version != self.version:
+            self.previous = self.current
+            self.current = kpi_table(current_data, self.territories).loc[self.territory_code]
+            # Mêmes indicateurs en euros, convertis à partir des montants locaux (même version)
+            self.reporting = self.current.copy()
+            self.reporting[list(MONETARY_COLUMNS)] *= self._to_reporting
+            self.version = version
+        return self.current
+
+    def deltas(self):
+        """Écarts réels (%) : vs version précédente, ou vs référence historique au premier affichage"""
+        current, previous = self.current, self.previous
+        monthly_reference = (previous['montant_total_mensuel'] if previous is not None
+                             else current['montant_mois_precedent'])
+        return {
+            'montant_total_mensuel': _pct_change(current['montant_total_mensuel'], monthly_reference),
+            'montant_total_annuel': _pct_change(current['montant_total_annuel'], current['montant_annee_precedente']),
+            'contribuables_total': (_pct_change(current['contribuables_total'], previous['contribuables_total'])
+                                    if previous is not None else None),
+            'impot_moyen': (_pct_change(current['impot_moyen'], previous['impot_moyen'])
+                            if previous is not None else None),
+            'categories_hausse': (int(current['categories_hausse'] - previous['categories_hausse'])
+                                  if previous is not None else None),
+        }
@@ -0,0 +1,106 @@
+"""Classements incrémentaux des lignes fiscales (territoire × catégorie)
+
+Chaque classement est une liste triée indexée (SortedList de
+sortedcontainers) de couples (-valeur, clé) : un tick ne repositionne que les
+lignes modifiées (retrait puis insertion, O(log n) chacune) au lieu de retrier
+la table à chaque réexécution. Le top k est une simple tranche de la liste.
+
+Un Leaderboard tient, pour chaque champ classé, un classement global de
+toutes les lignes DROM-COM et un classement par territoire. Les montants du
+classement global sont convertis en euros (monnaies locales différentes) ;
+les classements par territoire restent en monnaie locale.
+"""
+import numpy as np
+import pandas as pd
+from sortedcontainers import SortedList
+
+from impots.currency import REPORTING_CURRENCY, conversion_factor, territory_currencies
+
+# Champs classés et conversion en euros pour le classement global
+RANKED_FIELDS = {'montant_mensuel': True, 'variation_pct': False}
+
+
+class RankedIndex:
+    """Valeurs par clé, maintenues triées par valeur décroissante"""
+
+    def __init__(self):
+        self._values = {}
+        self._order = SortedList()  # (-valeur, clé), croissant
+
+    def __len__(self):
+        return len(self._order)
+
+    def update(self, key, value):
+        """Positionne une clé (NaN : la retire du classement)"""
+        old = self._values.pop(key, None)
+        if old is not None:
+            if old == value:
+                self._values[key] = old
+                return
+            self._order.remove((-old, key))
+        if not np.isnan(value):
+            self._values[key] = value
+            self._order.add((-value, key))
+
+    def top(self, k=10):
+        """k premières clés et leurs valeurs"""
+        return [(key, -value) for value, key in self._order[:k]]
+
+    def rank(self, key):
+        """Rang (à partir de 1) d'une clé, None si absente"""
+        if key not in self._values:
+            return None
+        return self._order.index((-self._values[key], key)) + 1
+
+
+class Leaderboard:
+    """Classements global et par territoire des lignes fiscales, mis à jour tick par tick"""
+
+    def __init__(self, territories, fields=RANKED_FIELDS, target=REPORTING_CURRENCY):
+        self.fields = dict(fields)
+        self.target = target
+        self._factors = {code: conversion_factor(currency, target)
+                         for code, currency in territory_currencies(territories).items()}
+        self._global = {field: RankedIndex() for field in self.fields}
+        self._territories = {}
+        self.updates = 0
+
+    def __len__(self):
+        return len(self._global[next(iter(self.fields))])
+
+    def observe(self, frame, categories=None, key='categorie'):
+        """Repositionne les lignes de frame (toutes, ou seulement les catégories modifiées)
+
+        frame est la table courante d'un territoire (colonne 'territoire') ; retourne
+        le nombre de lignes repositionnées.
+        """
+        if categories is not None:
+            frame = frame[frame[key].isin(categories)]
+        if frame.empty:
+            return 0
+        territory_codes = frame['territoire'].to_numpy()
+        keys = frame[key].to_numpy()
+        for field, converted in self.fields.items():
+            values = frame[field].to_numpy(dtype=float)
+            for territory_code, categorie, value in zip(territory_codes, keys, values):
+                local = self._territories.setdefault(territory_code, {}).setdefault(field, RankedIndex())
+                local.update(categorie, value)
+                factor = self._factors.get(territory_code, 1.0) if converted else 1.0
+                self._global[field].update((territory_code, categorie), value * factor)
+        self.updates += len(frame)
+        return len(frame)
+
+    def top(self, field, k=10, territory_code=None):
+        """Top k d'un champ (toutes lignes DROM-COM, ou celles d'un territoire)"""
+        if territory_code is None:
+            rows = [(code, categorie, value) for (code, categorie), value in self._global[field].top(k)]
+        else:
+            index = self._territories.get(territory_code, {}).get(field, RankedIndex())
+            rows = [(territory_code, categorie, value) for categorie, value in index.top(k)]
+        result = pd.DataFrame(rows, columns=['territoire', 'categorie', field])
+        result.insert(0, 'rang', np.arange(1, len(result) + 1))
+        return result
+
+    def rank(self, field, territory_code, categorie):
+        """Rang d'une ligne dans le classement global d'un champ"""
+        return self._global[field].rank((territory_code, categorie))
@@ -0,0 +1,232 @@
+"""Données temps réel versionnées : compteur de version et journal des modifications
+
+Chaque mise à jour de current_data est comparée champ par champ à l'état
+précédent ; seules les cellules modifiées sont ajoutées au journal
+(catégorie, champ, ancienne valeur, nouvelle valeur, horodatage) et la version
+du territoire est incrémentée. Les caches peuvent ainsi s'indexer sur la
+version et n'invalider que les catégories touchées, et le journal permet de
+rejouer les mouvements de la journée.
+
+Les valeurs successives de chaque catégorie sont en outre conservées dans un
+tampon circulaire NumPy de taille fixe (sparklines et statistiques glissantes).
+"""
+from datetime import datetime
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Champs numériques suivis dans current_data
+TRACKED_FIELDS = ('montant_mensuel', 'variation_pct', 'variation_abs', 'nombre_contribuables', 'montant_moyen')
+
+
+class ChangeLog:
+    """Journal append-only des modifications, stocké par colonnes"""
+
+    COLUMNS = ('version', 'timestamp', 'categorie', 'champ', 'ancienne_valeur', 'nouvelle_valeur')
+
+    def __init__(self):
+        self._columns = {column: [] for column in self.COLUMNS}
+
+    def __len__(self):
+        return len(self._columns['version'])
+
+    def append(self, version, timestamp, categories, fields, old_values, new_values):
+        """Ajoute un lot de modifications partageant la même version"""
+        count = len(categories)
+        self._columns['version'].extend([version] * count)
+        self._columns['timestamp'].extend([timestamp] * count)
+        self._columns['categorie'].extend(categories)
+        self._columns['champ'].extend(fields)
+        self._columns['ancienne_valeur'].extend(old_values)
+        self._columns['nouvelle_valeur'].extend(new_values)
+
+    def truncate(self, count):
+        """Retire et retourne les count plus anciennes entrées"""
+        removed = {column: values[:count] for column, values in self._columns.items()}
+        for values in self._columns.values():
+            del values[:count]
+        return pd.DataFrame(removed, columns=self.COLUMNS)
+
+    def to_frame(self, since_version=None, until_version=None, categorie=None, champ=None,
+                 start=None, end=None):
+        """Entrées du journal filtrées (version, catégorie, champ, période)"""
+        log = pd.DataFrame(self._columns, columns=self.COLUMNS)
+        mask = np.ones(len(log), dtype=bool)
+        if since_version is not None:
+            mask &= log['version'].to_numpy() > since_version
+        if until_version is not None:
+            mask &= log['version'].to_numpy() <= until_version
+        if categorie is not None:
+            mask &= log['categorie'].to_numpy() == categorie
+        if champ is not None:
+            mask &= log['champ'].to_numpy() == champ
+        if start is not None:
+            mask &= log['timestamp'].to_numpy() >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            mask &= log['timestamp'].to_numpy() <= np.datetime64(pd.Timestamp(end))
+        return log[mask].reset_index(drop=True)
+
+
+def _apply_changes(frame, changes):
+    """Applique des entrées du journal (dans l'ordre) à une table indexée par catégorie"""
+    if changes.empty:
+        return frame
+    latest = changes.drop_duplicates(['categorie', 'champ'], keep='last')
+    for field, field_changes in latest.groupby('champ', sort=False):
+        frame.loc[field_changes['categorie'].to_numpy(), field] = field_changes['nouvelle_valeur'].to_numpy()
+    return frame
+
+
+class VersionedSnapshot:
+    """current_data d'un territoire avec version et journal des modifications"""
+
+    def __init__(self, territory_code, frame, key='categorie', fields=TRACKED_FIELDS,
+                 max_log_entries=None, timestamp=None):
+        self.territory_code = territory_code
+        self.key = key
+        self.fields = [field for field in fields if field in frame.columns]
+        self.max_log_entries = max_log_entries
+
+        self.current = frame
+        self.version = 0
+        self.last_update = timestamp or datetime.now()
+        self.log = ChangeLog()
+
+        # État de référence pour rejouer le journal (avancé lorsque le journal est tronqué)
+        self._base = frame.set_index(key)[self.fields].copy()
+        self._base_version = 0
+        self._changed_at = {}
+
+    def update(self, new_frame, timestamp=None):
+        """Enregistre un nouvel état ; retourne les catégories modifiées"""
+        timestamp = timestamp or datetime.now()
+        old = self.current.set_index(self.key)[self.fields]
+        new = new_frame.set_index(self.key)[self.fields].reindex(old.index)
+
+        old_values = old.to_numpy(dtype=float)
+        new_values = new.to_numpy(dtype=float)
+        changed = (old_values != new_values) & ~(np.isnan(old_values) & np.isnan(new_values))
+        rows, cols = np.nonzero(changed)
+
+        self.current = new_frame
+        if len(rows) == 0:
+            return set()
+
+        self.version += 1
+        self.last_update = timestamp
+        categories = old.index.to_numpy()[rows].tolist()
+        self.log.append(
+            self.version,
+            np.datetime64(pd.Timestamp(timestamp)),
+            categories,
+            [self.fields[col] for col in cols],
+            old_values[rows, cols].tolist(),
+            new_values[rows, cols].tolist()
+        )
+        for categorie in set(categories):
+            self._changed_at[categorie] = self.version
+
+        if self.max_log_entries is not None and len(self.log) > self.max_log_entries:
+            self._compact(len(self.log) - self.max_log_entries)
+        return set(categories)
+
+    def _compact(self, count):
+        """Intègre les plus anciennes entrées du journal dans l'état de référence"""
+        removed = self.log.truncate(count)
+        _apply_changes(self._base, removed)
+        self._base_version = int(removed['version'].max())
+
+    def changed_since(self, version):
+        """Catégories modifiées après une version donnée"""
+        return {categorie for categorie, changed_version in self._changed_at.items() if changed_version > version}
+
+    @property
+    def oldest_replayable_version(self):
+        return self._base_version
+
+    def replay(self, version=None, timestamp=None):
+        """État des champs suivis à une version (ou à un instant) donné(e)"""
+        if timestamp is not None:
+            log = self.log.to_frame(end=timestamp)
+            version = int(log['version'].max()) if not log.empty else self._base_version
+        if version is None:
+            version = self.version
+        if version < self._base_version:
+            raise ValueError(
+                f"Version {version} antérieure au journal conservé (version minimale {self._base_version})"
+            )
+
+        state = self._base.copy()
+        return _apply_changes(state, self.log.to_frame(until_version=version)).reset_index()
+
+
+class TickRingBuffer:
+    """Tampon circulaire des ticks temps réel d'un territoire (catégories × capacité)
+
+    Mémoire constante : chaque actualisation écrit une colonne par champ, en
+    écrasant la plus ancienne une fois la capacité atteinte.
+    """
+
+    FIELDS = ('montant_mensuel', 'variation_pct')
+
+    def __init__(self, categories, capacity=120):
+        self.categories = list(categories)
+        self.capacity = capacity
+        self._rows = {categorie: row for row, categorie in enumerate(self.categories)}
+        self._values = {field: np.full((len(self.categories), capacity), np.nan) for field in self.FIELDS}
+        self._timestamps = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self._head = 0  # prochaine colonne à écrire
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self, frame, timestamp=None, key='categorie'):
+        """Enregistre un tick pour toutes les catégories présentes dans frame"""
+        rows = np.array([self._rows[categorie] for categorie in frame[key]], dtype=np.int64)
+        for field in self.FIELDS:
+            column = self._values[field][:, self._head]
+            column[:] = np.nan
+            column[rows] = frame[field].to_numpy(dtype=float)
+        self._timestamps[self._head] = np.datetime64(pd.Timestamp(timestamp or datetime.now()), 'ns')
+
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _chronological(self, last_n=None):
+        """Indices des colonnes des last_n derniers ticks, du plus ancien au plus récent"""
+        n = self.count if last_n is None else min(last_n, self.count)
+        return (self._head - n + np.arange(n)) % self.capacity
+
+    def values(self, field, last_n=None):
+        """Matrice (catégories × ticks) d'un champ, ordre chronologique"""
+        return self._values[field][:, self._chronological(last_n)]
+
+    def timestamps(self, last_n=None):
+        return self._timestamps[self._chronological(last_n)]
+
+    def series(self, categorie, field='montant_mensuel', last_n=None):
+        """Série chronologique d'une catégorie"""
+        return self.values(field, last_n)[self._rows[categorie]]
+
+    def sparklines(self, field='montant_mensuel', last_n=None):
+        """Listes de valeurs par catégorie, prêtes pour une colonne de sparklines"""
+        return dict(zip(self.categories, self.values(field, last_n).tolist()))
+
+    def rolling_stats(self, last_n=None):
+        """Statistiques glissantes par catégorie sur les last_n derniers ticks"""
+        montants = self.values('montant_mensuel', last_n)
+        variations = self.values('variation_pct', last_n)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            stats = pd.DataFrame({
+                'categorie': self.categories,
+                'ticks': np.sum(~np.isnan(montants), axis=1),
+                'montant_dernier': montants[:, -1] if montants.shape[1] else np.nan,
+                'montant_min': np.nanmin(montants, axis=1),
+                'montant_max': np.nanmax(montants, axis=1),
+                'variation_moyenne': np.nanmean(variations, axis=1),
+                'volatilite': np.nanstd(variations, axis=1),
+            })
+        return stats
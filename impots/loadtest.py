@@ -0,0 +1,197 @@
+"""Test de charge : sessions concurrentes simulées du dashboard, sans navigateur
+
+Chaque session est pilotée par l'AppTest de Streamlit (exécution du script
+sans serveur, entièrement hors ligne) dans son propre thread, comme les
+sessions d'un même processus serveur. Une session enchaîne des actions tirées
+au hasard (changement de territoire, filtres des catégories temps réel,
+actualisation, simulateur) ; chaque action déclenche une réexécution du script
+dont on mesure la durée. Le rapport donne les latences p50/p95/p99 par action
+et la mémoire conservée par session ; la mémoire résidente ajoutée par les
+sessions est mesurée par rapport à un processus déjà chauffé (caches remplis
+par une première exécution), sans compter l'interpréteur ni les caches partagés.
+
+Exemple :
+    python -m impots loadtest --sessions 8 --actions 10
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from impots import data
+from impots.session import SHARED_TERRITORY_KEYS
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - plateformes sans getrusage
+    resource = None
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Dashboard.py')
+PERCENTILES = (50, 95, 99)
+
+# Valeurs proposées par les filtres de create_categories_live
+TYPE_FILTERS = ['Tous', 'Direct', 'Indirect', 'Local']
+PERFORMANCE_FILTERS = ['Toutes', 'En croissance', 'En décroissance', 'Stable']
+SORT_FILTERS = ['Montant mensuel', 'Variation %', 'Nombre contribuables', 'Taux moyen']
+
+
+def _widget(widgets, label):
+    """Widget d'un type donné par son libellé"""
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"Widget introuvable: {label}")
+
+
+def _switch_territory(at, rng, territory_names):
+    at.selectbox(key='territory_selector_main').set_value(str(rng.choice(territory_names)))
+
+
+def _change_filters(at, rng, territory_names):
+    type_filter = _widget(at.selectbox, "Type d'impôt:")
+    available_types = [value for value in TYPE_FILTERS if value in type_filter.options]
+    type_filter.set_value(str(rng.choice(available_types)))
+    _widget(at.selectbox, "Performance:").set_value(str(rng.choice(PERFORMANCE_FILTERS)))
+    _widget(at.selectbox, "Trier par:").set_value(str(rng.choice(SORT_FILTERS)))
+
+
+def _refresh(at, rng, territory_names):
+    _widget(at.button, "🔄 Actualiser les données").click()
+
+
+def _simulate(at, rng, territory_names):
+    _widget(at.number_input, "Revenu annuel (€):").set_value(float(rng.integers(10, 150) * 1000))
+    _widget(at.button, "Calculer l'Impôt").click()
+
+
+ACTIONS = {
+    'territoire': _switch_territory,
+    'filtres': _change_filters,
+    'actualiser': _refresh,
+    'simulateur': _simulate,
+}
+
+
+def session_memory(at):
+    """Mémoire (octets) des territoires conservés par la session, hors vues partagées"""
+    try:
+        territories_data = at.session_state['territories_data']
+    except KeyError:
+        return 0
+    return int(territories_data.footprint(SHARED_TERRITORY_KEYS)['session_octets'].sum())
+
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus (Mo), NaN hors Linux"""
+    try:
+        with open('/proc/self/statm') as handle:
+            resident_pages = int(handle.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return np.nan
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def run_session(session_id, actions, script=DEFAULT_SCRIPT, seed=0, timeout=300, keep=None):
+    """Exécute une session : premier affichage puis actions tirées au hasard
+
+    Retourne une ligne par réexécution (session, étape, action, durée, erreurs) ;
+    la session est ajoutée à keep (si fourni) pour rester en mémoire jusqu'à la mesure.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng([seed, session_id])
+    territory_names = [
+        info['nom_complet'] for info in data.get_territories_definitions().values() if info['impots_actif']
+    ]
+    at = AppTest.from_file(script, default_timeout=timeout)
+
+    rows = []
+    for step in range(actions + 1):
+        action = 'chargement' if step == 0 else str(rng.choice(list(ACTIONS)))
+        error = None
+        try:
+            if step > 0:
+                ACTIONS[action](at, rng, territory_names)
+            start = time.perf_counter()
+            at.run()
+            latency = time.perf_counter() - start
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as exc:  # une session en échec ne doit pas interrompre le test
+            latency, error = np.nan, f"{type(exc).__name__}: {exc}"
+        rows.append({'session': session_id, 'etape': step, 'action': action,
+                     'latence_s': latency, 'erreur': error})
+
+    memory = session_memory(at)
+    for row in rows:
+        row['memoire_session_octets'] = memory
+    if keep is not None:
+        keep.append(at)
+    return rows
+
+
+def run_load_test(sessions=4, actions=10, script=DEFAULT_SCRIPT, seed=0, timeout=300):
+    """Lance les sessions en parallèle ; retourne la table de toutes les réexécutions
+
+    La mémoire résidente avant (processus chauffé) et après les sessions, encore
+    en mémoire, est conservée dans results.attrs.
+    """
+    from streamlit import config
+    from streamlit.testing.v1 import AppTest
+
+    # Les commandes « magiques » analysent le script avec ast.parse, qui n'est pas
+    # sûr entre threads sous CPython 3.11 ; le dashboard ne les utilise pas.
+    config.set_option('runner.magicEnabled', False)
+    # Exécution préalable : caches de données et modules chargés avant la mesure de référence
+    AppTest.from_file(script, default_timeout=timeout).run()
+    rss_base = current_rss_mb()
+
+    alive = []
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = [
+            executor.submit(run_session, session_id, actions, script, seed, timeout, alive)
+            for session_id in range(sessions)
+        ]
+        rows = [row for future in futures for row in future.result()]
+    results = pd.DataFrame(rows)
+    results.attrs.update(rss_base_mo=rss_base, rss_sessions_mo=current_rss_mb())
+    return results
+
+
+def latency_summary(results):
+    """Latences par action (et toutes actions) : nombre, p50/p95/p99, max, erreurs"""
+    def summarize(group):
+        latencies = group['latence_s'].dropna().to_numpy()
+        values = np.percentile(latencies, PERCENTILES) if len(latencies) else [np.nan] * len(PERCENTILES)
+        return pd.Series({
+            'reexecutions': len(group),
+            **{f'p{percentile}_s': value for percentile, value in zip(PERCENTILES, values)},
+            'max_s': latencies.max() if len(latencies) else np.nan,
+            'erreurs': int(group['erreur'].notna().sum()),
+        })
+
+    by_action = {action: summarize(group) for action, group in results.groupby('action', sort=True)}
+    by_action['TOUTES'] = summarize(results)
+    return pd.DataFrame(by_action).T
+
+
+def memory_summary(results):
+    """Mémoire par session (Ko), pic de mémoire résidente du processus et surcoût des sessions (Mo)
+
+    Le surcoût est l'écart de mémoire résidente entre le processus chauffé et
+    la fin du test (sessions encore ouvertes), rapporté au nombre de sessions.
+    """
+    per_session = results.groupby('session')['memoire_session_octets'].first() / 1024
+    # ru_maxrss est en Ko sous Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else np.nan
+    added_rss_mb = results.attrs.get('rss_sessions_mo', np.nan) - results.attrs.get('rss_base_mo', np.nan)
+    return pd.Series({
+        'sessions': len(per_session),
+        'session_moyenne_ko': per_session.mean(),
+        'session_max_ko': per_session.max(),
+        'rss_pic_processus_mo': peak_rss_mb,
+        'rss_base_chauffe_mo': results.attrs.get('rss_base_mo', np.nan),
+        'rss_ajout_par_session_mo': added_rss_mb / max(len(per_session), 1),
+    })
@@ -0,0 +1,99 @@
+"""Projections Monte Carlo des recettes : éventails de percentiles
+
+Chaque trajectoire suit, par catégorie, une marche log-normale mensuelle
+(tendance = évolution annuelle de la catégorie) dont une part de la variance
+est commune à toutes les catégories du territoire (conjoncture), multipliée
+par le même bruit mensuel ±5 % que la projection à trajectoire unique.
+
+Les trajectoires sont simulées par blocs (trajectoires × mois × catégories)
+avec un flux aléatoire par bloc : le résultat ne dépend ni de l'ordre de
+calcul ni du nombre de workers. Seuls les totaux mensuels et les cumuls par
+catégorie de chaque trajectoire sont conservés, jamais le cube complet.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import numpy as np
+import pandas as pd
+
+from impots.seeding import ALL_CATEGORIES, stream_rng
+
+DEFAULT_PATHS = 10000
+CHUNK_PATHS = 2000
+MONTHLY_VOLATILITY = 0.02
+COMMON_SHOCK_SHARE = 0.5  # Part de la variance commune aux catégories
+OBSERVATION_NOISE = 0.05
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _simulate_chunk(rng, base, drift, n_paths, n_months, volatility):
+    """Montants mensuels d'un bloc de trajectoires (trajectoires × mois × catégories)"""
+    n_categories = len(base)
+    common = rng.standard_normal((n_paths, n_months, 1))
+    shocks = rng.standard_normal((n_paths, n_months, n_categories))
+    shocks *= np.sqrt(1 - COMMON_SHOCK_SHARE)
+    shocks += np.sqrt(COMMON_SHOCK_SHARE) * common
+    shocks *= volatility
+    shocks += drift - volatility ** 2 / 2  # Espérance du niveau = tendance seule
+    levels = np.exp(np.cumsum(shocks, axis=1, out=shocks), out=shocks)
+    levels *= rng.uniform(1 - OBSERVATION_NOISE, 1 + OBSERVATION_NOISE, levels.shape)
+    levels *= base
+    return levels
+
+
+def monte_carlo_projection(territory_code, categories, last_date, projection_years=5, paths=DEFAULT_PATHS,
+                           volatility=MONTHLY_VOLATILITY):
+    """Éventail de projection d'un territoire
+
+    Retourne {'bands': percentiles du total mensuel par date (M€),
+              'categories': percentiles du cumul sur l'horizon par catégorie (M€),
+              'paths': nombre de trajectoires, 'elapsed': durée du calcul (s)}.
+    """
+    started = time.perf_counter()
+    categorie_codes = list(categories)
+    n_months = projection_years * 12
+    dates = pd.date_range(start=last_date + pd.DateOffset(months=1), periods=n_months, freq='ME')
+    period = pd.Timestamp(last_date).strftime('%Y-%m')
+
+    base = np.array([categories[code]['montant_annuel'] / 12 for code in categorie_codes], dtype=float)
+    drift = np.log1p(np.array([categories[code]['evolution_annuelle'] for code in categorie_codes], dtype=float) / 100) / 12
+
+    totals = np.empty((paths, n_months))
+    cumulated = np.empty((paths, len(categorie_codes)))
+    for start in range(0, paths, CHUNK_PATHS):
+        n_paths = min(CHUNK_PATHS, paths - start)
+        # Un flux par bloc, indexé par la première trajectoire du bloc
+        rng = stream_rng(territory_code, ALL_CATEGORIES, f'montecarlo:{period}:{start}')
+        levels = _simulate_chunk(rng, base, drift, n_paths, n_months, volatility)
+        totals[start:start + n_paths] = levels.sum(axis=2)
+        cumulated[start:start + n_paths] = levels.sum(axis=1)
+
+    columns = [f'p{percentile}' for percentile in BAND_PERCENTILES]
+    bands = pd.DataFrame(np.percentile(totals, BAND_PERCENTILES, axis=0).T, columns=columns)
+    bands.insert(0, 'date', dates)
+    bands['moyenne'] = totals.mean(axis=0)
+
+    category_bands = pd.DataFrame(np.percentile(cumulated, BAND_PERCENTILES, axis=0).T, columns=columns)
+    category_bands.insert(0, 'categorie', categorie_codes)
+    category_bands['moyenne'] = cumulated.mean(axis=0)
+
+    return {'bands': bands, 'categories': category_bands, 'paths': paths,
+            'elapsed': time.perf_counter() - started}
+
+
+def monte_carlo_projections(jobs, projection_years=5, paths=DEFAULT_PATHS, volatility=MONTHLY_VOLATILITY,
+                            workers=None):
+    """Éventails de plusieurs territoires, en parallèle si workers > 1
+
+    jobs : {code territoire: (catégories, dernière date d'historique)}. NumPy
+    libère le GIL pendant les tirages et les réductions : des threads suffisent.
+    """
+    def run(item):
+        territory_code, (categories, last_date) = item
+        return territory_code, monte_carlo_projection(territory_code, categories, last_date, projection_years,
+                                                      paths, volatility)
+
+    if not workers or workers <= 1:
+        return dict(map(run, jobs.items()))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(run, jobs.items()))
@@ -0,0 +1,307 @@
+"""Paramètres fiscaux compilés : matrice territoires × catégories
+
+Les définitions des catégories (montants, contribuables, poids, taux,
+plafonds) et les facteurs d'ajustement des territoires sont compilés une
+seule fois en tableaux NumPy : les valeurs de tous les territoires sont
+obtenues par un unique produit diffusé (facteurs × valeurs de base). Les
+générateurs, la comparaison inter-territoires et les agrégats lisent cette
+matrice au lieu de reconstruire des dictionnaires à chaque appel.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Valeurs de base (territoire de référence : La Réunion)
+CATEGORY_DEFINITIONS = {
+    'IR': {
+        'nom_complet': 'Impôt sur le Revenu',
+        'type_impot': 'Direct',
+        'sous_categorie': 'Impôt progressif',
+        'montant_annuel': 850,
+        'nombre_contribuables': 320000,
+        'couleur': '#28a745',
+        'poids_total': 30.2,
+        'evolution_annuelle': 3.2,
+        'description': 'Impôt progressif sur les revenus des personnes physiques',
+        'taux_moyen': 14.5,
+        'plafond': 150000
+    },
+    'IS': {
+        'nom_complet': 'Impôt sur les Sociétés',
+        'type_impot': 'Direct',
+        'sous_categorie': 'Impôt sur les bénéfices',
+        'montant_annuel': 620,
+        'nombre_contribuables': 25000,
+        'couleur': '#20c997',
+        'poids_total': 22.8,
+        'evolution_annuelle': 4.8,
+        'description': 'Impôt sur les bénéfices des entreprises',
+        'taux_moyen': 25.0,
+        'plafond': 1000000
+    },
+    'TVA': {
+        'nom_complet': 'Taxe sur la Valeur Ajoutée',
+        'type_impot': 'Indirect',
+        'sous_categorie': 'Taxe sur la consommation',
+        'montant_annuel': 980,
+        'nombre_contribuables': 45000,
+        'couleur': '#fd7e14',
+        'poids_total': 35.5,
+        'evolution_annuelle': 2.9,
+        'description': 'Taxe sur la consommation de biens et services',
+        'taux_moyen': 8.5,
+        'plafond': 0
+    },
+    'TFPB': {
+        'nom_complet': 'Taxe Foncière sur le Bâti',
+        'type_impot': 'Local',
+        'sous_categorie': 'Taxe foncière',
+        'montant_annuel': 280,
+        'nombre_contribuables': 280000,
+        'couleur': '#6f42c1',
+        'poids_total': 10.3,
+        'evolution_annuelle': 1.5,
+        'description': 'Taxe sur les propriétés bâties',
+        'taux_moyen': 1.2,
+        'plafond': 50000
+    },
+    'TFNB': {
+        'nom_complet': 'Taxe Foncière sur le Non-Bâti',
+        'type_impot': 'Local',
+        'sous_categorie': 'Taxe foncière',
+        'montant_annuel': 45,
+        'nombre_contribuables': 15000,
+        'couleur': '#dc3545',
+        'poids_total': 1.7,
+        'evolution_annuelle': 0.8,
+        'description': 'Taxe sur les propriétés non bâties',
+        'taux_moyen': 0.8,
+        'plafond': 20000
+    },
+    'TH': {
+        'nom_complet': 'Taxe d\'Habitation',
+        'type_impot': 'Local',
+        'sous_categorie': 'Taxe d\'habitation',
+        'montant_annuel': 320,
+        'nombre_contribuables': 380000,
+        'couleur': '#ffc107',
+        'poids_total': 11.8,
+        'evolution_annuelle': -2.5,
+        'description': 'Taxe sur l\'occupation des logements',
+        'taux_moyen': 1.5,
+        'plafond': 30000
+    },
+    'DROITS_ENREGISTREMENT': {
+        'nom_complet': 'Droits d\'enregistrement',
+        'type_impot': 'Indirect',
+        'sous_categorie': 'Droits de mutation',
+        'montant_annuel': 180,
+        'nombre_contribuables': 12000,
+        'couleur': '#6610f2',
+        'poids_total': 6.8,
+        'evolution_annuelle': 3.8,
+        'description': 'Droits sur les mutations immobilières et autres actes',
+        'taux_moyen': 5.5,
+        'plafond': 0
+    },
+    'TICPE': {
+        'nom_complet': 'Taxe Intérieure sur la Consommation des Produits Énergétiques',
+        'type_impot': 'Indirect',
+        'sous_categorie': 'Taxe sur l\'énergie',
+        'montant_annuel': 150,
+        'nombre_contribuables': 5000,
+        'couleur': '#e83e8c',
+        'poids_total': 5.5,
+        'evolution_annuelle': 1.2,
+        'description': 'Taxe sur les produits pétroliers et énergétiques',
+        'taux_moyen': 0.6,
+        'plafond': 0
+    },
+    'ISF': {
+        'nom_complet': 'Impôt sur la Fortune Immobilière',
+        'type_impot': 'Direct',
+        'sous_categorie': 'Impôt sur le patrimoine',
+        'montant_annuel': 42,
+        'nombre_contribuables': 2500,
+        'couleur': '#0066CC',
+        'poids_total': 1.5,
+        'evolution_annuelle': 2.2,
+        'description': 'Impôt sur les grandes fortunes immobilières',
+        'taux_moyen': 1.3,
+        'plafond': 1300000
+    },
+    'AUTRES_IMPOSITIONS': {
+        'nom_complet': 'Autres impositions et taxes',
+        'type_impot': 'Divers',
+        'sous_categorie': 'Taxes diverses',
+        'montant_annuel': 95,
+        'nombre_contribuables': 80000,
+        'couleur': '#17a2b8',
+        'poids_total': 3.5,
+        'evolution_annuelle': 1.5,
+        'description': 'Autres taxes et impositions diverses',
+        'taux_moyen': 0,
+        'plafond': 0
+    },
+    'TAXE_LOCALE': {
+        'nom_complet': 'Taxe locale spécifique COM',
+        'type_impot': 'Local',
+        'sous_categorie': 'Taxe spécifique',
+        'montant_annuel': 120,
+        'nombre_contribuables': 180000,
+        'couleur': '#8B4513',
+        'poids_total': 8.0,
+        'evolution_annuelle': 2.5,
+        'description': 'Taxe locale spécifique aux collectivités d\'outre-mer',
+        'taux_moyen': 2.0,
+        'plafond': 25000
+    }
+}
+
+# Catégories propres à certains territoires (les autres sont communes à tous)
+CATEGORY_TERRITORIES = {
+    'TAXE_LOCALE': ('POLYNESIE', 'CALEDONIE', 'WALLIS'),
+}
+
+# Facteurs d'ajustement des montants, contribuables et poids selon le territoire
+TERRITORY_FACTORS = {
+    'REUNION': 1.0,
+    'GUADELOUPE': 0.85,
+    'MARTINIQUE': 0.82,
+    'GUYANE': 0.65,
+    'MAYOTTE': 0.45,
+    'STPIERRE': 1.2,
+    'STBARTH': 1.5,
+    'STMARTIN': 1.1,
+    'WALLIS': 0.7,
+    'POLYNESIE': 0.8,
+    'CALEDONIE': 0.9
+}
+
+# Facteurs d'ajustement des tranches de revenu selon le territoire
+REVENU_FACTORS = {
+    'REUNION': 1.0, 'GUADELOUPE': 0.9, 'MARTINIQUE': 0.88, 'GUYANE': 0.7,
+    'MAYOTTE': 0.6, 'STPIERRE': 0.15, 'STBARTH': 0.2, 'STMARTIN': 0.3,
+    'WALLIS': 0.12, 'POLYNESIE': 0.8, 'CALEDONIE': 0.85
+}
+
+# Barème progressif de l'impôt sur le revenu par part : seuils (€) et taux marginaux
+IR_BRACKETS = {
+    'seuils': (0, 10777, 27478, 78570),
+    'taux': (0.0, 0.11, 0.30, 0.41),
+}
+
+# Réduction d'impôt sur le revenu des DOM : (taux, plafond en €) ; aucune ailleurs
+IR_REDUCTIONS = {
+    'REUNION': (0.30, 2450), 'GUADELOUPE': (0.30, 2450), 'MARTINIQUE': (0.30, 2450),
+    'GUYANE': (0.40, 4050), 'MAYOTTE': (0.40, 4050)
+}
+
+# Champs ajustés par le facteur du territoire, et champs identiques partout
+SCALED_FIELDS = ('montant_annuel', 'nombre_contribuables', 'poids_total')
+NUMERIC_FIELDS = SCALED_FIELDS + ('evolution_annuelle', 'taux_moyen', 'plafond')
+TEXT_FIELDS = ('nom_complet', 'type_impot', 'sous_categorie', 'couleur', 'description')
+
+
+class ParameterMatrix:
+    """Paramètres des catégories pour tous les territoires (tableaux territoires × catégories)"""
+
+    def __init__(self, categories=CATEGORY_DEFINITIONS, territory_factors=TERRITORY_FACTORS,
+                 category_territories=CATEGORY_TERRITORIES, revenu_factors=REVENU_FACTORS,
+                 ir_brackets=IR_BRACKETS, ir_reductions=IR_REDUCTIONS):
+        self.categories = list(categories)
+        self.territories = list(territory_factors)
+        self._rows = {code: row for row, code in enumerate(self.territories)}
+        self._columns = {code: column for column, code in enumerate(self.categories)}
+
+        self.factors = np.array([territory_factors[code] for code in self.territories], dtype=float)
+        self.revenu_factors = np.array([revenu_factors.get(code, 1.0) for code in self.territories], dtype=float)
+
+        # Catégories disponibles par territoire
+        self.available = np.ones((len(self.territories), len(self.categories)), dtype=bool)
+        for categorie, territories in category_territories.items():
+            self.available[:, self._columns[categorie]] = np.isin(self.territories, territories)
+
+        # Un seul produit diffusé pour les champs ajustés ; les autres sont répétés par territoire
+        self.base = {field: np.array([categories[code][field] for code in self.categories]) for field in NUMERIC_FIELDS}
+        self.values = {}
+        for field, base in self.base.items():
+            if field in SCALED_FIELDS:
+                self.values[field] = self.factors[:, None] * base[None, :]
+            else:
+                self.values[field] = np.broadcast_to(base, self.available.shape)
+        self.text = {field: [categories[code][field] for code in self.categories] for field in TEXT_FIELDS}
+
+        # Barème de l'IR : seuils et taux communs, réduction (taux, plafond) par territoire
+        self.ir_thresholds = np.asarray(ir_brackets['seuils'], dtype=float)
+        self.ir_rates = np.asarray(ir_brackets['taux'], dtype=float)
+        self.ir_reductions = np.array([ir_reductions.get(code, (0.0, 0.0)) for code in self.territories], dtype=float)
+
+    def row(self, territory_code):
+        """Ligne d'un territoire (territoire inconnu : facteur 1, catégories communes)"""
+        return self._rows.get(territory_code)
+
+    def columns(self, territory_code):
+        """Indices des catégories disponibles pour un territoire"""
+        row = self.row(territory_code)
+        if row is None:
+            return np.array([self._columns[code] for code in self.categories if code not in CATEGORY_TERRITORIES])
+        return np.flatnonzero(self.available[row])
+
+    def field(self, territory_code, field, categories=None):
+        """Valeurs d'un champ numérique d'un territoire (catégories disponibles, ou celles demandées)"""
+        row = self.row(territory_code)
+        if categories is None:
+            columns = self.columns(territory_code)
+        else:
+            columns = np.array([self._columns[code] for code in categories], dtype=np.int64)
+        if row is None:
+            return self.base[field][columns]
+        return self.values[field][row, columns]
+
+    def categories_for(self, territory_code):
+        """Catégories d'un territoire sous forme de dictionnaire (format de get_categories_impots)"""
+        columns = self.columns(territory_code)
+        numeric = {field: self.field(territory_code, field).tolist() for field in NUMERIC_FIELDS}
+        return {
+            self.categories[column]: {
+                **{field: self.text[field][column] for field in TEXT_FIELDS},
+                **{field: numeric[field][position] for field in NUMERIC_FIELDS},
+            }
+            for position, column in enumerate(columns)
+        }
+
+    def frame(self, field):
+        """Champ numérique en table territoires × catégories (NaN si catégorie absente)"""
+        return pd.DataFrame(np.where(self.available, self.values[field], np.nan),
+                            index=self.territories, columns=self.categories)
+
+    def territory_totals(self, field='montant_annuel'):
+        """Somme d'un champ sur les catégories disponibles, par territoire"""
+        return pd.Series(np.where(self.available, self.values[field], 0.0).sum(axis=1), index=self.territories)
+
+    def ir_schedule(self, territory_code):
+        """Barème de l'IR d'un territoire : (seuils, taux marginaux, taux de réduction, plafond de réduction)"""
+        row = self.row(territory_code)
+        reduction_rate, reduction_cap = (0.0, 0.0) if row is None else self.ir_reductions[row]
+        return self.ir_thresholds, self.ir_rates, float(reduction_rate), float(reduction_cap)
+
+    def income_tax(self, territory_code, revenu_imposable, parts=1.0):
+        """Impôt sur le revenu d'un foyer : (impôt brut, réduction territoriale, impôt net)"""
+        thresholds, rates, reduction_rate, reduction_cap = self.ir_schedule(territory_code)
+        widths = np.diff(thresholds, append=np.inf)
+        per_part = np.clip(max(revenu_imposable, 0.0) / parts - thresholds, 0.0, widths)
+        gross = float(per_part @ rates) * parts
+        reduction = min(gross * reduction_rate, reduction_cap)
+        return gross, reduction, gross - reduction
+
+    def revenu_factor(self, territory_code):
+        row = self.row(territory_code)
+        return 1.0 if row is None else float(self.revenu_factors[row])
+
+
+@lru_cache(maxsize=None)
+def get_parameter_matrix():
+    """Matrice des paramètres, compilée une fois par processus"""
+    return ParameterMatrix()
@@ -0,0 +1,197 @@
+"""Publication statique : pages HTML pré-rendues du dashboard pour les lecteurs sans interaction
+
+Le script Dashboard.py est exécuté sans serveur (AppTest de Streamlit) pour
+chaque territoire, avec ses valeurs par défaut : les figures Plotly, les
+indicateurs et les tableaux sont donc exactement ceux d'ImpotsDashboard
+(mêmes données, mêmes constructeurs de figures). Ils sont recopiés dans une
+page HTML autonome par territoire ; plotly.js est écrit une seule fois à côté
+des pages. index.html reprend la page par défaut (La Réunion).
+
+Exemples :
+    python -m impots publish --out site                      # une publication (tâche cron)
+    python -m impots publish --out site --interval 900 --serve 8080
+"""
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import html
+import json
+import os
+import threading
+import time
+
+from impots import data
+from impots.atomic import atomic_path
+from impots.loadtest import DEFAULT_SCRIPT
+
+DEFAULT_TERRITORY = 'REUNION'
+MAX_TABLE_ROWS = 50
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Dashboard Impôts - {title}</title>
+<script src="{plotly_js}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 1rem 2rem; color: #262730; }}
+nav a {{ margin-right: 0.8rem; }}
+nav a.active {{ font-weight: bold; }}
+.section-header {{ color: #28a745; border-bottom: 2px solid #0055A4; padding-bottom: 0.5rem; margin-top: 2rem; }}
+.metrics {{ display: flex; flex-wrap: wrap; gap: 0.5rem; }}
+.metric {{ background: #f0f2f6; border-left: 4px solid #28a745; border-radius: 10px; padding: 0.6rem 1rem; min-width: 14rem; }}
+.metric .value {{ font-size: 1.5rem; font-weight: bold; }}
+.metric .delta {{ font-size: 0.85rem; color: #555; }}
+.tab {{ color: #0055A4; margin-top: 1.5rem; }}
+.caption {{ color: #777; font-size: 0.85rem; }}
+table {{ border-collapse: collapse; font-size: 0.85rem; }}
+td, th {{ border: 1px solid #ddd; padding: 0.2rem 0.5rem; }}
+</style>
+</head>
+<body>
+<nav>{nav}</nav>
+<p class="caption">Instantané publié le {published_at} · version interactive : serveur Streamlit</p>
+{body}
+</body>
+</html>
+"""
+
+
+class PageRenderer:
+    """Convertit l'arbre d'éléments d'une exécution AppTest en fragments HTML"""
+
+    def __init__(self):
+        self.parts = []
+        self.figures = 0
+        self._metrics = []
+
+    def _flush_metrics(self):
+        if self._metrics:
+            self.parts.append('<div class="metrics">' + ''.join(self._metrics) + '</div>')
+            self._metrics = []
+
+    def render(self, node):
+        node_type = getattr(node, 'type', None)
+        if node_type == 'metric':
+            delta = f'<div class="delta">{html.escape(node.delta)}</div>' if node.delta else ''
+            self._metrics.append(f'<div class="metric"><div>{html.escape(node.label)}</div>'
+                                 f'<div class="value">{html.escape(node.value)}</div>{delta}</div>')
+            return
+        self._flush_metrics()
+
+        if node_type == 'markdown' and 'section-header' in node.value:
+            self.parts.append(node.value)  # en-têtes HTML produits par le dashboard lui-même
+        elif node_type == 'subheader':
+            self.parts.append(f'<h4>{html.escape(node.value)}</h4>')
+        elif node_type == 'caption':
+            self.parts.append(f'<p class="caption">{html.escape(node.value)}</p>')
+        elif node_type in ('success', 'info', 'warning'):
+            self.parts.append(f'<p class="{node_type}">{html.escape(node.value)}</p>')
+        elif node_type == 'plotly_chart':
+            self.figures += 1
+            div_id = f'figure-{self.figures}'
+            config = json.loads(node.proto.config) if node.proto.config else {}
+            spec = node.proto.spec.replace('</', '<\\/')  # pas de fin de balise script dans les libellés
+            self.parts.append(
+                f'<div id="{div_id}"></div><script>(function(){{var f={spec};'
+                f'Plotly.newPlot("{div_id}",f.data,f.layout,{json.dumps({**config, "responsive": True})});}})();</script>'
+            )
+        elif node_type == 'dataframe':
+            frame = node.value
+            self.parts.append(frame.head(MAX_TABLE_ROWS).to_html(border=0, float_format=lambda v: f'{v:,.2f}'))
+        elif node_type == 'tab':
+            self.parts.append(f'<h4 class="tab">{html.escape(node.label)}</h4>')
+        elif node_type == 'expander':
+            self.parts.append(f'<details><summary>{html.escape(node.label)}</summary>')
+
+        for child in getattr(node, 'children', {}).values():
+            self.render(child)
+        self._flush_metrics()
+        if node_type == 'expander':
+            self.parts.append('</details>')
+
+    def html(self):
+        self._flush_metrics()
+        return '\n'.join(self.parts)
+
+
+def _write_atomic(path, content):
+    """Écrit une page : les lecteurs du serveur ne voient jamais de page partielle"""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+
+
+def _navigation(territories, codes, current):
+    links = []
+    for code in codes:
+        active = ' class="active"' if code == current else ''
+        links.append(f'<a href="{code}.html"{active}>{html.escape(territories[code]["nom_complet"])}</a>')
+    return ''.join(links)
+
+
+def render_pages(codes=None, script=DEFAULT_SCRIPT, timeout=300):
+    """Exécute le dashboard pour chaque territoire ; retourne {code: (corps HTML, nombre de figures)}"""
+    from streamlit.testing.v1 import AppTest
+
+    territories = data.get_territories_definitions()
+    codes = codes or [code for code, info in territories.items() if info['impots_actif']]
+
+    pages = {}
+    for code in codes:
+        # Nouvelle session par territoire : page identique à celle d'un premier visiteur
+        at = AppTest.from_file(script, default_timeout=timeout)
+        at.session_state['selected_territory'] = code
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{code}: {at.exception[0].message}")
+        renderer = PageRenderer()
+        renderer.render(at.main)
+        pages[code] = (renderer.html(), renderer.figures)
+    return pages
+
+
+def publish(out_dir, codes=None, script=DEFAULT_SCRIPT):
+    """Publie une page par territoire, index.html (territoire par défaut) et plotly.js"""
+    from plotly.offline import get_plotlyjs
+
+    territories = data.get_territories_definitions()
+    codes = codes or [code for code, info in territories.items() if info['impots_actif']]
+    os.makedirs(out_dir, exist_ok=True)
+
+    plotly_path = os.path.join(out_dir, PLOTLY_JS)
+    if not os.path.exists(plotly_path):
+        _write_atomic(plotly_path, get_plotlyjs())
+
+    published_at = time.strftime('%d/%m/%Y %H:%M')
+    written = {}
+    for code, (body, figures) in render_pages(codes, script).items():
+        page = PAGE_TEMPLATE.format(
+            title=html.escape(territories[code]['nom_complet']),
+            plotly_js=PLOTLY_JS,
+            nav=_navigation(territories, codes, code),
+            published_at=published_at,
+            body=body
+        )
+        path = os.path.join(out_dir, f'{code}.html')
+        _write_atomic(path, page)
+        written[code] = {'fichier': path, 'figures': figures, 'octets': len(page.encode('utf-8'))}
+        if code == (DEFAULT_TERRITORY if DEFAULT_TERRITORY in codes else codes[0]):
+            _write_atomic(os.path.join(out_dir, 'index.html'), page)
+    return written
+
+
+def serve(out_dir, port=8080, background=True):
+    """Sert les pages publiées (fichiers statiques)
+
+    En arrière-plan (thread, retourne le serveur) pendant les republications,
+    ou au premier plan jusqu'à l'interruption du processus.
+    """
+    handler = partial(SimpleHTTPRequestHandler, directory=out_dir)
+    server = ThreadingHTTPServer(('', port), handler)
+    if not background:
+        with server:
+            server.serve_forever()
+        return server
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,55 @@
+"""Politique de graines : un flux aléatoire reproductible par (territoire, catégorie, période, version)
+
+Les graines sont dérivées d'un hachage stable (BLAKE2b) de la clé, et non de
+hash() qui varie d'un processus à l'autre : deux workers, ou le même worker
+après expiration d'un cache, produisent des données identiques au bit près.
+Changer DATA_VERSION (variable d'environnement IMPOTS_DATA_VERSION) fait
+évoluer toutes les données simulées d'un coup, et sépare les caches disque.
+"""
+from datetime import datetime
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_VERSION = os.environ.get('IMPOTS_DATA_VERSION', '1')
+# Révision du format des tables (unités, colonnes) : sépare les caches sans changer les aléas
+SCHEMA_VERSION = 2  # 2 : montants des territoires XPF en monnaie locale
+STORE_VERSION = f'{DATA_VERSION}.{SCHEMA_VERSION}'
+
+# Clé de catégorie utilisée pour les aléas communs à tout un territoire
+ALL_CATEGORIES = '*'
+
+
+def history_end(now=None):
+    """Dernière fin de mois de l'historique simulé (le jour même s'il est une fin de mois)"""
+    return pd.offsets.MonthEnd().rollback(pd.Timestamp(now or datetime.now()).normalize())
+
+
+def history_period(now=None):
+    """Mois (AAAA-MM) de la dernière ligne de l'historique"""
+    return f"{history_end(now):%Y-%m}"
+
+
+def data_token(now=None):
+    """Jeton de version des données simulées : version + dernier mois de l'historique
+
+    L'historique gagne sa ligne de fin de mois le dernier jour du mois (et non
+    le 1er du mois suivant) ; le jeton suit la même borne, il suffit donc comme
+    clé de cache à la place des tables elles-mêmes.
+    """
+    return f"{STORE_VERSION}:{history_period(now)}"
+
+
+def stream_seed(territory_code, categorie, period, version=None):
+    """Graine entière (64 bits) stable d'un flux"""
+    key = '|'.join(str(part) for part in (
+        DATA_VERSION if version is None else version, territory_code, categorie, period
+    ))
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def stream_rng(territory_code, categorie, period, version=None):
+    """Générateur NumPy du flux (territoire, catégorie, période, version)"""
+    return np.random.Generator(np.random.PCG64(stream_seed(territory_code, categorie, period, version)))
@@ -0,0 +1,122 @@
+"""Mémoire des sessions : LRU des territoires chargés et nettoyage des sessions inactives
+
+Chaque session conserve au plus max_territories territoires (les moins
+récemment consultés sont évincés puis rechargés à la demande). Un registre
+commun au processus libère les données des sessions restées inactives trop
+longtemps (bornes de consultation, onglets oubliés).
+"""
+from collections import OrderedDict, deque
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_TERRITORIES = 3
+DEFAULT_IDLE_TIMEOUT = 30 * 60  # secondes
+# Données de session qui sont des vues du store partagé (non comptées dans l'empreinte de la session)
+SHARED_TERRITORY_KEYS = ('historical_data', 'date_index')
+
+
+def estimate_size(obj, _seen=None):
+    """Taille mémoire approximative (octets) d'un objet et de son contenu"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_size(key, seen) + estimate_size(value, seen) for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(obj) + sum(estimate_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + estimate_size(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+class TerritoryLRU:
+    """Données des territoires d'une session, limitées aux plus récemment consultés"""
+
+    def __init__(self, max_territories=DEFAULT_MAX_TERRITORIES):
+        self.max_territories = max_territories
+        self._items = OrderedDict()
+        self.evictions = 0
+
+    def __contains__(self, territory_code):
+        return territory_code in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, territory_code):
+        self._items.move_to_end(territory_code)
+        return self._items[territory_code]
+
+    def __setitem__(self, territory_code, territory_data):
+        self._items[territory_code] = territory_data
+        self._items.move_to_end(territory_code)
+        while len(self._items) > self.max_territories:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def keys(self):
+        return list(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+    def footprint(self, shared_keys=()):
+        """Mémoire par territoire : propre à la session et partagée (ex : vues du store commun)"""
+        rows = []
+        for territory_code, territory_data in self._items.items():
+            owned = {key: value for key, value in territory_data.items() if key not in shared_keys}
+            shared = {key: value for key, value in territory_data.items() if key in shared_keys}
+            rows.append({
+                'territoire': territory_code,
+                'session_octets': estimate_size(owned),
+                'partage_octets': estimate_size(shared),
+            })
+        return pd.DataFrame(rows, columns=['territoire', 'session_octets', 'partage_octets'])
+
+
+class SessionRegistry:
+    """Registre des sessions du processus ; libère les données des sessions inactives"""
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id, territories, now=None):
+        """Signale l'activité d'une session (référence faible vers ses données)"""
+        with self._lock:
+            self._sessions[session_id] = (time.time() if now is None else now, weakref.ref(territories))
+
+    def sweep(self, now=None):
+        """Vide les données des sessions inactives ; retourne les sessions nettoyées"""
+        now = time.time() if now is None else now
+        cleaned = []
+        with self._lock:
+            for session_id, (last_seen, territories_ref) in list(self._sessions.items()):
+                territories = territories_ref()
+                if territories is None:
+                    # Session fermée par le serveur : rien à libérer
+                    del self._sessions[session_id]
+                elif now - last_seen > self.idle_timeout:
+                    territories.clear()
+                    del self._sessions[session_id]
+                    cleaned.append(session_id)
+        return cleaned
+
+    def __len__(self):
+        return len(self._sessions)
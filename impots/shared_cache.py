@@ -0,0 +1,206 @@
+"""Cache partagé entre les processus Streamlit d'une même machine
+
+Plusieurs workers derrière un répartiteur de charge peuvent partager un même
+répertoire (par défaut en mémoire partagée, /dev/shm) : chaque table y est
+écrite une seule fois au format Arrow IPC puis relue par projection mémoire
+(memory map) par les autres processus. Un verrou fichier par clé garantit que
+la génération d'une table, comme l'avancée du flux temps réel d'un territoire,
+n'a lieu qu'une fois par machine et non une fois par processus.
+
+Sans fcntl (Windows), les verrous sont ignorés : les données étant dérivées de
+graines déterministes (impots.seeding), deux générations concurrentes
+produisent de toute façon des tables identiques.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from impots.atomic import atomic_path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - plateformes sans verrous POSIX
+    fcntl = None
+
+SHARED_CACHE_ENV = 'IMPOTS_SHARED_CACHE'
+TICK_METADATA_KEY = b'impots.tick'
+TIMESTAMP_METADATA_KEY = b'impots.timestamp'
+
+
+def default_shared_dir():
+    """Répertoire en mémoire partagée s'il existe, sinon répertoire temporaire"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'impots_drom_com')
+
+
+class SharedFrameCache:
+    """Tables Arrow IPC partagées par clé (ex : 'historique/<jeton>/<territoire>')
+
+    Le deuxième segment d'une clé est la version des données : à la première
+    écriture d'une version, les tables des versions antérieures de la même table
+    sont supprimées (la mémoire partagée ne garde pas les mois périmés).
+    """
+
+    def __init__(self, root=None):
+        self.root = root or default_shared_dir()
+        self.live = SharedLiveFeed(self)
+        self._pruned = set()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Cache configuré par IMPOTS_SHARED_CACHE ('1' : répertoire par défaut, sinon chemin), ou None"""
+        value = (environ if environ is not None else os.environ).get(SHARED_CACHE_ENV, '').strip()
+        if value.lower() in ('', '0', 'false', 'non'):
+            return None
+        return cls(None if value.lower() in ('1', 'true', 'oui', 'shm') else value)
+
+    def path(self, key):
+        parts = [part.replace(':', '_') for part in key.split('/')]
+        return os.path.join(self.root, *parts) + '.arrow'
+
+    @contextmanager
+    def lock(self, key):
+        """Verrou exclusif inter-processus sur une clé"""
+        path = self.path(key) + '.lock'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def read(self, key):
+        """Retourne (table, métadonnées) ou (None, {}) si la clé est absente ou illisible"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None, {}
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+                return table.to_pandas(), dict(table.schema.metadata or {})
+        except (OSError, pa.ArrowInvalid):
+            return None, {}
+
+    def get(self, key):
+        return self.read(key)[0]
+
+    def prune(self, key):
+        """Supprime les tables des versions antérieures de la table de key ; retourne leurs chemins
+
+        Les versions plus récentes (écrites par un worker déjà passé au mois
+        suivant) sont conservées. Les fichiers de verrou ne sont jamais supprimés :
+        un autre processus peut le tenir ou l'attendre, et un verrou recréé sous
+        le même nom ne l'exclurait plus.
+        """
+        parts = [part.replace(':', '_') for part in key.split('/')]
+        if len(parts) < 2:
+            return []
+        table_dir, version = os.path.join(self.root, parts[0]), parts[1]
+        removed = []
+        for name in (os.listdir(table_dir) if os.path.isdir(table_dir) else []):
+            if name.split('.arrow')[0] >= version:
+                continue
+            entry = os.path.join(table_dir, name)
+            paths = ([os.path.join(directory, file_name) for directory, _, file_names in os.walk(entry)
+                      for file_name in file_names] if os.path.isdir(entry) else [entry])
+            for path in paths:
+                if path.endswith('.lock'):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:  # supprimée par un autre processus
+                    continue
+                removed.append(os.path.relpath(path, self.root))
+        return removed
+
+    def put(self, key, frame, metadata=None):
+        """Publie une table (écriture atomique, relue par projection mémoire par les autres processus)"""
+        path = self.path(key)
+        # Une fois par table et par version dans ce processus
+        version_key = tuple(key.split('/')[:2])
+        if version_key not in self._pruned:
+            self.prune(key)
+            self._pruned.add(version_key)
+        table = pa.Table.from_pandas(frame)
+        if metadata:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        with atomic_path(path) as tmp_path:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        return path
+
+    def get_or_create(self, key, build):
+        """Table de la clé, construite par build() une seule fois par machine"""
+        frame = self.get(key)
+        if frame is not None:
+            return frame
+        with self.lock(key):
+            # Un autre processus a pu la construire pendant l'attente du verrou
+            frame = self.get(key)
+            if frame is None:
+                frame = build()
+                self.put(key, frame)
+        return frame
+
+    def clear(self):
+        """Supprime toutes les tables du cache partagé (les verrous restent, voir prune)"""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith('.lock'):
+                    os.remove(os.path.join(directory, name))
+
+
+class SharedLiveFeed:
+    """Flux temps réel partagé : un seul état courant (et numéro de tick) par territoire"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def head(self, key):
+        """Dernier état publié : (table, tick, horodatage) ou (None, 0, None)"""
+        frame, metadata = self.cache.read(key)
+        if frame is None:
+            return None, 0, None
+        timestamp = metadata.get(TIMESTAMP_METADATA_KEY)
+        return (frame, int(metadata.get(TICK_METADATA_KEY, 0)),
+                pd.Timestamp(timestamp.decode()).to_pydatetime() if timestamp else None)
+
+    def tick(self, key):
+        """Numéro du dernier tick publié (métadonnées seules, sans lire la table), 0 si absent"""
+        path = self.cache.path(key)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with pa.memory_map(path, 'r') as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+        except (OSError, pa.ArrowInvalid):
+            return 0
+        return int(metadata.get(TICK_METADATA_KEY, 0))
+
+    def advance(self, key, seen_tick, base_frame, apply_update, timestamp=None):
+        """Tick suivant le tick seen_tick connu de l'appelant
+
+        Si un autre processus a déjà publié un tick plus récent, il est
+        retourné tel quel ; sinon apply_update(état, tick) produit le tick
+        suivant, publié pour tous les workers. Retourne (table, tick, horodatage).
+        """
+        with self.cache.lock(key):
+            frame, tick, published_at = self.head(key)
+            if frame is not None and tick > seen_tick:
+                return frame, tick, published_at
+
+            timestamp = timestamp or datetime.now()
+            frame = apply_update(base_frame if frame is None else frame, tick + 1)
+            self.cache.put(key, frame, {
+                TICK_METADATA_KEY: str(tick + 1).encode(),
+                TIMESTAMP_METADATA_KEY: pd.Timestamp(timestamp).isoformat().encode(),
+            })
+            return frame, tick + 1, timestamp
@@ -0,0 +1,65 @@
+"""Historique consolidé de tous les territoires dans une seule table empilée
+
+Les lignes sont rangées par territoire (puis par date) ; un tableau d'offsets
+donne la plage [début, fin) de chaque territoire. La vue d'un territoire est
+donc une simple tranche de la table commune, et les agrégations
+inter-territoires se font en un seul groupby vectorisé.
+"""
+import numpy as np
+import pandas as pd
+
+from impots.timeseries import DateIndex
+
+
+class HistoricalStore:
+    """Table historique empilée, partitionnée par territoire avec index d'offsets"""
+
+    def __init__(self, frames):
+        self.codes = list(frames)
+        sorted_frames = [DateIndex(frames[code]).frame for code in self.codes]
+        sizes = [len(frame) for frame in sorted_frames]
+
+        stacked = pd.concat(sorted_frames, ignore_index=True)
+        stacked['territoire'] = pd.Categorical(stacked['territoire'], categories=self.codes)
+
+        self.frame = stacked
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._positions = {code: position for position, code in enumerate(self.codes)}
+
+    @classmethod
+    def build(cls, territory_codes, load_historical):
+        """Construit le store à partir d'une fonction de chargement par territoire"""
+        return cls({code: load_historical(code) for code in territory_codes})
+
+    def __contains__(self, territory_code):
+        return territory_code in self._positions
+
+    def __len__(self):
+        return len(self.frame)
+
+    def bounds(self, territory_code):
+        """Plage [début, fin) des lignes d'un territoire"""
+        position = self._positions[territory_code]
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def territory(self, territory_code):
+        """Vue (tranche contiguë) de l'historique d'un territoire"""
+        lo, hi = self.bounds(territory_code)
+        return self.frame.iloc[lo:hi]
+
+    def aggregate(self, by, value='montant_total_impots', territory_codes=None, func='sum'):
+        """Agrégation inter-territoires en un seul groupby : index = by, colonnes = territoires"""
+        by = [by] if isinstance(by, str) else list(by)
+        result = (
+            self.frame.groupby(by + ['territoire'], observed=True, sort=True)[value]
+            .agg(func)
+            .unstack('territoire')
+        )
+        result.columns = result.columns.astype(str)
+        if territory_codes is not None:
+            result = result.reindex(columns=list(territory_codes))
+        return result
+
+    def monthly_totals(self, territory_codes=None, value='montant_total_impots'):
+        """Total mensuel par territoire (dates × territoires)"""
+        return self.aggregate('date', value, territory_codes)
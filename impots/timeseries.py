@@ -0,0 +1,132 @@
+"""Fenêtrage temporel et réduction du nombre de points des séries historiques
+
+Les tables historiques sont triées par date une fois pour toutes ; une fenêtre
+[début, fin] se résout alors par deux recherches dichotomiques (np.searchsorted)
+et renvoie une tranche contiguë de la table, sans masque booléen sur toutes
+les lignes. Les courbes sont ensuite réduites à un nombre borné de points
+(LTTB ou min/max par seau) avant d'être envoyées au navigateur.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 500
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+
+class DateIndex:
+    """Index trié des dates d'une table historique"""
+
+    def __init__(self, frame, column='date'):
+        dates = frame[column].to_numpy(dtype='datetime64[ns]')
+        if len(dates) > 1 and (np.diff(dates.view('i8')) < 0).any():
+            frame = frame.sort_values(column, kind='stable').reset_index(drop=True)
+            dates = frame[column].to_numpy(dtype='datetime64[ns]')
+
+        self.frame = frame
+        self.column = column
+        self.dates = dates
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def min_date(self):
+        return pd.Timestamp(self.dates[0]) if len(self.dates) else None
+
+    @property
+    def max_date(self):
+        return pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+
+    def bounds(self, start=None, end=None):
+        """Positions [début, fin) des lignes comprises entre start et end inclus"""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right'))
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """Sous-table des lignes comprises entre start et end inclus"""
+        lo, hi = self.bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+
+def lttb(x, y, max_points):
+    """Largest-Triangle-Three-Buckets : indices des points conservés
+
+    Conserve la forme visuelle de la courbe (pics et creux) avec max_points points.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # Seaux intermédiaires (le premier et le dernier point sont toujours gardés)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax(y, max_points):
+    """Min/max par seau : indices des extrêmes de chaque seau, dans l'ordre"""
+    n = len(y)
+    if max_points >= n or max_points < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype='float64')
+    buckets = max_points // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket_of = np.repeat(np.arange(buckets), np.diff(np.append(edges, n)))
+
+    # argmin/argmax par seau via un tri lexicographique (seau, valeur)
+    order = np.lexsort((y, bucket_of))
+    counts = np.bincount(bucket_of, minlength=buckets)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    keep = counts > 0
+    mins = order[starts[keep]]
+    maxs = order[ends[keep] - 1]
+    return np.unique(np.concatenate([mins, maxs]))
+
+
+def downsample_indices(x, y, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """Indices des points à conserver pour une courbe"""
+    if method == 'lttb':
+        return lttb(x, y, max_points)
+    if method == 'minmax':
+        return minmax(y, max_points)
+    raise ValueError(f"Méthode de réduction inconnue: {method}")
+
+
+def downsample_frame(frame, x, y, max_points=DEFAULT_MAX_POINTS, method='lttb', group=None):
+    """Réduit chaque courbe (une par valeur de group) à max_points points au plus"""
+    if group is None:
+        if len(frame) <= max_points:
+            return frame
+        x_values = frame[x].to_numpy()
+        if np.issubdtype(x_values.dtype, np.datetime64):
+            x_values = x_values.view('i8')
+        return frame.iloc[downsample_indices(x_values, frame[y].to_numpy(), max_points, method)]
+
+    parts = [
+        downsample_frame(part, x, y, max_points, method)
+        for _, part in frame.groupby(group, sort=False)
+    ]
+    return pd.concat(parts) if parts else frame
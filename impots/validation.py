@@ -0,0 +1,293 @@
+"""Validation des tables à leur chargement : colonnes, unités, bornes, dates et complétude
+
+Chaque table chargée ou générée est contrôlée une fois, par des opérations
+vectorisées sur ses colonnes NumPy (pas de boucle sur les lignes) ; le
+rapport est enregistré avec la version des données (jeton) pour que les
+vues lisent le statut au lieu de revérifier les valeurs.
+
+Conventions d'unités contrôlées :
+    'M'        millions de la monnaie du territoire (montants agrégés)
+    'monnaie'  unités de la monnaie du territoire (plafonds)
+    '%'        pourcentage
+    'nombre'   effectif
+    'M€', 'Md€' montants en euros (table de comparaison, PIB)
+Les bornes des montants sont exprimées en euros puis converties dans la
+monnaie de chaque ligne : un montant en euros pris pour des millions (ou
+l'inverse) sort des bornes.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from impots.currency import REPORTING_CURRENCY, factor_vector
+
+OK = 'ok'
+WARNING = 'avertissement'
+ERROR = 'erreur'
+
+# Spécification des colonnes par type de table
+COLUMN_SPECS = {
+    'historical_data': {
+        'date': {'type': 'datetime'},
+        'territoire': {'type': 'text'},
+        'categorie': {'type': 'text'},
+        'montant_total_impots': {'unite': 'M', 'min': 0, 'max_eur': 1e4},
+        'nombre_contribuables': {'unite': 'nombre', 'min': 0},
+        'montant_moyen': {'unite': 'M', 'min': 0},
+        'type_impot': {'type': 'text'},
+        'evolution_mensuelle': {'unite': '%', 'min': -100, 'max': 100},
+    },
+    'current_data': {
+        'territoire': {'type': 'text'},
+        'categorie': {'type': 'text'},
+        'montant_mensuel': {'unite': 'M', 'min': 0, 'strict': True, 'max_eur': 1e4},
+        'variation_pct': {'unite': '%', 'min': -100, 'max': 100},
+        'variation_abs': {'unite': 'M', 'max_eur': 1e4},
+        'nombre_contribuables': {'unite': 'nombre', 'min': 1},
+        'montant_moyen': {'unite': 'M', 'min': 0},
+        'poids_total': {'unite': '%', 'min': 0, 'max': 100},
+        'montant_annee_precedente': {'unite': 'M', 'min': 0, 'max_eur': 12e4},
+        'taux_moyen': {'unite': '%', 'min': 0, 'max': 100},
+        'plafond': {'unite': 'monnaie', 'min': 0},
+    },
+    'comparison': {
+        'territoire': {'type': 'text'},
+        'population': {'unite': 'nombre', 'min': 1},
+        'pib': {'unite': 'Md€', 'min': 0, 'strict': True},
+        'montant_total_impots': {'unite': 'M€', 'min': 0},
+        # Les petits territoires simulés dépassent 100 % : signalé sans bloquer l'affichage
+        'pression_fiscale': {'unite': '%', 'min': 0, 'max': 100, 'severite': WARNING},
+    },
+}
+# Rapports de cohérence : échelle × produit(numérateurs) / dénominateur dans [bas, haut]
+# (détectent un facteur 12 ou 1e6 oublié entre colonnes liées)
+RATIO_CHECKS = {
+    'historical_data': ((('montant_moyen', 'nombre_contribuables'), 'montant_total_impots', 1, 0.999, 1.001),),
+    'current_data': ((('montant_mensuel',), 'montant_annee_precedente', 12, 0.5, 2.0),),
+}
+
+
+class ValidationReport:
+    """Résultat des contrôles d'une table, pour une version des données"""
+
+    def __init__(self, kind, territory_code, version, checks, rows, elapsed):
+        self.kind = kind
+        self.territory_code = territory_code
+        self.version = version
+        self.checks = checks
+        self.rows = rows
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return not (self.checks['statut'] == ERROR).any()
+
+    def errors(self):
+        return self.checks[self.checks['statut'] != OK]
+
+    def summary(self):
+        statuses = self.checks['statut']
+        n_errors, n_warnings = int((statuses == ERROR).sum()), int((statuses == WARNING).sum())
+        status = f"{n_errors} contrôle(s) en échec" if n_errors else 'valide'
+        if n_warnings:
+            status += f", {n_warnings} avertissement(s)"
+        scope = f" {self.territory_code}" if self.territory_code else ''
+        return (f"{self.kind}{scope} [{self.version}] : {self.rows:,} lignes, "
+                f"{len(self.checks)} contrôles, {status} ({self.elapsed * 1000:.1f} ms)")
+
+
+def _factorize(series):
+    """Codes entiers et valeurs distinctes d'une colonne (codes directs si catégorielle)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(dtype=np.int64), np.asarray(series.cat.categories, dtype=object)
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+    return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+
+def _row_factors(territory_rows, territory_codes, territories):
+    """Multiplicateur euros → monnaie de chaque ligne (une valeur par territoire, répétée)"""
+    return 1 / factor_vector(list(territory_codes), territories, REPORTING_CURRENCY)[territory_rows]
+
+
+def _result(checks, control, column, failed, detail='', severity=ERROR):
+    count = int(np.count_nonzero(failed)) if isinstance(failed, np.ndarray) else int(failed)
+    status = severity if count else OK
+    checks.append({'controle': control, 'colonne': column, 'statut': status, 'lignes': count, 'detail': detail})
+
+
+def _check_columns(frame, specs, territories, territory_index, checks):
+    factors = None
+    for column, spec in specs.items():
+        if column not in frame.columns:
+            _result(checks, 'presence', column, 1, 'colonne absente')
+            continue
+        series = frame[column]
+        kind = spec.get('type', 'float')
+        if kind == 'datetime':
+            _result(checks, 'type', column, 0 if pd.api.types.is_datetime64_any_dtype(series) else 1, 'datetime')
+            _result(checks, 'non_nul', column, series.isna().to_numpy())
+            continue
+        if kind == 'text':
+            _result(checks, 'non_nul', column, series.isna().to_numpy())
+            continue
+
+        if not pd.api.types.is_numeric_dtype(series):
+            _result(checks, 'type', column, 1, f'numérique attendu ({series.dtype})')
+            continue
+        values = series.to_numpy(dtype=float)
+        _result(checks, 'non_nul', column, ~np.isfinite(values))
+        unit = spec.get('unite', '')
+        severity = spec.get('severite', ERROR)
+        if 'min' in spec:
+            below = values <= spec['min'] if spec.get('strict') else values < spec['min']
+            _result(checks, 'borne_min', column, below, f"{'>' if spec.get('strict') else '≥'} {spec['min']} {unit}",
+                    severity)
+        if 'max' in spec:
+            _result(checks, 'borne_max', column, values > spec['max'], f"≤ {spec['max']} {unit}", severity)
+        if 'max_eur' in spec:
+            if factors is None:
+                factors = _row_factors(*territory_index, territories)
+            # Borne d'unité : au-delà, le montant n'est vraisemblablement pas en millions
+            _result(checks, 'unite', column, np.abs(values) > spec['max_eur'] * factors,
+                    f"|valeur| ≤ {spec['max_eur']:g} M€ (converti dans la monnaie du territoire)")
+
+
+def _check_ratios(frame, kind, checks):
+    for numerators, denominator, scale, low, high in RATIO_CHECKS.get(kind, ()):
+        values = scale * np.prod([frame[column].to_numpy(dtype=float) for column in numerators], axis=0)
+        reference = frame[denominator].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = values / reference
+        defined = np.isfinite(ratio) & (reference != 0)
+        label = f"{scale:g} × " if scale != 1 else ''
+        _result(checks, 'coherence', numerators[0], defined & ((ratio < low) | (ratio > high)),
+                f"{label}{' × '.join(numerators)} / {denominator} dans [{low}, {high}]")
+
+
+def _check_dates(frame, territory_index, checks):
+    """Dates croissantes et mois consécutifs dans chaque territoire (table rangée par territoire puis date)"""
+    territory_rows, territory_codes = territory_index
+    values = frame['date'].to_numpy(dtype='datetime64[ns]')
+    dates = values.astype(np.int64)
+    same_territory = territory_rows[1:] == territory_rows[:-1]
+    _result(checks, 'dates_croissantes', 'date', same_territory & (np.diff(dates) < 0))
+    # Un territoire doit occuper une seule plage contiguë
+    starts = np.count_nonzero(~same_territory) + 1
+    _result(checks, 'territoires_contigus', 'territoire', starts - len(np.unique(territory_rows)))
+
+    # Une date par fin de mois (fréquence 'ME') ...
+    months = values.astype('datetime64[M]')
+    month_end = (months + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    _result(checks, 'fin_de_mois', 'date', values.astype('datetime64[D]') != month_end)
+    if len(months) == 0:
+        return
+    # ... et aucun mois manquant entre la première et la dernière date de chaque territoire
+    offsets = months.astype(np.int64) - months.astype(np.int64).min()
+    width = int(offsets.max()) + 1
+    n_territories = len(territory_codes)
+    first = np.full(n_territories, width)
+    last = np.full(n_territories, -1)
+    np.minimum.at(first, territory_rows, offsets)
+    np.maximum.at(last, territory_rows, offsets)
+    present = np.bincount(np.unique(territory_rows * width + offsets) // width, minlength=n_territories)
+    missing = np.maximum(last - first + 1, 0) - present
+    _result(checks, 'mois_consecutifs', 'date', int(missing.sum()), "aucun mois manquant")
+
+
+def _check_completeness(frame, expected_categories, territory_index, checks, by_date):
+    """Chaque (territoire[, date]) a exactement les catégories attendues, sans doublon
+
+    Les clés sont des entiers (territoire × date × catégorie) : pas de hachage de tuples.
+    """
+    territory_rows, territory_codes = territory_index
+    if by_date:
+        date_rows, dates = pd.factorize(frame['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64))
+        group = territory_rows * len(dates) + date_rows
+        n_groups = len(territory_codes) * len(dates)
+        territory_of_group = np.repeat(np.arange(len(territory_codes)), len(dates))
+    else:
+        group, n_groups = territory_rows, len(territory_codes)
+        territory_of_group = np.arange(len(territory_codes))
+
+    # Catégories attendues par territoire : liste commune ou dictionnaire {territoire: catégories}
+    if isinstance(expected_categories, dict):
+        expected = {code: list(codes) for code, codes in expected_categories.items()}
+    else:
+        expected = {code: list(expected_categories) for code in territory_codes}
+    vocabulary = pd.Index(sorted({code for codes in expected.values() for code in codes}))
+    # Correspondance faite sur les valeurs distinctes seulement
+    category_rows, category_values = _factorize(frame['categorie'])
+    category_codes = vocabulary.get_indexer(category_values)[category_rows]
+    _result(checks, 'categorie_connue', 'categorie', category_codes < 0)
+
+    known = category_codes >= 0
+    pairs = group[known] * len(vocabulary) + category_codes[known]
+    unique_pairs = np.unique(pairs)
+    _result(checks, 'doublons', 'categorie', len(pairs) - len(unique_pairs))
+
+    expected_counts = np.array([len(expected.get(code, ())) for code in territory_codes])[territory_of_group]
+    present = np.bincount(unique_pairs // len(vocabulary), minlength=n_groups)
+    if by_date:
+        # Seules les dates présentes pour un territoire sont exigées complètes
+        observed = np.bincount(group, minlength=n_groups) > 0
+        expected_counts = np.where(observed, expected_counts, 0)
+    missing = expected_counts - present
+    label = 'par territoire et par date' if by_date else 'par territoire'
+    _result(checks, 'completude', 'categorie', int(missing[missing > 0].sum()), f"catégories attendues {label}")
+
+
+def validate_frame(frame, kind, territories, expected_categories=None, version=None, territory_code=None):
+    """Contrôle une table (un ou plusieurs territoires) ; retourne un ValidationReport
+
+    kind : 'historical_data', 'current_data' ou 'comparison'. expected_categories : liste des
+    catégories attendues, ou {territoire: catégories} pour une table empilée.
+    """
+    started = time.perf_counter()
+    checks = []
+    if frame.empty:
+        _result(checks, 'non_vide', '', 1, 'table vide')
+    elif 'territoire' not in frame.columns:
+        _result(checks, 'presence', 'territoire', 1, 'colonne absente')
+    else:
+        # Codes territoire calculés une fois pour tous les contrôles
+        territory_index = _factorize(frame['territoire'])
+        _check_columns(frame, COLUMN_SPECS[kind], territories, territory_index, checks)
+        if all(column in frame.columns for column in COLUMN_SPECS[kind]):
+            _check_ratios(frame, kind, checks)
+            if kind == 'historical_data':
+                _check_dates(frame, territory_index, checks)
+            if expected_categories is not None:
+                _check_completeness(frame, expected_categories, territory_index, checks,
+                                    by_date=kind == 'historical_data')
+    return ValidationReport(kind, territory_code, version, pd.DataFrame(checks), len(frame),
+                            time.perf_counter() - started)
+
+
+class ValidationRegistry:
+    """Rapports enregistrés par (table, territoire, version des données)"""
+
+    def __init__(self):
+        self._reports = {}
+        self._lock = threading.Lock()
+
+    def record(self, report):
+        with self._lock:
+            self._reports[(report.kind, report.territory_code, report.version)] = report
+        return report
+
+    def get(self, kind, territory_code, version):
+        return self._reports.get((kind, territory_code, version))
+
+    def validate(self, frame, kind, territories, expected_categories=None, version=None, territory_code=None):
+        """Rapport de la version si déjà contrôlée, sinon contrôle puis enregistrement"""
+        report = self.get(kind, territory_code, version)
+        if report is None:
+            report = self.record(validate_frame(frame, kind, territories, expected_categories, version,
+                                                territory_code))
+        return report
+
+    def reports(self, version=None):
+        with self._lock:
+            return [report for report in self._reports.values() if version is None or report.version == version]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Paquet impots et Dashboard.py importables depuis la racine du dépôt
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from impots.anomalies import DEFAULT_THRESHOLD, AnomalyDetector, RobustScorer, SeasonalScorer
+
+
+def _monthly(years=6, seed=0):
+    """Recettes mensuelles avec un pic saisonnier en décembre (×3)"""
+    rng = np.random.default_rng(seed)
+    months = np.tile(np.arange(12), years)
+    values = 100.0 * np.where(months == 11, 3.0, 1.0) * (1 + rng.normal(0, 0.02, len(months)))
+    return months, values
+
+
+def test_scores_start_after_warmup_and_flag_spikes():
+    rng = np.random.default_rng(1)
+    scorer = RobustScorer(2, warmup=12)
+    scores = [scorer.score(rng.normal(100, 1, 2)) for _ in range(40)]
+    assert np.isnan(scores[11]).all() and not np.isnan(scores[12]).any()
+    assert (np.abs(np.array(scores[12:])) < DEFAULT_THRESHOLD).all()
+
+    location = scorer.location.copy()
+    spike = scorer.score([100.0, 1000.0])
+    assert abs(spike[0]) < DEFAULT_THRESHOLD and spike[1] > 100
+    # Influence bornée (Huber) : le pic ne déplace la localisation que de quelques écarts-types
+    assert abs(scorer.location[1] - location[1]) < 1.0
+
+
+def test_masked_series_keep_their_state():
+    scorer = RobustScorer(2, warmup=2)
+    for value in (10.0, 12.0, 11.0):
+        scorer.score([value, value])
+    state = scorer.location[1], scorer.dispersion[1], scorer.count[1]
+    scores = scorer.score([11.0, 500.0], mask=[True, False])
+    assert np.isnan(scores[1])
+    assert (scorer.location[1], scorer.dispersion[1], scorer.count[1]) == state
+
+
+def test_seasonal_peak_is_not_an_anomaly():
+    months, values = _monthly()
+    seasonal, plain = SeasonalScorer(1), RobustScorer(1)
+    seasonal_scores, plain_scores = [], []
+    for month, value in zip(months, values):
+        seasonal_scores.append(seasonal.score([value], month)[0])
+        plain_scores.append(plain.score([value])[0])
+
+    december = (months == 11) & (np.arange(len(months)) >= 36)
+    assert (np.array(plain_scores)[december] > DEFAULT_THRESHOLD).all()
+    assert (np.abs(np.array(seasonal_scores)[december]) < DEFAULT_THRESHOLD).all()
+
+    # Une rupture hors saison reste signalée
+    assert seasonal.score([200.0], 5)[0] > DEFAULT_THRESHOLD
+
+
+def test_detector_alerts_on_history_and_ticks():
+    months, values = _monthly(years=5)
+    dates = pd.date_range('2020-01-31', periods=len(months), freq='ME')
+    values[-7] *= 2  # juin de la dernière année
+    history = pd.DataFrame({'date': dates, 'categorie': 'TVA', 'montant_total_impots': values})
+    history = pd.concat([history, history.assign(categorie='IR')], ignore_index=True)
+
+    detector = AnomalyDetector('REUNION', ['TVA', 'IR', 'IS'])
+    detector.observe_history(history)
+    alerts = detector.alert_frame()
+    assert set(alerts['categorie']) == {'TVA', 'IR'}
+    assert (alerts['horodatage'] == dates[-7]).all() and (alerts['source'] == 'historique').all()
+
+    for tick in range(15):
+        ticks = pd.DataFrame({'categorie': ['TVA', 'IR'], 'variation_pct': [0.1 * (-1) ** tick, 0.2]})
+        detector.observe_tick(ticks, pd.Timestamp('2026-10-19 09:00') + pd.Timedelta(minutes=tick))
+    scores = detector.observe_tick(pd.DataFrame({'categorie': ['TVA', 'IR'], 'variation_pct': [25.0, 0.2]}),
+                                   pd.Timestamp('2026-10-19 10:00'), changed_categories={'TVA'})
+    assert scores[0] > DEFAULT_THRESHOLD and np.isnan(scores[1:]).all()
+    flagged = detector.flagged()
+    assert ('TVA', 'temps réel') in set(zip(flagged['categorie'], flagged['source']))
+    assert detector.alert_frame().iloc[0]['source'] == 'temps réel'
@@ -0,0 +1,23 @@
+import pytest
+
+from impots.atomic import atomic_path
+
+
+def test_failed_write_keeps_previous_content(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text('ancienne')
+    with pytest.raises(RuntimeError):
+        with atomic_path(str(path)) as tmp:
+            with open(tmp, 'w') as handle:
+                handle.write('partielle')
+            raise RuntimeError
+    assert path.read_text() == 'ancienne'
+    assert [child.name for child in tmp_path.iterdir()] == ['page.html']
+
+
+def test_write_replaces_and_creates_directory(tmp_path):
+    path = tmp_path / 'v1' / 'REUNION' / 'table.txt'
+    with atomic_path(str(path)) as tmp:
+        with open(tmp, 'w') as handle:
+            handle.write('nouvelle')
+    assert path.read_text() == 'nouvelle'
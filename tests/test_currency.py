@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from impots import currency, data
+from impots.currency import (conversion_factor, convert_totals, factor_vector, frame_currency, rate_table, rates,
+                             tag)
+from impots.parameters import get_parameter_matrix
+from impots.store import HistoricalStore
+
+TERRITORIES = {
+    'REUNION': {'monnaie': 'EUR'},
+    'POLYNESIE': {'monnaie': 'XPF'},
+    'CALEDONIE': {'monnaie': 'XPF'},
+}
+
+
+@pytest.fixture
+def dated_rates(monkeypatch):
+    """Palier fictif : 1 EUR = 100 XPF avant 2020, 119,33 ensuite"""
+    monkeypatch.setitem(currency.RATE_HISTORY, 'XPF', (('2020-01-01', 119.33), ('1999-01-01', 100.0)))
+    currency._rate_steps.cache_clear()
+    yield
+    currency._rate_steps.cache_clear()
+
+
+def test_xpf_to_eur_factors():
+    assert conversion_factor('XPF') == pytest.approx(1 / 119.33)
+    assert conversion_factor('EUR', 'XPF') == pytest.approx(119.33)
+    assert conversion_factor('EUR') == 1.0
+    np.testing.assert_allclose(factor_vector(['REUNION', 'POLYNESIE'], TERRITORIES), [1.0, 1 / 119.33])
+    with pytest.raises(KeyError):
+        rates('USD')
+
+
+def test_dated_rates_apply_per_date(dated_rates):
+    dates = pd.to_datetime(['1995-06-30', '2019-12-31', '2020-01-31'])
+    np.testing.assert_allclose(rates('XPF', dates), [100.0, 100.0, 119.33])
+    table = rate_table(dates, ['REUNION', 'POLYNESIE', 'CALEDONIE'], TERRITORIES)
+    np.testing.assert_allclose(table['REUNION'], 1.0)
+    np.testing.assert_allclose(table['POLYNESIE'], [0.01, 0.01, 1 / 119.33])
+    pd.testing.assert_series_equal(table['CALEDONIE'], table['POLYNESIE'], check_names=False)
+
+
+def test_totals_are_converted_after_aggregation(dated_rates):
+    dates = pd.date_range('2019-10-31', periods=6, freq='ME')
+    frames = {
+        'REUNION': pd.DataFrame({'date': np.repeat(dates, 2), 'territoire': 'REUNION',
+                                 'montant_total_impots': 10.0}),
+        'POLYNESIE': pd.DataFrame({'date': np.repeat(dates, 2), 'territoire': 'POLYNESIE',
+                                   'montant_total_impots': 1193.3}),
+    }
+    totals = HistoricalStore(frames).monthly_totals()
+    source = totals.copy()
+    converted = convert_totals(totals, TERRITORIES)
+
+    pd.testing.assert_frame_equal(totals, source)  # l'agrégat source reste en monnaie locale
+    np.testing.assert_allclose(converted['REUNION'], 20.0)
+    np.testing.assert_allclose(converted['POLYNESIE'], [23.866] * 3 + [20.0] * 3)
+    # Convertir ligne à ligne puis sommer donne le même résultat
+    rows = frames['POLYNESIE']
+    per_row = rows['montant_total_impots'] * conversion_factor('XPF', dates=rows['date'])
+    np.testing.assert_allclose(per_row.groupby(rows['date']).sum(), converted['POLYNESIE'])
+
+
+def test_generated_tables_carry_local_currency():
+    categories = data.get_categories_impots('POLYNESIE')
+    historical_data = data.generate_historical_data('POLYNESIE', categories)
+    current_data = data.generate_current_data('POLYNESIE', categories, historical_data)
+    assert frame_currency(historical_data) == frame_currency(current_data) == 'XPF'
+    assert frame_currency(data.generate_historical_data('REUNION', data.get_categories_impots('REUNION'))) == 'EUR'
+
+    # Paramètres calibrés en euros, montants générés en francs CFP
+    expected_eur = get_parameter_matrix().field('POLYNESIE', 'montant_annuel').sum() / 12
+    assert sum(info['montant_annuel'] for info in categories.values()) / 12 == pytest.approx(expected_eur * 119.33)
+    last_month = historical_data[historical_data['date'] == historical_data['date'].max()]
+    in_eur = last_month['montant_total_impots'].sum() * conversion_factor('XPF')
+    assert 0.5 * expected_eur < in_eur < 2 * expected_eur
+    assert frame_currency(tag(pd.DataFrame(), 'XPF')) == 'XPF'
@@ -0,0 +1,51 @@
+"""Parcours du dashboard exécuté sans serveur (AppTest de Streamlit)"""
+import io
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+AppTest = pytest.importorskip('streamlit.testing.v1').AppTest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Dashboard.py')
+
+
+@pytest.fixture(scope='module')
+def app():
+    at = AppTest.from_file(SCRIPT, default_timeout=300)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def _submit_reform(at, name):
+    field = next(widget for widget in at.text_input if widget.label == "Nom de la réforme:")
+    field.input(name)
+    button = next(widget for widget in at.button if widget.label == "Ajouter la réforme")
+    button.click().run()
+
+
+def test_duplicate_reform_name_is_rejected(app):
+    _submit_reform(app, "Ma réforme")
+    _submit_reform(app, "Ma réforme")
+    _submit_reform(app, "COVID-19")
+
+    assert not app.exception
+    names = [reform['name'] for reform in app.session_state['custom_reforms']]
+    assert names == ["Ma réforme"]
+    assert any("existe déjà" in warning.value for warning in app.warning)
+
+
+def test_export_directory_is_removed_after_zipping(app, tmp_path, monkeypatch):
+    """Seule l'archive est conservée (en session) : aucun répertoire d'export ne reste sur disque"""
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    button = next(widget for widget in app.sidebar.button if widget.label == "Préparer l'export")
+    button.click().run()
+
+    assert not app.exception
+    assert list(tmp_path.iterdir()) == []
+    with zipfile.ZipFile(io.BytesIO(app.session_state['export_zip'])) as archive:
+        names = archive.namelist()
+    assert 'comparaison.parquet' in names
+    assert any(name.startswith(os.path.join('historique', 'territoire=REUNION')) for name in names)
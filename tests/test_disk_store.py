@@ -0,0 +1,27 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from impots.disk_store import DiskStore
+
+
+def test_tables_are_keyed_on_the_history_month(tmp_path):
+    frame = pd.DataFrame({'valeur': [1.0, 2.0]})
+    DiskStore(str(tmp_path), period='2026-09').save('REUNION', 'historical_data', frame)
+
+    pd.testing.assert_frame_equal(
+        DiskStore(str(tmp_path), period='2026-09').load('REUNION', 'historical_data'), frame)
+    assert DiskStore(str(tmp_path), period='2026-10').load('REUNION', 'historical_data') is None
+
+
+def test_prune_keeps_current_and_newer_months(tmp_path):
+    frame = pd.DataFrame({'valeur': [1.0]})
+    for period in ('2026-08', '2026-09', '2026-10'):
+        DiskStore(str(tmp_path), period=period).save('REUNION', 'historical_data', frame)
+
+    store = DiskStore(str(tmp_path), period='2026-09')
+    store.prune()
+    assert sorted(os.listdir(store.base)) == ['2026-09', '2026-10']
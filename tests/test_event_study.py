@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from impots.event_study import TOTAL, EventStudy
+
+
+@pytest.fixture(scope='module')
+def history():
+    rng = np.random.default_rng(7)
+    dates = pd.date_range('2015-01-31', periods=120, freq='ME')
+    categories = ['IR', 'IS', 'TVA', 'OCTROI']
+    return pd.DataFrame({
+        'date': np.repeat(dates, len(categories)),
+        'categorie': np.tile(categories, len(dates)),
+        'montant_total_impots': rng.gamma(5.0, 10.0, len(dates) * len(categories)),
+    })
+
+
+def _brute_force(history, start, end, categories):
+    window = history[(history['date'] >= start) & (history['date'] < end)
+                     & history['categorie'].isin(categories)]
+    monthly = window.pivot_table(index='date', columns='categorie', values='montant_total_impots', aggfunc='sum')
+    return monthly[categories], monthly.sum(axis=1)
+
+
+@pytest.mark.parametrize('categories', [None, ['TVA'], ['IR', 'OCTROI']])
+@pytest.mark.parametrize('event_date, months', [('2018-01-01', 6), ('2020-03-15', 12), ('2015-04-01', 24)])
+def test_impact_matches_brute_force_means(history, categories, event_date, months):
+    study = EventStudy(history)
+    selected = categories or study.categories
+    event = pd.Timestamp(event_date)
+    impacts = study.impact(event, months, categories).set_index('categorie')
+
+    before, total_before = _brute_force(history, event - pd.DateOffset(months=months), event, selected)
+    after, total_after = _brute_force(history, event, event + pd.DateOffset(months=months), selected)
+
+    np.testing.assert_allclose(impacts.loc[selected, 'moyenne_avant'], before.mean().to_numpy())
+    np.testing.assert_allclose(impacts.loc[selected, 'moyenne_apres'], after.mean().to_numpy())
+    np.testing.assert_allclose(impacts.loc[selected, 'impact'], (after.mean() / before.mean()).to_numpy())
+    assert impacts.loc[TOTAL, 'impact'] == pytest.approx(total_after.mean() / total_before.mean())
+    assert impacts.loc[TOTAL, 'mois_avant'] == len(before)
+
+
+def test_window_variances_match_brute_force(history):
+    study = EventStudy(history)
+    n, means, variances, total_mean, total_variance = study.window_stats('2016-01-01', '2017-07-01', ['IS', 'TVA'])
+    monthly, total = _brute_force(history, pd.Timestamp('2016-01-01'), pd.Timestamp('2017-07-01'), ['IS', 'TVA'])
+
+    assert n == len(monthly) == 18
+    np.testing.assert_allclose(means, monthly.mean().to_numpy())
+    np.testing.assert_allclose(variances, monthly.var(ddof=1).to_numpy())
+    assert total_variance == pytest.approx(total.var(ddof=1))
+
+
+def test_empty_window_returns_nan(history):
+    n, means, _, total_mean, _ = EventStudy(history).window_stats('2030-01-01', '2031-01-01')
+    assert n == 0 and np.isnan(means).all() and np.isnan(total_mean)
@@ -0,0 +1,104 @@
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from impots import cli, data, export
+from impots.export import TABLE_COMPARAISON, TABLES, export_all, iter_territory_frames, zip_export
+
+CODES = ['MAYOTTE', 'POLYNESIE']
+
+
+@pytest.fixture(scope='module')
+def frames():
+    return {code: data.load_territory_frames(code) for code in CODES}
+
+
+@pytest.fixture(scope='module')
+def comparison():
+    return data.generate_comparison_data(data.get_territories_definitions())
+
+
+@pytest.fixture
+def exported(tmp_path, frames, comparison):
+    pytest.importorskip('pyarrow')
+    pytest.importorskip('openpyxl')
+    out_dir = str(tmp_path / 'export')
+    outputs = export_all(out_dir, CODES, frames.__getitem__, comparison_data=comparison, excel=True)
+    return out_dir, outputs
+
+
+def test_exported_brackets_match_dashboard_sketches():
+    """Les tranches exportées sont celles affichées (esquisses), pas le barème codé en dur"""
+    code = 'MAYOTTE'
+    (exported_code, tables), = iter_territory_frames([code], data.load_territory_frames)
+    expected = data.revenu_data_from_sketches(
+        data.build_distribution_sketches(code, data.get_categories_impots(code))
+    )
+
+    assert exported_code == code
+    revenus = tables['revenus']
+    assert (revenus['territoire'] == code).all()
+    assert (revenus['monnaie'] == 'EUR').all()
+    pd.testing.assert_frame_equal(revenus.drop(columns=['territoire', 'monnaie']), expected)
+
+
+def test_parquet_is_partitioned_per_territory(exported, frames):
+    out_dir, outputs = exported
+    assert outputs == [os.path.join(out_dir, name) for name in TABLES] + [
+        os.path.join(out_dir, f'{TABLE_COMPARAISON}.parquet'),
+        os.path.join(out_dir, 'impots_drom_com.xlsx'),
+    ]
+    for table_name in TABLES:
+        assert sorted(os.listdir(os.path.join(out_dir, table_name))) == [f'territoire={code}' for code in CODES]
+
+    years = sorted(frames['MAYOTTE']['historical_data']['date'].dt.year.unique())
+    mayotte = os.path.join(out_dir, 'historique', 'territoire=MAYOTTE')
+    assert sorted(os.listdir(mayotte)) == [f'annee={year}' for year in years]
+
+    # Une partition relue contient exactement les lignes du territoire, dans sa monnaie
+    courant = pd.read_parquet(os.path.join(out_dir, 'courant', 'territoire=POLYNESIE'))
+    assert len(courant) == len(frames['POLYNESIE']['current_data'])
+    assert (courant['monnaie'] == 'XPF').all()
+    historique = pd.read_parquet(os.path.join(out_dir, 'historique'))
+    assert len(historique) == sum(len(frames[code]['historical_data']) for code in CODES)
+
+
+def test_excel_has_one_sheet_per_table(exported, frames, comparison):
+    import openpyxl
+
+    out_dir, _ = exported
+    workbook = openpyxl.load_workbook(os.path.join(out_dir, 'impots_drom_com.xlsx'), read_only=True)
+    assert workbook.sheetnames == list(TABLES) + [TABLE_COMPARAISON]
+
+    expected_rows = {
+        'historique': sum(len(frames[code]['historical_data']) for code in CODES),
+        'courant': sum(len(frames[code]['current_data']) for code in CODES),
+        'revenus': sum(len(frames[code]['revenu_data']) for code in CODES),
+        TABLE_COMPARAISON: len(comparison),
+    }
+    for sheet_name, rows in expected_rows.items():
+        sheet = workbook[sheet_name]
+        header = next(sheet.iter_rows(max_row=1, values_only=True))
+        assert 'monnaie' in header or sheet_name == TABLE_COMPARAISON
+        assert sum(1 for _ in sheet.iter_rows(min_row=2)) == rows
+    workbook.close()
+
+
+def test_zip_contains_the_export(exported):
+    out_dir, _ = exported
+    zip_path = zip_export(out_dir, os.path.join(out_dir, 'impots_drom_com.zip'))
+    with zipfile.ZipFile(zip_path) as archive:
+        names = archive.namelist()
+    assert 'impots_drom_com.xlsx' in names and f'{TABLE_COMPARAISON}.parquet' in names
+    assert any(name.startswith(os.path.join('historique', 'territoire=MAYOTTE', 'annee=')) for name in names)
+    assert 'impots_drom_com.zip' not in names
+
+
+def test_cli_export_forwards_options(monkeypatch):
+    """python -m impots export et python -m impots.export partagent le même point d'entrée"""
+    calls = []
+    monkeypatch.setattr(export, 'main', calls.append)
+    cli.main(['--store', 'stock', 'export', '--out', 'sortie', '--zip'])
+    assert calls == [['--out', 'sortie', '--zip', '--store', 'stock']]
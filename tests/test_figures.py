@@ -0,0 +1,63 @@
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from impots.figures import (WEBGL_THRESHOLD, compact_figure, count_points, figure_size_report, line_figure_from_frame,
+                            payload_size, split_by_group, use_webgl)
+
+
+def _decode(spec):
+    return np.frombuffer(base64.b64decode(spec['bdata']), dtype='<' + spec['dtype'])
+
+
+def test_split_by_group_keeps_first_appearance_order():
+    groups = split_by_group(np.array(['TVA', 'IR', 'TVA', 'IS', 'IR']), np.arange(5), np.arange(5) * 10)
+    assert list(groups) == ['TVA', 'IR', 'IS']
+    np.testing.assert_array_equal(groups['IR'][0], [1, 4])
+    np.testing.assert_array_equal(groups['TVA'][1], [0, 20])
+
+
+def test_dense_traces_switch_to_webgl():
+    assert not use_webgl(WEBGL_THRESHOLD) and use_webgl(WEBGL_THRESHOLD + 1)
+    assert use_webgl(10, 'webgl') and not use_webgl(10 ** 6, 'svg')
+
+    dates = pd.date_range('2015-01-31', periods=WEBGL_THRESHOLD + 1, freq='D')
+    frame = pd.concat([
+        pd.DataFrame({'date': dates, 'categorie': 'TVA', 'montant': np.arange(len(dates), dtype=float)}),
+        pd.DataFrame({'date': dates[:10], 'categorie': 'IR', 'montant': np.ones(10)}),
+    ])
+    fig = line_figure_from_frame(frame, 'date', 'montant', color='categorie', colors={'TVA': 'red', 'IR': 'blue'})
+    assert [type(trace) for trace in fig.data] == [go.Scattergl, go.Scatter]
+    assert [trace.name for trace in fig.data] == ['TVA', 'IR']
+    assert fig.data[1].line.color == 'blue'
+    assert fig.layout.legend.title.text == 'categorie'
+    np.testing.assert_array_equal(fig.data[1].y, np.ones(10))
+
+
+def test_compact_figure_encodes_typed_arrays():
+    dates = pd.date_range('2015-01-31', periods=2000, freq='D')
+    values = np.linspace(0.0, 1.0, len(dates))
+    fig = go.Figure([
+        go.Scatter(x=dates.to_numpy(), y=values, name='courbe'),
+        go.Bar(x=['TVA', 'IR'], y=np.array([3, 4])),
+    ])
+    fig.update_layout(title='Recettes')
+    before = payload_size(fig)
+
+    compact_figure(fig)
+    payload = json.loads(pio.to_json(fig, validate=False))
+    courbe, barres = payload['data']
+    assert courbe['y']['dtype'] == 'f4' and courbe['x']['dtype'] == 'f8'
+    np.testing.assert_allclose(_decode(courbe['y']), values, rtol=1e-6)
+    np.testing.assert_array_equal(_decode(courbe['x']), dates.to_numpy().astype('datetime64[ms]').astype(np.int64))
+    assert payload['layout']['xaxis']['type'] == 'date'
+    # Les catégories textuelles restent des listes JSON, les entiers passent en int32
+    assert barres['x'] == ['TVA', 'IR'] and barres['y']['dtype'] == 'i4'
+
+    report = figure_size_report(fig, before)
+    assert report['figure'] == 'Recettes' and report['points'] == count_points(fig) == 2002
+    assert report['apres_ko'] < report['avant_ko'] and report['gain_pct'] > 0
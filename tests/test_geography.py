@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from impots.geography import (ZOOM_TOLERANCES, douglas_peucker, feature_bounds, join_properties, load_geojson,
+                              simplified_geojson, vertex_count, zoom_level)
+
+
+def _segment_distance(point, start, end):
+    segment, offset = end - start, point - start
+    t = np.clip(offset @ segment / max(segment @ segment, 1e-18), 0.0, 1.0)
+    return np.hypot(*(offset - t * segment))
+
+
+def test_douglas_peucker_stays_within_tolerance():
+    x = np.linspace(0, 10, 500)
+    points = np.column_stack([x, np.sin(x) + np.random.default_rng(0).normal(0, 0.01, len(x))])
+    tolerance = 0.05
+    kept = douglas_peucker(points, tolerance)
+
+    assert kept[0] == 0 and kept[-1] == len(points) - 1 and len(kept) < len(points) // 5
+    for start, end in zip(kept[:-1], kept[1:]):
+        for point in points[start + 1:end]:
+            assert _segment_distance(point, points[start], points[end]) <= tolerance + 1e-12
+    # Points alignés : seules les extrémités restent ; tolérance nulle : rien n'est retiré
+    np.testing.assert_array_equal(douglas_peucker(np.column_stack([x, 2 * x]), 0.001), [0, len(x) - 1])
+    np.testing.assert_array_equal(douglas_peucker(points, 0.0), np.arange(len(points)))
+
+
+def test_coarser_zoom_levels_have_fewer_vertices():
+    counts = {level: vertex_count(simplified_geojson(level)) for level in ZOOM_TOLERANCES}
+    assert counts['detail'] == vertex_count(load_geojson())
+    assert counts['monde'] < counts['region'] < counts['detail']
+
+    source_codes = [feature['properties']['code'] for feature in load_geojson()['features']]
+    for level in ZOOM_TOLERANCES:
+        geojson = simplified_geojson(level)
+        assert [feature['properties']['code'] for feature in geojson['features']] == source_codes
+        for feature in geojson['features']:
+            geometry = feature['geometry']
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            for ring in (ring for polygon in polygons for ring in polygon):
+                assert len(ring) >= 4 and ring[0] == ring[-1]
+    assert simplified_geojson('monde') is simplified_geojson('monde')
+
+
+def test_zoom_level_follows_extent():
+    assert zoom_level([[-21.4, 55.2], [-20.8, 55.9]]) == 'detail'
+    assert zoom_level([[10.0, -70.0], [25.0, -55.0]]) == 'region'
+    assert zoom_level(feature_bounds(load_geojson())) == 'monde'
+
+
+def test_join_does_not_modify_cached_geometries():
+    geojson = simplified_geojson('region')
+    code = geojson['features'][0]['properties']['code']
+    joined = join_properties(geojson, pd.DataFrame({'territoire': [code], 'pression_fiscale': [12.5]}))
+    assert [feature['properties']['pression_fiscale'] for feature in joined['features']] == [12.5]
+    assert 'pression_fiscale' not in geojson['features'][0]['properties']
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from impots.hierarchy import ROOT_LABEL, AggregateTree
+
+CATEGORIES = {
+    'IR': {'type_impot': 'Direct', 'sous_categorie': 'Revenu'},
+    'IS': {'type_impot': 'Direct', 'sous_categorie': 'Bénéfices'},
+    'TVA': {'type_impot': 'Indirect', 'sous_categorie': 'Consommation'},
+}
+
+
+@pytest.fixture
+def history():
+    dates = pd.date_range('2024-01-31', periods=24, freq='ME')
+    rng = np.random.default_rng(0)
+    return pd.concat([
+        pd.DataFrame({'date': dates, 'categorie': categorie, 'montant_total_impots': rng.uniform(10, 50, len(dates))})
+        for categorie in CATEGORIES
+    ], ignore_index=True)
+
+
+def _rollups_match_groupby(tree, history):
+    expected = history.assign(
+        type_impot=history['categorie'].map(lambda code: CATEGORIES[code]['type_impot']))
+    assert tree.value() == pytest.approx(expected['montant_total_impots'].sum())
+    by_type = expected.groupby('type_impot')['montant_total_impots'].sum()
+    children = tree.children().set_index('noeud')
+    np.testing.assert_allclose(children.loc[by_type.index, 'montant'], by_type)
+    assert children['part_pct'].sum() == pytest.approx(100.0)
+
+
+def test_rollups_match_groupby(history):
+    tree = AggregateTree(history, CATEGORIES)
+    _rollups_match_groupby(tree, history)
+
+    months = tree.children(tree.path_of('TVA'))
+    assert len(months) == 24 and (months['niveau'] == 'mois').all()
+    assert months['noeud'].iloc[-1] == '2025-12' and tree.live_period == '2026-01'
+    assert tree.value(('Direct',)) == pytest.approx(tree.value(tree.path_of('IR')) + tree.value(tree.path_of('IS')))
+
+
+def test_ticks_update_current_month_and_ancestors_only(history):
+    tree = AggregateTree(history, CATEGORIES)
+    before = {path: tree.value(path) for path in [(), ('Direct',), ('Indirect',), tree.path_of('IS')]}
+    ticks = pd.DataFrame({'categorie': ['IR', 'TVA'], 'montant_mensuel': [5.0, 7.0]})
+
+    tree.apply_tick(ticks, changed_categories={'IR'})
+    tree.apply_tick(ticks.assign(montant_mensuel=[8.0, 7.0]), changed_categories={'IR'})
+    live_leaf = tree.path_of('IR') + (tree.live_period,)
+    assert tree.value(live_leaf) == 8.0
+    assert tree.value(('Direct',)) == pytest.approx(before[('Direct',)] + 8.0)
+    assert tree.value(()) == pytest.approx(before[()] + 8.0)
+    assert tree.value(('Indirect',)) == before[('Indirect',)]
+    assert tree.value(tree.path_of('IS')) == before[tree.path_of('IS')]
+
+    # Même résultat qu'un arbre reconstruit avec le mois en cours dans l'historique
+    live_month = pd.DataFrame({'date': [pd.Timestamp('2026-01-31')], 'categorie': ['IR'],
+                               'montant_total_impots': [8.0]})
+    _rollups_match_groupby(tree, pd.concat([history, live_month], ignore_index=True))
+
+
+def test_plotly_export_sums_to_parents(history):
+    tree = AggregateTree(history, CATEGORIES)
+    nodes = tree.to_plotly(max_depth=2)
+    assert nodes['ids'][0] == ROOT_LABEL and nodes['parents'][0] == ''
+    assert len(nodes['ids']) == 1 + 2 + 3  # racine, types, sous-catégories
+    assert sum(nodes['values']) == pytest.approx(tree.value())
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from impots.kpi import KpiEngine, kpi_table
+
+TERRITORIES = {
+    'POLYNESIE': {'population': 280000, 'pib': 5.6, 'monnaie': 'XPF'},
+    'REUNION': {'population': 870000, 'pib': 19.0, 'monnaie': 'EUR'},
+}
+
+
+def _current_data(code, scale):
+    return pd.DataFrame({
+        'territoire': code,
+        'categorie': ['TVA', 'IR', 'IS'],
+        'montant_mensuel': np.array([30.0, 20.0, 10.0]) * scale,
+        'variation_pct': [1.5, -0.5, 2.0],
+        'variation_abs': np.array([0.4, -0.1, 0.2]) * scale,
+        'nombre_contribuables': [400000, 150000, 20000],
+        'montant_annee_precedente': np.array([29.0, 21.0, 9.5]) * scale,
+    })
+
+
+def test_engine_reporting_matches_converted_table():
+    for code, scale in (('POLYNESIE', 119.33), ('REUNION', 1.0)):
+        current_data = _current_data(code, scale)
+        engine = KpiEngine(code, TERRITORIES[code])
+        engine.update(0, current_data)
+        expected = kpi_table(current_data, TERRITORIES, 'EUR').loc[code]
+        np.testing.assert_allclose(engine.reporting.astype(float), expected.astype(float))
+
+
+def test_engine_recomputes_only_on_new_version():
+    engine = KpiEngine('REUNION', TERRITORIES['REUNION'])
+    first = engine.update(1, _current_data('REUNION', 1.0))
+    assert engine.update(1, _current_data('REUNION', 2.0)) is first
+    engine.update(2, _current_data('REUNION', 2.0))
+    assert engine.previous is first
+    assert engine.deltas()['montant_total_mensuel'] == 100.0
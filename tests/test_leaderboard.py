@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from impots.leaderboard import Leaderboard, RankedIndex
+
+
+def _expected_order(values):
+    return sorted(values.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_ranked_index_matches_full_sort():
+    rng = np.random.default_rng(0)
+    index, values = RankedIndex(), {}
+    for _ in range(2000):
+        key = f'k{rng.integers(50)}'
+        value = float(rng.integers(-20, 20))  # valeurs répétées : départage par clé
+        index.update(key, value)
+        values[key] = value
+        assert index.top(10) == _expected_order(values)[:10]
+    assert len(index) == len(values)
+    for rank, (key, _) in enumerate(_expected_order(values), start=1):
+        assert index.rank(key) == rank
+
+
+def test_ranked_index_nan_removes_key():
+    index = RankedIndex()
+    index.update('a', 1.0)
+    index.update('b', 2.0)
+    index.update('a', np.nan)
+    assert index.top() == [('b', 2.0)]
+    assert index.rank('a') is None
+
+
+def test_leaderboard_converts_global_amounts_only():
+    territories = {
+        'REUNION': {'monnaie': 'EUR'},
+        'POLYNESIE': {'monnaie': 'XPF'},
+    }
+    board = Leaderboard(territories)
+    board.observe(pd.DataFrame({'territoire': 'REUNION', 'categorie': ['TVA', 'IR'],
+                                'montant_mensuel': [50.0, 40.0], 'variation_pct': [1.0, 3.0]}))
+    board.observe(pd.DataFrame({'territoire': 'POLYNESIE', 'categorie': ['TVA'],
+                                'montant_mensuel': [119.33 * 60], 'variation_pct': [2.0]}))
+
+    top = board.top('montant_mensuel', 3)
+    assert list(zip(top['territoire'], top['categorie'])) == [('POLYNESIE', 'TVA'), ('REUNION', 'TVA'),
+                                                              ('REUNION', 'IR')]
+    assert np.isclose(top['montant_mensuel'].iloc[0], 60.0)
+    assert board.top('montant_mensuel', 1, 'POLYNESIE')['montant_mensuel'].iloc[0] == 119.33 * 60
+
+    # Un tick ne repositionne que les catégories modifiées
+    tick = pd.DataFrame({'territoire': 'REUNION', 'categorie': ['TVA', 'IR'],
+                         'montant_mensuel': [50.0, 40.0], 'variation_pct': [5.0, 3.0]})
+    assert board.observe(tick, {'TVA'}) == 1
+    assert board.rank('variation_pct', 'REUNION', 'TVA') == 1
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from impots.live import TickRingBuffer, VersionedSnapshot
+
+CATEGORIES = ['TVA', 'IR', 'IS', 'OCTROI']
+START = datetime(2026, 10, 19, 9, 0)
+
+
+def _states(count=8, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'categorie': CATEGORIES,
+        'montant_mensuel': [30.0, 20.0, 10.0, 5.0],
+        'variation_pct': 0.0,
+    })
+    states = [frame]
+    for _ in range(count):
+        frame = frame.copy()
+        # Une ou deux catégories modifiées par tick
+        rows = rng.choice(len(CATEGORIES), size=rng.integers(1, 3), replace=False)
+        frame.loc[rows, 'montant_mensuel'] *= 1 + rng.normal(0, 0.05, len(rows))
+        frame.loc[rows, 'variation_pct'] = rng.normal(0, 2, len(rows))
+        states.append(frame)
+    return states
+
+
+def _fields(frame):
+    return frame.set_index('categorie')[['montant_mensuel', 'variation_pct']].sort_index()
+
+
+def _snapshot(states, max_log_entries=None):
+    snapshot = VersionedSnapshot('REUNION', states[0], max_log_entries=max_log_entries, timestamp=START)
+    for position, state in enumerate(states[1:], start=1):
+        snapshot.update(state, timestamp=START + timedelta(minutes=position))
+    return snapshot
+
+
+def test_replay_rebuilds_every_version():
+    states = _states()
+    snapshot = _snapshot(states)
+    assert snapshot.version == len(states) - 1
+    for version, state in enumerate(states):
+        pd.testing.assert_frame_equal(_fields(snapshot.replay(version)), _fields(state))
+    pd.testing.assert_frame_equal(_fields(snapshot.replay(timestamp=START + timedelta(minutes=3, seconds=30))),
+                                  _fields(states[3]))
+
+
+def test_unchanged_update_keeps_version_and_log():
+    states = _states(2)
+    snapshot = _snapshot(states)
+    entries = len(snapshot.log)
+    assert snapshot.update(states[-1].copy()) == set()
+    assert snapshot.version == 2 and len(snapshot.log) == entries
+    changed = snapshot.update(states[-1].assign(montant_mensuel=lambda frame: frame['montant_mensuel'].where(
+        frame['categorie'] != 'IS', 99.0)))
+    assert changed == {'IS'} and snapshot.changed_since(2) == {'IS'}
+
+
+def test_truncated_log_still_replays_recent_versions():
+    states = _states(20)
+    snapshot = _snapshot(states, max_log_entries=10)
+    assert len(snapshot.log) <= 10
+    oldest = snapshot.oldest_replayable_version
+    assert oldest > 0
+    with pytest.raises(ValueError):
+        snapshot.replay(oldest - 1)
+    for version in range(oldest, snapshot.version + 1):
+        pd.testing.assert_frame_equal(_fields(snapshot.replay(version)), _fields(states[version]))
+
+
+def _tick(value):
+    return pd.DataFrame({'categorie': ['TVA', 'IR'], 'montant_mensuel': [value, -value],
+                         'variation_pct': [value / 10, 0.0]})
+
+
+def test_ring_buffer_wraps_around_in_chronological_order():
+    buffer = TickRingBuffer(CATEGORIES, capacity=5)
+    for tick in range(1, 13):
+        buffer.record(_tick(float(tick)), timestamp=START + timedelta(minutes=tick))
+
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(buffer.series('TVA'), [8.0, 9.0, 10.0, 11.0, 12.0])
+    np.testing.assert_array_equal(buffer.series('IR', last_n=2), [-11.0, -12.0])
+    # Catégories absentes des ticks : NaN, sans hériter des valeurs écrasées
+    assert np.isnan(buffer.series('IS')).all()
+    np.testing.assert_array_equal(
+        buffer.timestamps(), np.array([START + timedelta(minutes=tick) for tick in range(8, 13)], dtype='datetime64[ns]'))
+
+    stats = buffer.rolling_stats(last_n=3).set_index('categorie')
+    assert stats.loc['TVA', 'ticks'] == 3 and stats.loc['TVA', 'montant_dernier'] == 12.0
+    assert stats.loc['TVA', 'montant_min'] == 10.0 and stats.loc['IR', 'montant_max'] == -10.0
+    assert stats.loc['TVA', 'variation_moyenne'] == pytest.approx(1.1)
+    assert stats.loc['OCTROI', 'ticks'] == 0
+
+
+def test_ring_buffer_before_wraparound():
+    buffer = TickRingBuffer(CATEGORIES, capacity=5)
+    buffer.record(_tick(1.0))
+    buffer.record(_tick(2.0))
+    assert len(buffer) == 2
+    assert buffer.sparklines()['TVA'] == [1.0, 2.0]
+    assert buffer.values('montant_mensuel', last_n=10).shape == (len(CATEGORIES), 2)
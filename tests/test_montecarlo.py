@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from impots.montecarlo import (CHUNK_PATHS, MONTHLY_VOLATILITY, _simulate_chunk, monte_carlo_projection,
+                               monte_carlo_projections)
+from impots.seeding import ALL_CATEGORIES, stream_rng
+
+CATEGORIES = {
+    'TVA': {'montant_annuel': 980.0, 'evolution_annuelle': 2.9},
+    'IR': {'montant_annuel': 850.0, 'evolution_annuelle': 3.2},
+    'TH': {'montant_annuel': 320.0, 'evolution_annuelle': -2.5},
+}
+LAST_DATE = pd.Timestamp('2026-09-30')
+
+
+def _results_equal(first, second):
+    pd.testing.assert_frame_equal(first['bands'], second['bands'])
+    pd.testing.assert_frame_equal(first['categories'], second['categories'])
+
+
+def test_projection_is_reproducible():
+    first = monte_carlo_projection('REUNION', CATEGORIES, LAST_DATE, projection_years=2, paths=3000)
+    _results_equal(first, monte_carlo_projection('REUNION', CATEGORIES, LAST_DATE, projection_years=2, paths=3000))
+    other = monte_carlo_projection('MAYOTTE', CATEGORIES, LAST_DATE, projection_years=2, paths=3000)
+    assert not first['bands'].equals(other['bands'])
+
+    bands = first['bands']
+    assert len(bands) == 24 and bands['date'].iloc[0] == pd.Timestamp('2026-10-31')
+    percentiles = bands[['p5', 'p25', 'p50', 'p75', 'p95']].to_numpy()
+    assert (np.diff(percentiles, axis=1) >= 0).all()
+
+
+def test_chunks_are_independent_streams():
+    paths, n_months = 2 * CHUNK_PATHS + 500, 12
+    result = monte_carlo_projection('REUNION', CATEGORIES, LAST_DATE, projection_years=1, paths=paths)
+
+    # Chaque bloc se recalcule seul, dans n'importe quel ordre, à partir de son propre flux
+    base = np.array([info['montant_annuel'] / 12 for info in CATEGORIES.values()])
+    drift = np.log1p(np.array([info['evolution_annuelle'] for info in CATEGORIES.values()]) / 100) / 12
+    totals = {}
+    for start in reversed(range(0, paths, CHUNK_PATHS)):
+        rng = stream_rng('REUNION', ALL_CATEGORIES, f'montecarlo:2026-09:{start}')
+        levels = _simulate_chunk(rng, base, drift, min(CHUNK_PATHS, paths - start), n_months, MONTHLY_VOLATILITY)
+        totals[start] = levels.sum(axis=2)
+    totals = np.vstack([totals[start] for start in sorted(totals)])
+    np.testing.assert_allclose(result['bands']['moyenne'], totals.mean(axis=0))
+    np.testing.assert_allclose(result['bands']['p50'], np.percentile(totals, 50, axis=0))
+
+
+def test_mean_follows_trend():
+    result = monte_carlo_projection('REUNION', CATEGORIES, LAST_DATE, projection_years=3, paths=6000)
+    months = np.arange(1, 37)
+    expected = sum(info['montant_annuel'] / 12 * (1 + info['evolution_annuelle'] / 100) ** (months / 12)
+                   for info in CATEGORIES.values())
+    np.testing.assert_allclose(result['bands']['moyenne'], expected, rtol=0.01)
+
+
+def test_parallel_workers_match_sequential():
+    jobs = {code: (CATEGORIES, LAST_DATE) for code in ('REUNION', 'GUYANE', 'MAYOTTE')}
+    sequential = monte_carlo_projections(jobs, projection_years=1, paths=2500)
+    parallel = monte_carlo_projections(jobs, projection_years=1, paths=2500, workers=3)
+    assert list(parallel) == list(jobs)
+    for code in jobs:
+        _results_equal(sequential[code], parallel[code])
@@ -0,0 +1,23 @@
+import pytest
+
+from impots.parameters import ParameterMatrix
+
+
+def test_income_tax_follows_the_brackets():
+    matrix = ParameterMatrix()
+    # 30 000 € par part : tranche à 11 % pleine puis 30 % au-delà de 27 478 €
+    gross, reduction, net = matrix.income_tax('POLYNESIE', 30000.0)
+    assert gross == pytest.approx((27478 - 10777) * 0.11 + (30000 - 27478) * 0.30)
+    assert reduction == 0.0 and net == gross
+    assert matrix.income_tax('REUNION', 10000.0) == (0.0, 0.0, 0.0)
+    # Deux parts : deux fois l'impôt d'une part sur la moitié du revenu
+    assert matrix.income_tax('POLYNESIE', 60000.0, 2)[0] == pytest.approx(2 * gross)
+
+
+def test_territory_reduction_is_capped():
+    matrix = ParameterMatrix(ir_reductions={'REUNION': (0.30, 2450), 'GUYANE': (0.40, 4050)})
+    gross, reduction, net = matrix.income_tax('REUNION', 30000.0)
+    assert reduction == pytest.approx(0.30 * gross) and net == pytest.approx(gross - reduction)
+    gross, reduction, _ = matrix.income_tax('GUYANE', 200000.0)
+    assert reduction == 4050 < 0.40 * gross
+    assert matrix.ir_schedule('MAYOTTE')[2:] == (0.0, 0.0)
@@ -0,0 +1,47 @@
+import socket
+import threading
+import time
+import urllib.request
+
+from impots import cli, publish
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('', 0))
+        return sock.getsockname()[1]
+
+
+def test_publish_once_keeps_serving(tmp_path, monkeypatch):
+    """publish --serve sans --interval : la commande sert les pages au lieu de rendre la main"""
+    def fake_publish(out_dir, codes=None, script=None):
+        (tmp_path / 'index.html').write_text('<p>instantané</p>', encoding='utf-8')
+        return {'REUNION': {'fichier': str(tmp_path / 'index.html'), 'figures': 0, 'octets': 17}}
+
+    servers = []
+
+    class RecordingServer(publish.ThreadingHTTPServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            servers.append(self)
+
+    monkeypatch.setattr(publish, 'publish', fake_publish)
+    monkeypatch.setattr(publish, 'ThreadingHTTPServer', RecordingServer)
+
+    port = _free_port()
+    args = cli.build_parser().parse_args(['publish', '--out', str(tmp_path), '--serve', str(port)])
+    command = threading.Thread(target=cli.cmd_publish, args=(args,), daemon=True)
+    command.start()
+
+    deadline = time.monotonic() + 10
+    while not servers and time.monotonic() < deadline:
+        time.sleep(0.05)
+    try:
+        with urllib.request.urlopen(f'http://localhost:{port}/index.html', timeout=5) as response:
+            assert 'instantané' in response.read().decode('utf-8')
+        assert command.is_alive()
+    finally:
+        for server in servers:
+            server.shutdown()
+    command.join(timeout=5)
+    assert not command.is_alive()
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pandas as pd
+
+from impots.data import apply_live_update, generate_historical_data, get_categories_impots
+from impots.seeding import data_token, history_end, stream_seed
+
+
+def _current_data():
+    return pd.DataFrame({
+        'territoire': 'REUNION',
+        'categorie': [f'C{index}' for index in range(40)],
+        'montant_mensuel': 10.0,
+        'variation_pct': 0.0,
+        'nombre_contribuables': 1000.0,
+    })
+
+
+def test_stream_seed_is_stable_and_keyed():
+    assert stream_seed('REUNION', 'TVA', '2026-10') == stream_seed('REUNION', 'TVA', '2026-10')
+    assert stream_seed('REUNION', 'TVA', '2026-10') != stream_seed('REUNION', 'TVA', '2026-11')
+    assert stream_seed('REUNION', 'TVA', '2026-10') != stream_seed('MAYOTTE', 'TVA', '2026-10')
+
+
+def test_live_ticks_depend_on_period():
+    october = data_token(datetime(2026, 10, 15))
+    november = data_token(datetime(2026, 11, 15))
+    first = apply_live_update(_current_data(), 1, october)
+
+    pd.testing.assert_frame_equal(first, apply_live_update(_current_data(), 1, october))
+    assert not first.equals(apply_live_update(_current_data(), 1, november))
+
+
+def test_token_changes_with_the_last_month_end():
+    assert data_token(datetime(2026, 10, 30, 23, 59)) == data_token(datetime(2026, 9, 30))
+    assert data_token(datetime(2026, 10, 31)) != data_token(datetime(2026, 10, 30))
+    assert data_token(datetime(2026, 10, 31)) == data_token(datetime(2026, 11, 1))
+
+
+def test_history_ends_on_the_tokened_month_end():
+    historical_data = generate_historical_data('REUNION', get_categories_impots('REUNION'))
+    assert historical_data['date'].max() == history_end()
+    assert data_token().endswith(f"{historical_data['date'].max():%Y-%m}")
@@ -0,0 +1,48 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+from impots.session import SessionRegistry, TerritoryLRU, estimate_size
+
+
+def test_lru_evicts_least_recently_viewed():
+    territories = TerritoryLRU(max_territories=2)
+    territories['REUNION'] = {'n': 1}
+    territories['MAYOTTE'] = {'n': 2}
+    territories['REUNION']  # consultation : MAYOTTE devient la plus ancienne
+    territories['GUYANE'] = {'n': 3}
+
+    assert territories.keys() == ['REUNION', 'GUYANE']
+    assert 'MAYOTTE' not in territories and territories.evictions == 1
+    territories['REUNION'] = {'n': 4}  # remplacement sans éviction
+    assert len(territories) == 2 and territories.evictions == 1
+
+
+def test_footprint_separates_shared_views():
+    territories = TerritoryLRU()
+    frame = pd.DataFrame({'valeur': np.zeros(1000)})
+    territories['REUNION'] = {'historical_data': frame, 'kpis': np.zeros(500)}
+    footprint = territories.footprint(shared_keys=('historical_data',)).set_index('territoire')
+    assert footprint.loc['REUNION', 'partage_octets'] >= 8000
+    assert 4000 <= footprint.loc['REUNION', 'session_octets'] < 8000
+    assert estimate_size([frame, frame]) < 2 * estimate_size(frame)
+
+
+def test_sweep_clears_only_idle_sessions():
+    registry = SessionRegistry(idle_timeout=60)
+    idle, active, closed = TerritoryLRU(), TerritoryLRU(), TerritoryLRU()
+    for session in (idle, active, closed):
+        session['REUNION'] = {'n': 1}
+    del session
+    registry.touch('idle', idle, now=0)
+    registry.touch('active', active, now=100)
+    registry.touch('closed', closed, now=0)
+    del closed
+    gc.collect()
+
+    assert registry.sweep(now=130) == ['idle']
+    assert len(idle) == 0 and len(active) == 1
+    # La session fermée a disparu du registre sans rien à libérer
+    assert len(registry) == 1
+    assert registry.sweep(now=161) == ['active']
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from impots.shared_cache import SharedFrameCache
+
+
+def _files(root):
+    return sorted(os.path.relpath(os.path.join(directory, name), root)
+                  for directory, _, names in os.walk(root) for name in names)
+
+
+def _tables(root):
+    return [name for name in _files(root) if not name.endswith('.lock')]
+
+
+def test_new_version_prunes_older_versions(tmp_path):
+    cache = SharedFrameCache(str(tmp_path))
+    frame = pd.DataFrame({'valeur': [1.0, 2.0]})
+    cache.get_or_create('historique/1.2:2026-09/REUNION', lambda: frame)
+    cache.get_or_create('comparaison/1.2:2026-09', lambda: frame)
+
+    # Un autre processus (ou le même, le mois suivant) écrit la nouvelle version
+    cache = SharedFrameCache(str(tmp_path))
+    cache.get_or_create('historique/1.2:2026-10/REUNION', lambda: frame)
+    cache.get_or_create('comparaison/1.2:2026-10', lambda: frame)
+
+    assert _tables(tmp_path) == [
+        os.path.join('comparaison', '1.2_2026-10.arrow'),
+        os.path.join('historique', '1.2_2026-10', 'REUNION.arrow'),
+    ]
+    pd.testing.assert_frame_equal(cache.get('historique/1.2:2026-10/REUNION'), frame)
+
+
+def test_prune_keeps_newer_versions_and_locks(tmp_path):
+    frame = pd.DataFrame({'valeur': [1.0]})
+    # Un worker déjà passé au mois suivant a publié la version 2026-10
+    SharedFrameCache(str(tmp_path)).get_or_create('historique/1.2:2026-10/REUNION', lambda: frame)
+    # Un worker resté sur 2026-09 ne doit pas la supprimer
+    SharedFrameCache(str(tmp_path)).get_or_create('historique/1.2:2026-09/REUNION', lambda: frame)
+
+    assert _tables(tmp_path) == [
+        os.path.join('historique', '1.2_2026-09', 'REUNION.arrow'),
+        os.path.join('historique', '1.2_2026-10', 'REUNION.arrow'),
+    ]
+    SharedFrameCache(str(tmp_path)).put('historique/1.2:2026-11/REUNION', frame)
+    assert _tables(tmp_path) == [os.path.join('historique', '1.2_2026-11', 'REUNION.arrow')]
+    assert os.path.join('historique', '1.2_2026-09', 'REUNION.arrow.lock') in _files(tmp_path)
+
+
+def test_clear_removes_tables_but_not_locks(tmp_path):
+    cache = SharedFrameCache(str(tmp_path))
+    cache.get_or_create('courant/1.2:2026-10/REUNION', lambda: pd.DataFrame({'valeur': [1.0]}))
+    cache.clear()
+    assert _files(tmp_path) == [os.path.join('courant', '1.2_2026-10', 'REUNION.arrow.lock')]
+
+
+def test_live_tick_reads_metadata_only(tmp_path):
+    cache = SharedFrameCache(str(tmp_path))
+    key = 'live/1.2:2026-10/REUNION'
+    assert cache.live.tick(key) == 0
+    frame, tick, _ = cache.live.advance(key, 0, pd.DataFrame({'valeur': [1.0]}),
+                                        lambda state, n: state.assign(valeur=state['valeur'] + n))
+    assert tick == 1 and cache.live.tick(key) == 1
+    assert frame['valeur'].tolist() == [2.0]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from impots.sketches import KLLSketch
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_error(sketch, values):
+    """Écart maximal entre rang visé et rang réel des quantiles estimés"""
+    ordered = np.sort(values)
+    ranks = np.searchsorted(ordered, sketch.quantiles(QS), side='right') / len(ordered)
+    return np.max(np.abs(ranks - QS))
+
+
+@pytest.fixture(scope='module')
+def values():
+    return np.random.default_rng(3).lognormal(10, 1.2, 400_000)
+
+
+def test_rank_error_is_bounded(values):
+    sketch = KLLSketch(k=1000)
+    for chunk in np.array_split(values, 40):
+        sketch.update(chunk)
+
+    assert _rank_error(sketch, values) < 0.01
+    assert sketch.size < 5000  # mémoire bornée, indépendante du nombre de valeurs
+    assert sketch.count == len(values)
+    assert sketch.total == pytest.approx(values.sum())
+    assert (sketch.minimum, sketch.maximum) == (values.min(), values.max())
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_merge_matches_single_stream(values):
+    parts = np.array_split(values, 7)
+    merged = KLLSketch.merged([KLLSketch(k=1000).update(part) for part in parts], k=1000)
+
+    assert merged.count == len(values)
+    assert merged.total == pytest.approx(values.sum())
+    assert _rank_error(merged, values) < 0.01
+
+
+def test_merge_rejects_different_k():
+    with pytest.raises(ValueError):
+        KLLSketch(k=200).merge(KLLSketch(k=1000))
+
+
+def test_top_share_and_scaled(values):
+    sketch = KLLSketch(k=1000).update(values)
+    ordered = np.sort(values)
+    exact = ordered[-len(values) // 100:].sum() / values.sum()
+    assert sketch.top_share(0.01) == pytest.approx(exact, abs=0.01)
+
+    scaled = sketch.scaled(1 / 119.33)
+    assert scaled.total == pytest.approx(sketch.total / 119.33)
+    np.testing.assert_allclose(scaled.quantiles(QS), sketch.quantiles(QS) / 119.33)
+
+
+def test_empty_sketch():
+    sketch = KLLSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    assert np.isnan(sketch.top_share())
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from impots.timeseries import DateIndex, downsample_frame, downsample_indices, lttb, minmax
+
+
+def _series(n=2000):
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 50.0)
+    y[700] = 5.0    # pic isolé
+    y[1300] = -5.0  # creux isolé
+    return x, y
+
+
+def test_window_matches_boolean_mask():
+    dates = pd.date_range('2015-01-31', periods=120, freq='ME')
+    frame = pd.DataFrame({'date': np.repeat(dates, 3), 'valeur': np.arange(360.0)})
+    shuffled = frame.sample(frac=1.0, random_state=0)
+    index = DateIndex(shuffled)
+
+    assert index.min_date == dates[0] and index.max_date == dates[-1]
+    start, end = pd.Timestamp('2018-03-15'), dates[60]
+    expected = frame[(frame['date'] >= start) & (frame['date'] <= end)]
+    window = index.window(start, end)
+    assert window['date'].is_monotonic_increasing
+    assert sorted(window['valeur']) == sorted(expected['valeur'])
+    assert len(index.window(dates[-1] + pd.Timedelta(days=1))) == 0
+    assert len(index.window()) == len(frame)
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsampling_keeps_extremes_and_order(method):
+    x, y = _series()
+    indices = downsample_indices(x, y, 200, method)
+    assert len(indices) <= 200
+    assert (np.diff(indices) > 0).all()
+    assert {700, 1300} <= set(indices.tolist())
+
+
+def test_lttb_keeps_endpoints_and_short_series():
+    x, y = _series()
+    indices = lttb(x, y, 100)
+    assert len(indices) == 100 and indices[0] == 0 and indices[-1] == len(y) - 1
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 100), np.arange(50))
+    np.testing.assert_array_equal(minmax(y[:50], 100), np.arange(50))
+
+
+def test_downsample_frame_bounds_each_group():
+    dates = pd.date_range('2000-01-31', periods=1000, freq='ME')
+    frame = pd.concat([
+        pd.DataFrame({'date': dates, 'categorie': categorie, 'valeur': np.random.default_rng(seed).normal(size=1000)})
+        for seed, categorie in enumerate(['TVA', 'IR'])
+    ])
+    reduced = downsample_frame(frame, 'date', 'valeur', max_points=100, group='categorie')
+    assert reduced.groupby('categorie').size().to_dict() == {'IR': 100, 'TVA': 100}
+    small = frame.head(50)
+    assert downsample_frame(small, 'date', 'valeur', max_points=100) is small
+    with pytest.raises(ValueError):
+        downsample_indices(np.arange(10.0), np.arange(10.0), 5, 'moyenne')
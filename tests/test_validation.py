@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from impots import data
+from impots.validation import ERROR, validate_frame
+
+CODE = 'MAYOTTE'
+
+
+@pytest.fixture(scope='module')
+def territories():
+    return data.get_territories_definitions()
+
+
+@pytest.fixture(scope='module')
+def frames():
+    categories = data.get_categories_impots(CODE)
+    historical_data = data.load_historical_data(CODE, categories)
+    return {
+        'categories': list(categories),
+        'historical_data': historical_data,
+        'current_data': data.generate_current_data(CODE, categories, historical_data),
+    }
+
+
+def _failed(report):
+    return set(report.checks.loc[report.checks['statut'] == ERROR, 'controle'])
+
+
+def test_generated_tables_are_valid(frames, territories):
+    for kind in ('historical_data', 'current_data'):
+        report = validate_frame(frames[kind], kind, territories, frames['categories'])
+        assert report.ok, report.errors()
+
+
+def test_amount_in_euros_instead_of_millions_fails(frames, territories):
+    historical_data = frames['historical_data'].copy()
+    historical_data['montant_total_impots'] *= 1e6
+    report = validate_frame(historical_data, 'historical_data', territories, frames['categories'])
+    assert {'unite', 'coherence'} <= _failed(report)
+
+
+def test_forgotten_annualisation_fails_ratio_check(frames, territories):
+    current_data = frames['current_data'].copy()
+    current_data['montant_annee_precedente'] /= 12
+    report = validate_frame(current_data, 'current_data', territories, frames['categories'])
+    assert 'coherence' in _failed(report)
+
+
+def test_missing_month_fails(frames, territories):
+    historical_data = frames['historical_data']
+    dates = historical_data['date'].drop_duplicates().sort_values()
+    gap = historical_data[historical_data['date'] != dates.iloc[len(dates) // 2]].reset_index(drop=True)
+    report = validate_frame(gap, 'historical_data', territories, frames['categories'])
+    assert _failed(report) == {'mois_consecutifs'}
+    assert report.checks.set_index('controle').loc['mois_consecutifs', 'lignes'] == 1
+
+
+def test_date_not_at_month_end_fails(frames, territories):
+    historical_data = frames['historical_data'].copy()
+    historical_data['date'] = historical_data['date'] - pd.Timedelta(days=1)
+    report = validate_frame(historical_data, 'historical_data', territories, frames['categories'])
+    assert 'fin_de_mois' in _failed(report)
+
+
+def test_non_positive_current_amounts_fail(frames, territories):
+    current_data = frames['current_data'].copy()
+    current_data.loc[0, 'montant_mensuel'] = 0.0
+    current_data.loc[1, 'nombre_contribuables'] = 0.0
+    report = validate_frame(current_data, 'current_data', territories, frames['categories'])
+    assert 'borne_min' in _failed(report)
+    below = report.checks[report.checks['controle'] == 'borne_min']
+    assert set(below.loc[below['statut'] == ERROR, 'colonne']) == {'montant_mensuel', 'nombre_contribuables'}